@@ -0,0 +1,94 @@
+from __future__ import annotations
+from pathlib import Path
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+from .corpus import file_fingerprint
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 2
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+GENERATION_PREFIX = "gen-"
+
+def save_arrays(d: Path, arrays: dict[str, np.ndarray]):
+    d.mkdir(parents=True, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(d / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+
+def load_arrays(d: Path, mmap: bool = True) -> dict[str, np.ndarray]:
+    mode = "r" if mmap else None
+    return {p.stem: np.load(p, mmap_mode=mode, allow_pickle=False) for p in sorted(d.glob("*.npy"))}
+
+def staging_dir(index_dir: str) -> Path:
+    """Fresh directory to write a new artifact generation into."""
+    d = Path(index_dir) / f".staging-{uuid.uuid4().hex}"
+    d.mkdir(parents=True)
+    return d
+
+def commit_generation(index_dir: str, staged: Path, meta: dict | None = None, keep: int = 2) -> Path:
+    """Checksum, publish and atomically activate a staged generation.
+
+    The directory is renamed into place first and ``CURRENT`` is then swapped
+    with ``os.replace``, so readers see either the old or the new generation.
+    """
+    root = Path(index_dir)
+    files = {}
+    for p in sorted(staged.rglob("*")):
+        if p.is_file():
+            files[p.relative_to(staged).as_posix()] = {"sha256": file_fingerprint(p), "bytes": p.stat().st_size}
+    manifest = {"format_version": FORMAT_VERSION, "created_at": time.time(), "files": files, **(meta or {})}
+    (staged / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    name = f"{GENERATION_PREFIX}{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    gen = root / name
+    os.replace(staged, gen)
+    tmp = root / f"{CURRENT_FILE}.tmp"
+    tmp.write_text(name, encoding="utf-8")
+    os.replace(tmp, root / CURRENT_FILE)
+    logger.info(f"Artifacts committed: {name} ({len(files)} files)")
+    _prune(root, keep=keep, current=name)
+    return gen
+
+def _prune(root: Path, keep: int, current: str):
+    # Older generations may still be mapped by other workers; unlinking is
+    # safe on POSIX, and the most recent ones are kept for quick rollback.
+    # Names have one-second resolution and a random suffix, so order by the manifest's timestamp.
+    gens = sorted((p for p in root.glob(f"{GENERATION_PREFIX}*") if p.is_dir()), key=_created_at)
+    for p in gens[:-keep] if keep else gens:
+        if p.name != current:
+            shutil.rmtree(p, ignore_errors=True)
+    for p in root.glob(".staging-*"):
+        if p.is_dir() and time.time() - p.stat().st_mtime > 3600:
+            shutil.rmtree(p, ignore_errors=True)
+
+def _created_at(gen: Path) -> tuple[float, str]:
+    try:
+        created = float(json.loads((gen / MANIFEST_FILE).read_text(encoding="utf-8"))["created_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        created = 0.0
+    return created, gen.name
+
+def current_generation(index_dir: str) -> Path | None:
+    p = Path(index_dir) / CURRENT_FILE
+    if not p.exists():
+        return None
+    gen = Path(index_dir) / p.read_text(encoding="utf-8").strip()
+    return gen if gen.is_dir() else None
+
+def read_manifest(gen: Path) -> dict:
+    manifest = json.loads((gen / MANIFEST_FILE).read_text(encoding="utf-8"))
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')} in {gen}")
+    return manifest
+
+def verify_generation(gen: Path, manifest: dict):
+    for rel, meta in manifest["files"].items():
+        p = gen / rel
+        if not p.exists() or p.stat().st_size != meta["bytes"] or file_fingerprint(p) != meta["sha256"]:
+            raise ValueError(f"Checksum mismatch for {p}")
@@ -0,0 +1,128 @@
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from .artifacts import save_arrays, load_arrays
+from .chunk_store import PackedStrings
+from .keywords import TOKEN_RE, stopwords
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+FUSION_MODES = ("rrf", "weighted")
+
+def tokenize(text: str) -> list[str]:
+    # Unlike keyword extraction, digits are kept: codes and part numbers matter here.
+    stop = stopwords()
+    return [t for t in (t.lower() for t in TOKEN_RE.findall(text)) if t not in stop]
+
+class BM25Index:
+    """Okapi BM25 with per-(term, chunk) weights precomputed into a term-major CSR matrix.
+
+    Row ``t`` of the matrix (``indptr[t]:indptr[t + 1]``) lists the chunk rows
+    containing term ``t`` and their BM25 contribution, so scoring a query is a
+    gather over its terms followed by one ``np.bincount``.
+    """
+
+    def __init__(self, vocab: dict[str, int], indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_docs: int):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, texts: list[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        n_docs = len(texts)
+        vocab: dict[str, int] = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(n_docs, dtype="float32")
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[row] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(row)
+                tfs.append(tf)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype="float32")
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype("float32")
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        norm = k1 * (1.0 - b + b * doc_len[doc_ids] / (avgdl or 1.0))
+        data = idf[term_ids] * tfs * (k1 + 1.0) / (tfs + norm)
+
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(df.astype(np.int64))
+        logger.info(f"BM25: {len(vocab)} terms, {len(data)} postings over {n_docs} chunks")
+        return cls(vocab, indptr, doc_ids[order], data[order].astype("float32"), n_docs)
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk row for the query."""
+        terms = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not terms:
+            return np.zeros(self.n_docs, dtype="float32")
+        spans = [np.arange(self.indptr[t], self.indptr[t + 1]) for t in terms]
+        sel = np.concatenate(spans)
+        return np.bincount(self.indices[sel], weights=self.data[sel], minlength=self.n_docs).astype("float32")
+
+    def search(self, query: str, k: int, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, rows) with a positive score, optionally restricted to ``rows``."""
+        scores = self.score(query)
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            scores = scores[rows]
+        else:
+            rows = np.arange(self.n_docs, dtype=np.int64)
+        pos = np.flatnonzero(scores > 0)
+        k = min(k, len(pos))
+        if not k:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype=np.int64)
+        top = pos[np.argpartition(-scores[pos], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], rows[top]
+
+    def save(self, d: Path):
+        terms = PackedStrings.pack(sorted(self.vocab, key=self.vocab.get))
+        save_arrays(d, {"terms_buf": terms.buf, "terms_off": terms.offsets, "indptr": self.indptr,
+                        "indices": self.indices, "data": self.data, "n_docs": np.array([self.n_docs])})
+
+    @classmethod
+    def load(cls, d: Path, mmap: bool = True) -> "BM25Index | None":
+        if not d.is_dir():
+            return None
+        a = load_arrays(d, mmap=mmap)
+        vocab = {t: i for i, t in enumerate(PackedStrings(a["terms_buf"], a["terms_off"]))}
+        return cls(vocab, a["indptr"], a["indices"], a["data"], int(a["n_docs"][0]))
+
+def fuse_rrf(rankings: list[np.ndarray], k: int, rrf_k: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """Reciprocal-rank fusion of several ranked row lists."""
+    fused: dict[int, float] = {}
+    for ranked in rankings:
+        for rank, row in enumerate(ranked.tolist()):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+    return np.array([s for _, s in best], dtype="float32"), np.array([r for r, _ in best], dtype=np.int64)
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    if not scores.size:
+        return scores
+    lo, hi = float(scores.min()), float(scores.max())
+    return np.ones_like(scores) if hi - lo < 1e-9 else (scores - lo) / (hi - lo)
+
+def fuse_weighted(
+    vector: tuple[np.ndarray, np.ndarray],
+    lexical: tuple[np.ndarray, np.ndarray],
+    k: int,
+    alpha: float = 0.5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """alpha * min-max(vector) + (1 - alpha) * min-max(BM25) over the union of both pools."""
+    fused: dict[int, float] = {}
+    for weight, (scores, rows) in ((alpha, vector), (1.0 - alpha, lexical)):
+        for s, row in zip(_minmax(np.asarray(scores, dtype="float32")).tolist(), rows.tolist()):
+            fused[row] = fused.get(row, 0.0) + weight * s
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+    return np.array([s for _, s in best], dtype="float32"), np.array([r for r, _ in best], dtype=np.int64)
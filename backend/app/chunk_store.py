@@ -0,0 +1,162 @@
+from __future__ import annotations
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+from .artifacts import save_arrays, load_arrays
+
+class PackedStrings(Sequence):
+    """Many strings in one UTF-8 buffer; string ``i`` is ``buf[offsets[i]:offsets[i + 1]]``."""
+
+    def __init__(self, buf: np.ndarray, offsets: np.ndarray):
+        self.buf = buf
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings: Iterable[str]) -> "PackedStrings":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(buf, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.buf[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return self.buf.nbytes + self.offsets.nbytes
+
+class _Interner:
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+
+    def __call__(self, s: str | None) -> int:
+        if s is None:
+            return -1
+        return self.codes.setdefault(s, len(self.codes))
+
+    def table(self) -> PackedStrings:
+        return PackedStrings.pack(self.codes)
+
+def _lookup(table: PackedStrings, code: int) -> str | None:
+    return None if code < 0 else table[code]
+
+class ChunkStore(Sequence):
+    """Read-only, columnar chunk table with O(1) lookup by chunk_id.
+
+    Texts and ids live in packed UTF-8 buffers, pages in int32 arrays, and
+    repeated strings (source file, section id/title, keywords) are interned
+    into tables referenced by int32 codes. Indexing a row returns the same
+    dict shape the pipeline always used for chunks.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+        self._ids = PackedStrings(columns["chunk_id_buf"], columns["chunk_id_off"])
+        self._texts = PackedStrings(columns["text_buf"], columns["text_off"])
+        self._strings = PackedStrings(columns["string_buf"], columns["string_off"])
+        self._hashes = PackedStrings(columns["text_hash_buf"], columns["text_hash_off"])
+        self._row_of: dict[str, int] | None = None
+
+    @classmethod
+    def from_dicts(cls, chunks: Iterable[dict]) -> "ChunkStore":
+        chunks = list(chunks)
+        intern = _Interner()
+        kw_off = np.zeros(len(chunks) + 1, dtype=np.int64)
+        kw_codes: list[int] = []
+        for i, ch in enumerate(chunks):
+            kw_codes.extend(intern(k) for k in ch.get("keywords") or [])
+            kw_off[i + 1] = len(kw_codes)
+        ids = PackedStrings.pack(ch["chunk_id"] for ch in chunks)
+        texts = PackedStrings.pack(ch["text"] for ch in chunks)
+        hashes = PackedStrings.pack(ch.get("text_hash") or "" for ch in chunks)
+        cols = {
+            "chunk_id_buf": ids.buf, "chunk_id_off": ids.offsets,
+            "text_buf": texts.buf, "text_off": texts.offsets,
+            "text_hash_buf": hashes.buf, "text_hash_off": hashes.offsets,
+            "page_start": np.array([ch["page_start"] for ch in chunks], dtype=np.int32),
+            "page_end": np.array([ch["page_end"] for ch in chunks], dtype=np.int32),
+            "section_id": np.array([intern(ch.get("section_id")) for ch in chunks], dtype=np.int32),
+            "section_title": np.array([intern(ch["section_title"]) for ch in chunks], dtype=np.int32),
+            "source_file": np.array([intern(ch.get("source_file")) for ch in chunks], dtype=np.int32),
+            "keyword_codes": np.array(kw_codes, dtype=np.int32),
+            "keyword_off": kw_off,
+        }
+        table = intern.table()
+        cols["string_buf"], cols["string_off"] = table.buf, table.offsets
+        return cls(cols)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, row: int) -> dict:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        c = self.columns
+        ch = {
+            "chunk_id": self._ids[row],
+            "section_id": _lookup(self._strings, int(c["section_id"][row])),
+            "section_title": self._strings[int(c["section_title"][row])],
+            "page_start": int(c["page_start"][row]),
+            "page_end": int(c["page_end"][row]),
+            "source_file": _lookup(self._strings, int(c["source_file"][row])),
+            "text": self._texts[row],
+            "keywords": self.keywords(row),
+        }
+        text_hash = self._hashes[row]
+        if text_hash:
+            ch["text_hash"] = text_hash
+        return ch
+
+    def __iter__(self) -> Iterator[dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def chunk_id(self, row: int) -> str:
+        return self._ids[row]
+
+    def chunk_ids(self) -> list[str]:
+        return [self._ids[i] for i in range(len(self))]
+
+    def text(self, row: int) -> str:
+        return self._texts[row]
+
+    def section_title(self, row: int) -> str:
+        return self._strings[int(self.columns["section_title"][row])]
+
+    def source_file(self, row: int) -> str | None:
+        return _lookup(self._strings, int(self.columns["source_file"][row]))
+
+    def keywords(self, row: int) -> list[str]:
+        off = self.columns["keyword_off"]
+        codes = self.columns["keyword_codes"][off[row]:off[row + 1]]
+        return [self._strings[int(k)] for k in codes]
+
+    def embedding_texts(self) -> list[str]:
+        return [self.section_title(i) + "\n" + self.text(i) for i in range(len(self))]
+
+    def row_of(self, chunk_id: str) -> int | None:
+        if self._row_of is None:
+            self._row_of = {self._ids[i]: i for i in range(len(self))}
+        return self._row_of.get(chunk_id)
+
+    def get(self, chunk_id: str) -> dict | None:
+        row = self.row_of(chunk_id)
+        return None if row is None else self[row]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.columns.values())
+
+    def save(self, d: Path):
+        save_arrays(d, self.columns)
+
+    @classmethod
+    def load(cls, d: Path, mmap: bool = True) -> "ChunkStore":
+        return cls(load_arrays(d, mmap=mmap))
@@ -1,6 +1,9 @@
 from __future__ import annotations
 import re, time, hashlib
+from bisect import bisect_right
+from typing import Iterable, Iterator
 from .logging_utils import get_logger
+from .metrics import TimedIterator, observe
 
 logger = get_logger(__name__)
 
@@ -8,86 +11,125 @@ HEADING_RE = re.compile(
     r"(?m)^\s*(\d{1,2}(?:\.\d{1,2})?)\s*\.?\s+"
     r"([A-ZÅÄÖ][A-ZÅÄÖ0-9 \t\-\(\)\/]{2,})[\t]*(?=\n|$)"
 )
+WORD_RE = re.compile(r"\S+")
+
+_HEADING_TRANSLATION = str.maketrans({"\u00A0": " ", "\u200B": None, "．": ".", "·": "."})
+MIN_CHUNK_CHARS = 20
+MAX_TITLE_CHARS = 90
 
 def normalize_for_headings(text: str) -> str:
-    text = text.replace("\u00A0", " ")
-    text = text.replace("\u200B", "")
-    text = text.replace("．", ".")
-    text = text.replace("·", ".")
-    return text
+    return text.translate(_HEADING_TRANSLATION)
 
 def stable_chunk_id(source_file: str, section_id: str, page_start: int, page_end: int) -> str:
     raw = f"{source_file}|{section_id}|{page_start}-{page_end}"
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
 
-def _split_with_matches(text: str, matches: list[re.Match], page_num: int, source_file: str) -> list[dict]:
-    chunks = []
-    min_chunk_chars = 20
-    for idx, m in enumerate(matches):
-        sec_id = m.group(1)
-        title_text = m.group(2).strip()
-        if len(title_text) > 90:
-            logger.warning(f"  ⚠ Skipping overly long title: {title_text[:50]}...")
-            continue
-        section_title = f"{sec_id} {title_text}" if "." in sec_id else f"{sec_id}. {title_text}"
-        start = m.start()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
-        chunk_text = text[start:end].strip()
-        if len(chunk_text) < min_chunk_chars:
-            continue
-        chunks.append({
-            "page_start": page_num,
-            "page_end": page_num,
-            "section_id": sec_id,
-            "section_title": section_title,
-            "text": chunk_text,
-            "source_file": source_file,
-        })
-    return chunks
+class _Section:
+    """A section being accumulated; text arrives as per-page parts and is joined once."""
 
-def chunk_pages(pages: list[dict]) -> list[dict]:
-    logger.info(f"Chunking {len(pages)} pages by sections...")
-    t0 = time.time()
-    raw_chunks = []
-    full_pages = []
-    step = max(1, len(pages) // 5) if pages else 1
+    def __init__(self, section_id: str | None, section_title: str, source_file: str):
+        self.section_id = section_id
+        self.section_title = section_title
+        self.source_file = source_file
+        self.parts: list[str] = []
+        self.pages: list[int] = []
+
+    def add(self, text: str, page: int):
+        text = text.strip()
+        if text:
+            self.parts.append(text)
+            self.pages.append(page)
+
+    def chunks(self, max_tokens: int = 0, overlap: int = 0) -> Iterator[dict]:
+        if not self.parts:
+            return
+        text = "\n\n".join(self.parts)
+        if self.section_id is not None and len(text) < MIN_CHUNK_CHARS:
+            return
+        # Offset of each part in ``text``, so any span can be mapped back to its pages.
+        starts, pos = [], 0
+        for part in self.parts:
+            starts.append(pos)
+            pos += len(part) + 2
+        for i, (a, b) in enumerate(_token_windows(text, max_tokens, overlap)):
+            page_start = self.pages[bisect_right(starts, a) - 1]
+            page_end = self.pages[bisect_right(starts, b - 1) - 1]
+            sec = self.section_id or "NA"
+            yield {
+                "page_start": page_start,
+                "page_end": page_end,
+                "section_id": self.section_id,
+                "section_title": self.section_title,
+                "text": text[a:b],
+                "source_file": self.source_file,
+                "chunk_id": stable_chunk_id(self.source_file, f"{sec}#{i}" if i else sec, page_start, page_end),
+            }
+
+def _token_windows(text: str, max_tokens: int, overlap: int) -> list[tuple[int, int]]:
+    """Character spans of at most ``max_tokens`` whitespace tokens, ``overlap`` tokens shared."""
+    if max_tokens <= 0:
+        return [(0, len(text))]
+    spans = [m.span() for m in WORD_RE.finditer(text)]
+    if len(spans) <= max_tokens:
+        return [(0, len(text))]
+    step = max(1, max_tokens - max(0, overlap))
+    windows = []
+    for i in range(0, len(spans), step):
+        window = spans[i:i + max_tokens]
+        windows.append((window[0][0], window[-1][1]))
+        if i + max_tokens >= len(spans):
+            break
+    return windows
 
-    for i, p in enumerate(pages, start=1):
-        if i % step == 0 or i == len(pages):
-            logger.info(f"  Page {i}/{len(pages)}...")
+def _section_for(m: re.Match, source_file: str) -> _Section | None:
+    sec_id = m.group(1)
+    title_text = m.group(2).strip()
+    if len(title_text) > MAX_TITLE_CHARS:
+        logger.warning(f"  ⚠ Skipping overly long title: {title_text[:50]}...")
+        return None
+    section_title = f"{sec_id} {title_text}" if "." in sec_id else f"{sec_id}. {title_text}"
+    return _Section(sec_id, section_title, source_file)
+
+def iter_chunks(pages: Iterable[dict], max_tokens: int = 0, overlap: int = 0) -> Iterator[dict]:
+    """Single pass over a page stream, yielding each chunk once its section has ended.
+
+    Sections run from one heading to the next, across page boundaries, so
+    ``page_end`` is the last page holding the section's text. Text before a
+    document's first heading becomes a FULL_PAGE chunk. With ``max_tokens``
+    set, longer sections are split into overlapping windows.
+    """
+    current: _Section | None = None
+    for p in pages:
         page_num = p["page"]
-        text = normalize_for_headings(p["text"])
         source_file = p["source_file"]
-        matches = list(HEADING_RE.finditer(text))
-        if not matches:
-            raw_chunks.append({
-                "page_start": page_num,
-                "page_end": page_num,
-                "section_id": None,
-                "section_title": "FULL_PAGE",
-                "text": text,
-                "source_file": source_file,
-            })
-            full_pages.append(page_num)
-            continue
-        raw_chunks.extend(_split_with_matches(text, matches, page_num, source_file))
+        text = normalize_for_headings(p["text"])
+        if current is not None and current.source_file != source_file:
+            yield from current.chunks(max_tokens, overlap)
+            current = None
+        if current is None:
+            current = _Section(None, "FULL_PAGE", source_file)
 
-    merged = []
-    for ch in raw_chunks:
-        if ch["section_title"] == "FULL_PAGE" and merged:
-            prev = merged[-1]
-            prev["text"] += "\n\n" + ch["text"]
-            prev["page_end"] = ch["page_end"]
-        else:
-            merged.append(ch)
+        pos = 0
+        for m in HEADING_RE.finditer(text):
+            section = _section_for(m, source_file)
+            if section is None:
+                # Not a real heading; its text stays with the running section.
+                continue
+            current.add(text[pos:m.start()], page_num)
+            yield from current.chunks(max_tokens, overlap)
+            current, pos = section, m.start()
+        current.add(text[pos:], page_num)
+    if current is not None:
+        yield from current.chunks(max_tokens, overlap)
 
-    # add stable ids
-    for ch in merged:
-        ch["chunk_id"] = stable_chunk_id(
-            ch["source_file"],
-            ch["section_id"] or "NA",
-            ch["page_start"],
-            ch["page_end"]
-        )
-    logger.info(f"Chunks: {len(merged)} (chunking took {time.time()-t0:.2f}s)")
-    return merged
+def chunk_pages(pages: Iterable[dict], max_tokens: int = 0, overlap: int = 0) -> list[dict]:
+    total = f"{len(pages)} " if hasattr(pages, "__len__") else ""
+    logger.info(f"Chunking {total}pages by sections...")
+    t0 = time.time()
+    # Streamed pages are extracted while we chunk; that time belongs to pdf.extract.
+    source = TimedIterator(pages)
+    chunks = list(iter_chunks(source, max_tokens=max_tokens, overlap=overlap))
+    elapsed = time.time() - t0
+    observe("chunk", max(0.0, elapsed - source.seconds), items=len(chunks))
+    logger.info(f"Chunks: {len(chunks)} (chunking took {elapsed:.2f}s)")
+    return chunks
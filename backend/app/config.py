@@ -1,22 +1,79 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 import yaml
 
 @dataclass
 class AppConfig:
     pdf_path: str = "data/pdfs/document.pdf"
+    pdf_dir: str = "data/pdfs"
     model_name: str = "all-MiniLM-L6-v2"
     embedding_batch_size: int = 32
+    embedding_backend: str = "torch"  # torch | onnx | onnx_int8 (ONNX Runtime, dynamically quantized)
+    embedding_workers: int = 1  # build-time encoding processes (from 2000 texts); 0 = one per CPU
+    embedding_threads: int = 0  # intra-op CPU threads for the backend; 0 = library default
+    onnx_file: str = ""  # override the ONNX graph inside the model repo, e.g. onnx/model_O3.onnx
+    embedding_parity_check: bool = True  # compare non-torch backends against torch when the model loads
+    embedding_parity_min_cosine: float = 0.98
+    embedding_cache_size: int = 200_000  # max cached vectors under index_dir; 0 disables
     top_k_search: int = 5
     pool_k_search: int = 25
+    search_mode: str = "vector"  # vector | bm25 | hybrid
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    hybrid_fusion: str = "rrf"  # rrf | weighted
+    hybrid_alpha: float = 0.5  # weight of the vector score in weighted fusion
+    rrf_k: int = 60
+    prefilter_exact_max: int = 2000  # keyword-filtered candidates scored exactly in NumPy up to this many
+    query_cache_size: int = 1024  # LRU entries for query embeddings; 0 disables
+    query_batch_window_ms: float = 0.0  # micro-batch window for concurrent queries; 0 disables
+    query_batch_max_size: int = 32
+    inference_workers: int = 4  # threads serving /search and /qa
+    inference_queue_size: int = 64  # waiting requests before 503
     progress_interval: int = 10
+    preload_model: bool = True  # load the embedding model in the background at API startup
+    autoload_index: bool = False  # load the current index from index_dir at API startup
     index_dir: str = "data/index"
+    mmap_artifacts: bool = True  # memory-map index and chunk arrays on load (shared across workers)
+    verify_artifacts: bool = False  # check manifest sha256 sums on load (reads every file)
+    index_type: str = "flat"  # flat | ivf_flat | ivf_pq | hnsw
+    vector_storage: str = "float32"  # float32 | fp16 | sq8 (scalar-quantized codes in the index)
+    rerank_factor: int = 0  # >1: fetch k*factor from the index and rescore with stored float16 vectors
+    ivf_nlist: int = 256
+    ivf_nprobe: int = 16
+    pq_m: int = 8  # sub-quantizers; must divide the embedding dimension
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    index_recall_queries: int = 200  # sample size for recall@10 vs flat at build; 0 disables
+    pdf_workers: int = 0  # PDF extraction processes; 0 = one per CPU
+    keyword_workers: int = 1  # processes for keyword tokenization (used from 2000 chunks); 0 = one per CPU
+    num_shards: int = 4  # shards written by /build/shards
+    shard_by: str = "source"  # source (keep each PDF together) | chunk_id (even spread)
+    shard_urls: list[str] = field(default_factory=list)  # HTTP shard servers; empty = local shard processes
+    shard_timeout_ms: float = 2000  # per-shard deadline; late shards are reported and left out
+    chunk_max_tokens: int = 0  # split longer sections into windows of this many words; 0 disables
+    chunk_overlap_tokens: int = 0  # words shared by consecutive windows
+    sentence_index: bool = False  # embed chunk sentences at build for /qa spans; costs ~sentences-per-chunk x the embedding work
+    answer_sentences: int = 2  # sentences per /qa context; 0 = first-paragraph excerpt
+    sentence_cache_size: int = 500_000  # cached sentence vectors, kept apart from the chunk cache; 0 disables
+    cross_encoder_model: str = ""  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2; empty disables re-ranking
+    cross_encoder_default: bool = False  # re-rank searches that don't set "rerank" themselves
+    cross_encoder_budget_ms: float = 150  # per request; over budget returns vector order
+    cross_encoder_cache_size: int = 10_000  # cached (query, chunk) scores
+    cross_encoder_batch_size: int = 32
+    result_cache_size: int = 1024  # cached /search and /qa responses per worker; 0 disables
+    result_cache_ttl_s: float = 300  # seconds; 0 = until the index changes
+    result_cache_path: str = ""  # sqlite file shared by workers on one host; empty = in-memory only
+    server_timing: bool = False  # add a Server-Timing header with per-stage durations to every response
+    profiler_enabled: bool = False  # expose /debug/profiler/* (wall-clock stack sampling on demand)
 
 def load_config(path: str | None) -> AppConfig:
     if not path:
         return AppConfig()
     p = Path(path)
     data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
-    cfg = AppConfig(**{k: v for k, v in data.items() if hasattr(AppConfig, k)})
+    known = {f.name for f in fields(AppConfig)}
+    cfg = AppConfig(**{k: v for k, v in data.items() if k in known})
     return cfg
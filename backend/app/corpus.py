@@ -0,0 +1,78 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import json
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "corpus.json"
+
+@dataclass
+class CorpusPlan:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def dirty(self) -> list[str]:
+        return self.added + self.changed
+
+    def is_noop(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+def source_name(path: Path) -> str:
+    # Must match the source_file written by pdf_loader.
+    return path.name.replace(" ", "_")
+
+def file_fingerprint(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def chunk_text_hash(chunk: dict) -> str:
+    """Hash of the text that gets embedded for a chunk."""
+    raw = chunk["section_title"] + "\n" + chunk["text"]
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def scan_pdf_dir(pdf_dir: str) -> dict[str, Path]:
+    d = Path(pdf_dir)
+    if not d.is_dir():
+        raise FileNotFoundError(f"PDF directory not found: {d}")
+    files = {}
+    for p in sorted(d.glob("*.pdf")):
+        name = source_name(p)
+        if name in files:
+            logger.warning(f"  ⚠ Skipping {p.name}: same source name as {files[name].name}")
+            continue
+        files[name] = p
+    return files
+
+def plan_corpus_update(fingerprints: dict[str, str], previous: dict[str, str]) -> CorpusPlan:
+    plan = CorpusPlan()
+    for name, fp in fingerprints.items():
+        if name not in previous:
+            plan.added.append(name)
+        elif previous[name] != fp:
+            plan.changed.append(name)
+        else:
+            plan.unchanged.append(name)
+    plan.removed = sorted(set(previous) - set(fingerprints))
+    return plan
+
+def save_corpus_manifest(index_dir: str, files: dict[str, str]):
+    d = Path(index_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    data = {"files": {name: {"sha256": fp} for name, fp in sorted(files.items())}}
+    (d / MANIFEST_NAME).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+def load_corpus_manifest(index_dir: str) -> dict[str, str]:
+    p = Path(index_dir) / MANIFEST_NAME
+    if not p.exists():
+        return {}
+    data = json.loads(p.read_text(encoding="utf-8"))
+    return {name: meta["sha256"] for name, meta in data.get("files", {}).items()}
@@ -0,0 +1,260 @@
+from __future__ import annotations
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import numpy as np
+from .logging_utils import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = get_logger(__name__)
+
+_MIN_CAPACITY = 1024
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "model"
+
+class EmbeddingCache:
+    """On-disk LRU cache of embeddings for one model, keyed by normalized text hash.
+
+    Vectors are rows of a float32 memory-mapped file. ``index.log`` is an
+    append-only log of slot changes (``+ key slot``, ``- keys`` for evictions,
+    ``^ keys`` for LRU touches) that every process replays from where it last
+    read, and it is rewritten compactly once it grows well past the entries it
+    describes. An eviction is logged before its row is overwritten, and a put
+    only after the new row is written, so a crash never leaves a key mapped to
+    another text's vector. Several processes may share ``cache_dir``: reads and
+    writes hold an exclusive ``flock`` on ``lock`` (not on platforms without
+    ``fcntl``).
+    """
+
+    def __init__(self, cache_dir: str | Path, model_name: str, dim: int, max_entries: int = 200_000):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.dir = Path(cache_dir) / _slug(model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._log_path = self.dir / "index.log"
+        self._vec_path = self.dir / "vectors.f32"
+        self._lock_path = self.dir / "lock"
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free: set[int] = set()
+        self._capacity = 0
+        self._vectors: np.memmap | None = None
+        self._log_ino: int | None = None  # identifies the log we replayed; compaction replaces it
+        self._log_offset = 0
+        self._records = 0  # log lines behind the current state
+        self.hits = 0
+        self.misses = 0
+        with self._locked():
+            pass
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def key(self, text: str) -> str:
+        raw = self.model_name + "\0" + normalize_text(text)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cross-process lock, catching up with what other processes logged first.
+
+        On the way out, a log that has grown to several times the live entries
+        is rewritten with one ``+`` line per entry.
+        """
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            self._refresh()
+            yield
+            if self._records > 4 * max(len(self._slots), _MIN_CAPACITY):
+                self._write_log([f"+ {k} {s}" for k, s in self._slots.items()])
+
+    def _refresh(self):
+        try:
+            st = os.stat(self._log_path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._log_ino:
+            self._reload(st is not None)
+        elif st.st_size > self._log_offset:
+            self._replay()
+        rows = self._vec_path.stat().st_size // (self.dim * 4)
+        if rows > self._capacity:
+            self._map(rows)
+
+    def _reload(self, exists: bool):
+        self._slots, self._free, self._capacity, self._vectors = OrderedDict(), set(), 0, None
+        self._log_offset = self._records = 0
+        if exists and self._vec_path.exists():
+            with open(self._log_path, "rb") as f:
+                try:
+                    header = json.loads(f.readline())
+                except ValueError:
+                    header = {}
+            if header.get("dim") == self.dim and header.get("model_name") == self.model_name:
+                self._log_ino = os.stat(self._log_path).st_ino
+                self._map(self._vec_path.stat().st_size // (self.dim * 4))
+                self._replay()
+                self._evict(len(self._slots) - self.max_entries)
+                return
+            logger.warning(f"  ⚠ Embedding cache at {self.dir} does not match model/dim; resetting")
+        # index.json/index.dirty belong to the older whole-file index format.
+        for stale in (self._vec_path, self.dir / "index.json", self.dir / "index.dirty"):
+            stale.unlink(missing_ok=True)
+        self._write_log([])
+        self._grow(min(_MIN_CAPACITY, self.max_entries))
+
+    def _replay(self):
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        if not self._log_offset:
+            data = data[data.find(b"\n") + 1:]  # header
+            self._log_offset = os.stat(self._log_path).st_size - len(data)
+        end = data.rfind(b"\n") + 1  # a torn last line (crash mid-append) is left unread
+        for line in data[:end].decode("utf-8").splitlines():
+            op, *args = line.split()
+            if op == "+":
+                k, slot = args[0], int(args[1])
+                self._slots.pop(k, None)
+                self._slots[k] = slot
+                self._free.discard(slot)
+            elif op == "-":
+                for k in args:
+                    slot = self._slots.pop(k, None)
+                    if slot is not None:
+                        self._free.add(slot)
+            elif op == "^":
+                for k in args:
+                    if k in self._slots:
+                        self._slots.move_to_end(k)
+            self._records += 1
+        self._log_offset += end
+
+    def _append(self, lines: list[str]):
+        if not lines:
+            return
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        with open(self._log_path, "ab") as f:
+            f.write(data)
+        self._log_offset += len(data)
+        self._records += len(lines)
+
+    def _write_log(self, lines: list[str]):
+        header = json.dumps({"model_name": self.model_name, "dim": self.dim})
+        tmp = self._log_path.with_suffix(".log.tmp")
+        tmp.write_text("".join(line + "\n" for line in [header, *lines]), encoding="utf-8")
+        os.replace(tmp, self._log_path)
+        st = os.stat(self._log_path)
+        self._log_ino, self._log_offset, self._records = st.st_ino, st.st_size, len(lines)
+
+    def _map(self, capacity: int):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        used = set(self._slots.values())
+        self._free |= {s for s in range(self._capacity, capacity) if s not in used}
+        self._capacity = capacity
+        if capacity:
+            self._vectors = np.memmap(self._vec_path, dtype="float32", mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, capacity: int):
+        with open(self._vec_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map(capacity)
+
+    def _evict(self, n: int):
+        evicted = []
+        for _ in range(max(0, n)):
+            k, slot = self._slots.popitem(last=False)
+            self._free.add(slot)
+            evicted.append(k)
+        if evicted:
+            self._append(["- " + " ".join(evicted)])
+
+    def get_many(self, keys: list[str]) -> tuple[np.ndarray, list[int]]:
+        """Return (vectors, miss positions); rows for misses are zero."""
+        with self._locked():
+            return self._get_many(keys)
+
+    def _get_many(self, keys: list[str]) -> tuple[np.ndarray, list[int]]:
+        out = np.zeros((len(keys), self.dim), dtype="float32")
+        hit_pos, hit_slots, missing = [], [], []
+        for i, k in enumerate(keys):
+            slot = self._slots.get(k)
+            if slot is None:
+                missing.append(i)
+            else:
+                self._slots.move_to_end(k)
+                hit_pos.append(i)
+                hit_slots.append(slot)
+        if hit_pos:
+            out[hit_pos] = self._vectors[hit_slots]
+            self._append(["^ " + " ".join(dict.fromkeys(keys[i] for i in hit_pos))])
+        return out, missing
+
+    def put_many(self, keys: list[str], vectors: np.ndarray):
+        with self._locked():
+            self._put_many(keys, vectors)
+
+    def _put_many(self, keys: list[str], vectors: np.ndarray):
+        touched = list(dict.fromkeys(k for k in keys if k in self._slots))
+        for k in touched:
+            self._slots.move_to_end(k)
+        if touched:
+            self._append(["^ " + " ".join(touched)])
+        new_keys = list(dict.fromkeys(k for k in keys if k not in self._slots))
+        overflow = len(self._slots) + len(new_keys) - self.max_entries
+        if overflow > 0:
+            self._evict(min(overflow, len(self._slots)))
+            new_keys = new_keys[-self.max_entries:]
+        if not new_keys:
+            return
+        need = len(self._slots) + len(new_keys)
+        if need > self._capacity:
+            self._grow(min(self.max_entries, max(need, 2 * self._capacity)))
+        row = {k: i for i, k in enumerate(keys)}
+        slots = [self._free.pop() for _ in new_keys]
+        self._vectors[slots] = vectors[[row[k] for k in new_keys]]
+        self._vectors.flush()
+        for k, slot in zip(new_keys, slots):
+            self._slots[k] = slot
+        self._append([f"+ {k} {slot}" for k, slot in zip(new_keys, slots)])
+
+    def embed(self, texts: list[str], encode: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """Embed texts, calling ``encode`` only for cache misses (in one batch).
+
+        The lock is not held while encoding; misses another process cached in
+        the meantime are simply touched when the new vectors are put.
+        """
+        keys = [self.key(t) for t in texts]
+        out, missing = self.get_many(keys)
+        if missing:
+            # Identical texts inside one build are encoded once.
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            todo = list(first.values())
+            vecs = np.asarray(encode([texts[i] for i in todo]), dtype="float32")
+            by_key = {keys[i]: v for i, v in zip(todo, vecs)}
+            out[missing] = np.stack([by_key[keys[i]] for i in missing])
+            self.put_many(list(by_key), np.stack(list(by_key.values())))
+        n_hits = len(texts) - len(missing)
+        self.hits += n_hits
+        self.misses += len(missing)
+        logger.info(f"Embedding cache: {n_hits} hits, {len(missing)} misses ({len(self)} cached)")
+        return out
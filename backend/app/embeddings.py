@@ -1,25 +1,147 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
+import platform
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from .logging_utils import get_logger
+from .metrics import observe
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = get_logger(__name__)
-_model: SentenceTransformer | None = None
 
-def get_model(model_name: str) -> SentenceTransformer:
-    global _model
-    if _model is None or _model.get_sentence_embedding_dimension() is None:
-        logger.info(f"Loading embedding model: {model_name}...")
+# torch: full-precision PyTorch; onnx: ONNX Runtime fp32; onnx_int8: ONNX Runtime with a
+# dynamically int8-quantized graph (much faster on CPU, cosine ~0.99 vs torch for MiniLM).
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+_models: dict[tuple, SentenceTransformer] = {}
+
+# Below this many texts, starting worker processes costs more than it saves.
+MIN_MULTIPROCESS_TEXTS = 2000
+_CHUNKS_PER_WORKER = 4
+
+def _cpu_flags() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def default_int8_file() -> str:
+    """The pre-quantized graph published with the sentence-transformers ONNX exports for this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    flags = _cpu_flags()
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+def _load(model_name: str, backend: str, threads: int, onnx_file: str | None) -> SentenceTransformer:
+    # Deferred import: sentence_transformers pulls in torch, which takes seconds.
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name, backend="torch")
+
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    file_name = onnx_file or (default_int8_file() if backend == "onnx_int8" else "onnx/model.onnx")
+    logger.info(f"  ONNX Runtime graph: {file_name}")
+    return SentenceTransformer(model_name, backend="onnx", model_kwargs={
+        "file_name": file_name,
+        "provider": "CPUExecutionProvider",
+        "session_options": options,
+    })
+
+def get_model(model_name: str, backend: str = "torch", threads: int = 0, onnx_file: str | None = None) -> SentenceTransformer:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding_backend {backend!r}; expected one of {EMBEDDING_BACKENDS}")
+    key = (model_name, backend, onnx_file)
+    model = _models.get(key)
+    if model is None or model.get_sentence_embedding_dimension() is None:
+        logger.info(f"Loading embedding model: {model_name} ({backend})...")
         # TODO: Replace SentenceTransformer with OpenAI embeddings when switching providers.
-        _model = SentenceTransformer(model_name)
-    return _model
+        model = _models[key] = _load(model_name, backend, threads, onnx_file)
+    return model
+
+def _log_throughput(n: int, t0: float, how: str):
+    dt = max(time.time() - t0, 1e-9)
+    observe("embed", dt, items=n)
+    logger.info(f"Embedded {n} texts in {dt:.2f}s ({n / dt:.1f} texts/sec, {how})")
 
 def embed_texts(texts: list[str], model: SentenceTransformer, batch_size: int = 32) -> np.ndarray:
     # TODO: Update this to call OpenAI embeddings (and handle rate limits) in the future.
+    t0 = time.time()
     emb = model.encode(
         texts,
         batch_size=batch_size,
         show_progress_bar=True,
         normalize_embeddings=True
     )
+    _log_throughput(len(texts), t0, "1 process")
     return np.asarray(emb, dtype="float32")
+
+def embed_texts_multiprocess(
+    texts: list[str], model: SentenceTransformer, workers: int, batch_size: int = 32,
+) -> np.ndarray:
+    """Embed across ``workers`` CPU processes with length-homogeneous chunks.
+
+    ``encode`` already length-sorts within each chunk it hands a worker, but
+    the chunks themselves are cut in input order. Sorting globally first
+    makes every chunk (and so every batch) hold similarly sized texts.
+    Rows come back in the original order.
+    """
+    t0 = time.time()
+    # Character length is what sentence-transformers itself sorts by; a cheap token-count proxy.
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    per_worker = -(-len(texts) // (workers * _CHUNKS_PER_WORKER))
+    chunk_size = max(batch_size, -(-per_worker // batch_size) * batch_size)
+    pool = model.start_multi_process_pool(target_devices=["cpu"] * workers)
+    try:
+        emb = model.encode([texts[i] for i in order], pool=pool, batch_size=batch_size,
+                           chunk_size=chunk_size, normalize_embeddings=True)
+    finally:
+        model.stop_multi_process_pool(pool)
+    out = np.empty((len(texts), emb.shape[1]), dtype="float32")
+    out[order] = emb
+    _log_throughput(len(texts), t0, f"{workers} processes")
+    return out
+
+PARITY_TEXTS = [
+    "1. PURPOSE",
+    "This procedure describes how deviations are reported, investigated and closed.",
+    "Calibrate the balance before each weighing and record the result in the logbook.",
+    "Syftet med denna instruktion är att beskriva hantering av avvikelser.",
+    "Access to the production system requires an approved change request.",
+    "Backups are retained for ten years and verified quarterly.",
+    "What is the escalation path for a priority 1 incident?",
+    "V-2231 gasket replacement torque 35 Nm",
+]
+
+def parity_check(reference, candidate, texts: list[str], min_cosine: float = 0.98) -> dict:
+    """Cosine agreement between two models' embeddings of the same texts.
+
+    Used to confirm an ONNX/int8 backend still matches the PyTorch reference
+    before serving from it.
+    """
+    ref = np.asarray(reference.encode(texts, normalize_embeddings=True), dtype="float32")
+    cand = np.asarray(candidate.encode(texts, normalize_embeddings=True), dtype="float32")
+    cos = np.einsum("ij,ij->i", ref, cand)
+    report = {"texts": len(texts), "mean_cosine": float(cos.mean()), "min_cosine": float(cos.min()),
+              "passed": bool(cos.min() >= min_cosine)}
+    log = logger.info if report["passed"] else logger.warning
+    log(f"{'•' if report['passed'] else '⚠'} Embedding parity: mean cosine {report['mean_cosine']:.4f}, "
+        f"min {report['min_cosine']:.4f} over {len(texts)} texts")
+    return report
+
+def check_backend_parity(model_name: str, candidate, texts: list[str] | None = None, min_cosine: float = 0.98) -> dict:
+    """Compare ``candidate`` against a freshly loaded PyTorch reference; the reference is not cached."""
+    reference = _load(model_name, "torch", 0, None)
+    return parity_check(reference, candidate, texts or PARITY_TEXTS, min_cosine=min_cosine)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import threading
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the inference queue is full; the API maps it to 503."""
+
+class InferenceExecutor:
+    """Bounded thread pool for CPU-heavy work called from async endpoints.
+
+    At most ``max_workers`` tasks run and ``max_queue`` more wait; anything
+    beyond that is rejected immediately instead of piling up latency.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    @property
+    def depth(self) -> int:
+        return self._inflight
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._inflight >= self.capacity:
+                raise ExecutorSaturated(f"Inference queue full ({self._inflight} in flight)")
+            self._inflight += 1
+        ctx = contextvars.copy_context()
+        try:
+            fut = self._pool.submit(ctx.run, fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the work finishes, not when the caller stops waiting:
+        # a cancelled request (client gone) still occupies a thread until then.
+        fut.add_done_callback(self._release)
+        return await asyncio.wrap_future(fut)
+
+    def _release(self, _fut=None):
+        with self._lock:
+            self._inflight -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,34 +1,345 @@
 from __future__ import annotations
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterable
 import json
+import shutil
 import numpy as np
-import faiss
+from .artifacts import (
+    save_arrays, load_arrays, staging_dir, commit_generation, current_generation, read_manifest, verify_generation,
+)
+from .bm25 import BM25Index
+from .chunk_store import ChunkStore
+from .corpus import save_corpus_manifest, load_corpus_manifest
+from .keywords import KeywordPostings
+from .sentences import SentenceIndex
+from .lazy_imports import LazyModule
 from .logging_utils import get_logger
+from .metrics import timer
 
 logger = get_logger(__name__)
+# Imported on first use so the API process answers /health before FAISS is loaded.
+faiss = LazyModule("faiss")
 
-def build_index(emb: np.ndarray) -> faiss.Index:
-    dim = emb.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(emb)
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# How each stored vector is encoded: 4, 2 or 1 byte(s) per dimension.
+VECTOR_STORAGE = ("float32", "fp16", "sq8")
+
+def _sq_type(storage: str):
+    return {"fp16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}[storage]
+
+def _clamp_nlist(nlist: int, n: int) -> int:
+    # k-means wants ~39 training points per centroid.
+    return max(1, min(nlist, n // 39 or 1))
+
+def _make_index(
+    emb: np.ndarray,
+    index_type: str,
+    nlist: int,
+    pq_m: int,
+    pq_nbits: int,
+    hnsw_m: int,
+    ef_construction: int,
+    storage: str = "float32",
+) -> faiss.Index:
+    n, dim = emb.shape
+    ip = faiss.METRIC_INNER_PRODUCT
+    if storage not in VECTOR_STORAGE:
+        raise ValueError(f"Unknown vector_storage {storage!r}; expected one of {VECTOR_STORAGE}")
+    if storage != "float32" and index_type == "ivf_pq":
+        logger.warning(f"  ⚠ ivf_pq already compresses vectors; ignoring vector_storage={storage}")
+        storage = "float32"
+    sq = storage != "float32"
+    if index_type == "flat":
+        if not sq:
+            return faiss.IndexFlatIP(dim)
+        index = faiss.IndexScalarQuantizer(dim, _sq_type(storage), ip)
+        index.train(emb)
+        return index
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWSQ(dim, _sq_type(storage), hnsw_m, ip) if sq else faiss.IndexHNSWFlat(dim, hnsw_m, ip)
+        index.hnsw.efConstruction = ef_construction
+        if sq:
+            index.train(emb)
+        return index
+    if index_type == "ivf_pq" and n < 2 ** pq_nbits:
+        logger.warning(f"  ⚠ {n} vectors are too few to train PQ ({2 ** pq_nbits} centroids); using ivf_flat")
+        index_type = "ivf_flat"
+    nlist = _clamp_nlist(nlist, n)
+    quantizer = faiss.IndexFlatIP(dim)
+    if index_type == "ivf_flat" and sq:
+        index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, _sq_type(storage), ip)
+    elif index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, ip)
+    elif index_type == "ivf_pq":
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits, ip)
+    else:
+        raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}")
+    logger.info(f"  Training {index_type} (nlist={nlist}) on {n} vectors...")
+    index.train(emb)
+    # Keeps rows reconstructable so incremental builds can drop vectors.
+    index.make_direct_map()
+    return index
+
+def tune_index(index: faiss.Index, nprobe: int = 16, ef_search: int = 64) -> faiss.Index:
+    """Apply query-time knobs; they are cheap to change without rebuilding."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = max(ef_search, 1)
+    else:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+        except RuntimeError:
+            return index
+        ivf.nprobe = max(1, min(nprobe, ivf.nlist))
+    return index
+
+def rerank(q: np.ndarray, ids: np.ndarray, vectors: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rescore candidate rows (``ids``, -1 = empty) with stored vectors; returns top-k per query."""
+    valid = ids >= 0
+    vecs = np.asarray(vectors[np.where(valid, ids, 0).ravel()], dtype="float32").reshape(*ids.shape, -1)
+    scores = np.einsum("qkd,qd->qk", vecs, q)
+    scores[~valid] = -np.inf
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    out_ids = np.take_along_axis(ids, top, axis=1)
+    out_scores = np.take_along_axis(scores, top, axis=1).astype("float32")
+    out_ids[~np.isfinite(out_scores)] = -1
+    return out_scores, out_ids
+
+def recall_at_k(
+    index: faiss.Index,
+    emb: np.ndarray,
+    k: int = 10,
+    n_queries: int = 200,
+    seed: int = 0,
+    vectors: np.ndarray | None = None,
+    rerank_factor: int = 1,
+) -> float:
+    """Recall@k of ``index`` against exact inner-product search, using stored vectors as queries.
+
+    With ``vectors``, the top ``k * rerank_factor`` are rescored from them first.
+    """
+    n = emb.shape[0]
+    k = min(k, n)
+    if not n or not k:
+        return 1.0
+    rng = np.random.default_rng(seed)
+    q = emb[rng.choice(n, size=min(n_queries, n), replace=False)]
+    exact = faiss.IndexFlatIP(emb.shape[1])
+    exact.add(emb)
+    _, truth = exact.search(q, k)
+    if vectors is not None and rerank_factor > 1:
+        _, cand = index.search(q, min(k * rerank_factor, n))
+        _, got = rerank(q, cand, vectors, k)
+    else:
+        _, got = index.search(q, k)
+    hits = sum(len(set(t) & set(g)) for t, g in zip(truth, got))
+    return hits / truth.size
+
+def index_nbytes(index: faiss.Index) -> int:
+    """Serialized size, which is close to what the index occupies in RAM (or maps from disk)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def search_subset(
+    index: faiss.Index, q: np.ndarray, rows: np.ndarray, k: int, exact_max: int = 2000,
+    vectors: np.ndarray | None = None,
+):
+    """Top-k over only the given rows, for a single query.
+
+    Flat and scalar-quantized indexes scan their codes through a FAISS
+    IDSelector, which copies nothing. Small candidate sets (up to
+    ``exact_max``) are instead scored exactly in NumPy when there is a stored
+    re-ranking copy in ``vectors``, or on IVF/HNSW indexes, whose filtered
+    search can miss candidates.
+    """
+    k = min(k, len(rows))
+    if not k:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+    rows = np.asarray(rows, dtype="int64")
+    if len(rows) <= exact_max and (vectors is not None or not isinstance(index, faiss.IndexFlatCodes)):
+        if vectors is not None:
+            vecs = np.asarray(vectors[rows], dtype="float32")
+        else:
+            try:
+                vecs = index.reconstruct_batch(rows)
+            except RuntimeError:
+                vecs = None
+        if vecs is not None:
+            scores = vecs @ q[0]
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return scores[top], rows[top]
+    sel = faiss.IDSelectorBatch(rows)
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=max(index.hnsw.efSearch, k))
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=index.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    scores, ids = index.search(q, k, params=params)
+    return scores[0], ids[0]
+
+def build_index(
+    emb: np.ndarray,
+    index_type: str = "flat",
+    nlist: int = 256,
+    nprobe: int = 16,
+    pq_m: int = 8,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    ef_search: int = 64,
+    recall_queries: int = 200,
+    storage: str = "float32",
+    rerank_vectors: np.ndarray | None = None,
+    rerank_factor: int = 1,
+) -> faiss.Index:
+    n, dim = emb.shape
+    with timer("index.build", items=n):
+        index = _make_index(emb, index_type, nlist, pq_m, pq_nbits, hnsw_m, ef_construction, storage)
+        index.add(emb)
+    tune_index(index, nprobe=nprobe, ef_search=ef_search)
     logger.info("FAISS index ready")
+    logger.info(f"  • Type: {index_type} ({storage})")
     logger.info(f"  • Dimension: {dim}")
     logger.info(f"  • Vectors stored: {index.ntotal}")
+    size = index_nbytes(index)
+    logger.info(f"  • Memory: {size / 2**20:.1f} MB ({size / max(n * dim * 4, 1):.2f}x float32 vectors)")
+    if rerank_vectors is not None:
+        logger.info(f"  • Re-ranking vectors: {rerank_vectors.nbytes / 2**20:.1f} MB (memory-mapped on load)")
+    if (index_type != "flat" or storage != "float32") and recall_queries > 0:
+        recall = recall_at_k(index, emb, k=10, n_queries=recall_queries)
+        logger.info(f"  • Recall@10 vs flat: {recall:.3f} (delta {recall - 1:+.3f})")
+        if rerank_vectors is not None and rerank_factor > 1:
+            reranked = recall_at_k(index, emb, k=10, n_queries=recall_queries,
+                                   vectors=rerank_vectors, rerank_factor=rerank_factor)
+            logger.info(f"  • Recall@10 with x{rerank_factor} re-ranking: {reranked:.3f} (delta {reranked - 1:+.3f})")
     return index
 
-def save_artifacts(index_dir: str, index: faiss.Index, chunks: list[dict], kw_to_chunks: dict[str, list[str]]):
-    d = Path(index_dir)
-    d.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(d / "index.faiss"))
-    (d / "chunks.json").write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
-    (d / "keywords.json").write_text(json.dumps(kw_to_chunks, ensure_ascii=False, indent=2), encoding="utf-8")
+@dataclass
+class Artifacts:
+    index: faiss.Index
+    chunks: ChunkStore
+    postings: KeywordPostings
+    bm25: BM25Index | None = None
+    corpus_files: dict[str, str] = field(default_factory=dict)
+    generation: str | None = None
+    vectors: np.ndarray | None = None
+    sentences: SentenceIndex | None = None
 
-def load_artifacts(index_dir: str):
-    d = Path(index_dir)
-    idx_path = d / "index.faiss"
-    if not idx_path.exists():
-        raise FileNotFoundError(f"Missing FAISS index at {idx_path}")
-    index = faiss.read_index(str(idx_path))
-    chunks = json.loads((d / "chunks.json").read_text(encoding="utf-8"))
+def save_artifacts(
+    index_dir: str,
+    index: faiss.Index,
+    chunks: ChunkStore | Iterable[dict],
+    kw_to_chunks: KeywordPostings | dict[str, list[str]],
+    bm25: BM25Index | None = None,
+    corpus_files: dict[str, str] | None = None,
+    vectors: np.ndarray | None = None,
+    sentences: SentenceIndex | None = None,
+) -> Path:
+    """Write a new artifact generation and atomically make it current.
+
+    Layout of a generation directory::
+
+        index.faiss       FAISS index
+        chunks/*.npy      ChunkStore columns
+        keywords/*.npy    packed keyword postings
+        bm25/*.npy        BM25 CSR matrix (optional)
+        vectors/*.npy     float16 copy of the embeddings for re-ranking (optional)
+        sentences/*.npy   sentence offsets and float16 embeddings for answer spans (optional)
+        corpus.json       source file fingerprints (corpus builds only)
+        manifest.json     format version, per-file sha256 and sizes
+    """
+    if not isinstance(chunks, ChunkStore):
+        chunks = ChunkStore.from_dicts(chunks)
+    if not isinstance(kw_to_chunks, KeywordPostings):
+        kw_to_chunks = KeywordPostings.from_index(kw_to_chunks, chunks.chunk_ids())
+    staged = staging_dir(index_dir)
+    try:
+        with timer("index.save", items=len(chunks)):
+            faiss.write_index(index, str(staged / "index.faiss"))
+            chunks.save(staged / "chunks")
+            kw_to_chunks.save(staged / "keywords")
+            if bm25 is not None:
+                bm25.save(staged / "bm25")
+            if vectors is not None:
+                save_arrays(staged / "vectors", {"vectors": np.asarray(vectors, dtype="float16")})
+            if sentences is not None:
+                sentences.save(staged / "sentences")
+            if corpus_files:
+                save_corpus_manifest(str(staged), corpus_files)
+            return commit_generation(index_dir, staged, meta={"chunks": len(chunks), "vectors": int(index.ntotal)})
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+
+def read_index(path: Path, mmap: bool = True) -> faiss.Index:
+    if mmap:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            logger.warning(f"  ⚠ Could not mmap {path}; reading it into memory")
+    return faiss.read_index(str(path))
+
+def writable_index(index: faiss.Index) -> faiss.Index:
+    """Private, owned copy of an index (memory-mapped indexes must not be mutated)."""
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+def _load_legacy(d: Path) -> Artifacts:
+    index = faiss.read_index(str(d / "index.faiss"))
+    chunks = ChunkStore.from_dicts(json.loads((d / "chunks.json").read_text(encoding="utf-8")))
     kw_to_chunks = json.loads((d / "keywords.json").read_text(encoding="utf-8"))
-    return index, chunks, kw_to_chunks
+    postings = KeywordPostings.from_index(kw_to_chunks, chunks.chunk_ids())
+    return Artifacts(index, chunks, postings, corpus_files=load_corpus_manifest(str(d)))
+
+def load_bundle(index_dir: str, mmap: bool = True, verify: bool = False) -> Artifacts:
+    d = Path(index_dir)
+    gen = current_generation(index_dir)
+    if gen is None:
+        if (d / "index.faiss").exists() and (d / "chunks.json").exists():
+            logger.info(f"Loading legacy JSON artifacts from {d}")
+            return _load_legacy(d)
+        raise FileNotFoundError(f"Missing FAISS index at {d / 'index.faiss'}")
+    with timer("index.load"):
+        manifest = read_manifest(gen)
+        if verify:
+            verify_generation(gen, manifest)
+        return Artifacts(
+            index=read_index(gen / "index.faiss", mmap=mmap),
+            chunks=ChunkStore.load(gen / "chunks", mmap=mmap),
+            postings=KeywordPostings.load(gen / "keywords", mmap=mmap),
+            bm25=BM25Index.load(gen / "bm25", mmap=mmap),
+            corpus_files=load_corpus_manifest(str(gen)),
+            generation=gen.name,
+            vectors=load_arrays(gen / "vectors", mmap=mmap)["vectors"] if (gen / "vectors").is_dir() else None,
+            sentences=SentenceIndex.load(gen / "sentences", mmap=mmap),
+        )
+
+def load_artifacts(index_dir: str, mmap: bool = True):
+    b = load_bundle(index_dir, mmap=mmap)
+    return b.index, b.chunks, b.postings
+
+def remove_rows(index: faiss.Index, rows: list[int]) -> faiss.Index:
+    """Drop vectors by row; later rows shift down so they stay aligned with the chunk list.
+
+    Flat indexes compact in place. ANN indexes can't renumber (IVF) or delete
+    at all (HNSW), so their surviving vectors are re-added to a reset clone
+    that keeps the trained quantizers.
+    """
+    if not rows:
+        return index
+    if isinstance(index, faiss.IndexFlatCodes):
+        # Flat and scalar-quantized flat indexes store codes contiguously and compact in place.
+        sel = faiss.IDSelectorBatch(np.asarray(sorted(rows), dtype="int64"))
+        removed = index.remove_ids(sel)
+        logger.info(f"  • Vectors removed: {removed}")
+        return index
+    keep = np.ones(index.ntotal, dtype=bool)
+    keep[list(rows)] = False
+    vectors = index.reconstruct_n(0, index.ntotal)[keep]
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    rebuilt.add(vectors)
+    logger.info(f"  • Vectors removed: {int((~keep).sum())} (re-added {rebuilt.ntotal})")
+    return rebuilt
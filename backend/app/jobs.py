@@ -0,0 +1,61 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable
+import threading
+import time
+import uuid
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    status: str = "queued"  # queued | running | succeeded | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: Any = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class JobManager:
+    """Runs index builds in the background, one at a time, and tracks their status."""
+
+    def __init__(self, max_history: int = 100):
+        self.max_history = max_history
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="build")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        job = Job(job_id=uuid.uuid4().hex, kind=kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"Job {job.job_id} ({kind}) queued")
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception(f"Job {job.job_id} ({job.kind}) failed")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -1,63 +1,196 @@
 from __future__ import annotations
 import re
 from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from .artifacts import save_arrays, load_arrays
+from .chunk_store import PackedStrings
 from .logging_utils import get_logger
+from .workers import process_pool, resolve_workers
 
 logger = get_logger(__name__)
 
 TOKEN_RE = re.compile(r"[A-Za-zÅÄÖåäö0-9][A-Za-zÅÄÖåäö0-9\-_]{2,}")
 
-def _stopwords():
-    # Prefer spaCy models if installed; otherwise fall back to built-in stopword lists
+# Below this many chunks a process pool costs more than it saves.
+_MIN_PARALLEL_CHUNKS = 2000
+_DOMAIN_STOPWORDS = {"shall","must","may","also","ensure","process","procedure","document","requirement"}
+
+@lru_cache(maxsize=None)
+def stopwords() -> frozenset[str]:
+    """English + Swedish stop words plus SOP boilerplate, loaded on first use.
+
+    Only spaCy's plain ``spacy.lang.*.stop_words`` tables are read, so no
+    pipeline model is loaded.
+    """
     stop = set()
     try:
-        import spacy
-        try:
-            nlp_en = spacy.load("en_core_web_sm")
-            stop |= set(nlp_en.Defaults.stop_words)
-        except Exception:
-            from spacy.lang.en.stop_words import STOP_WORDS as EN_STOP
-            stop |= set(EN_STOP)
-        try:
-            nlp_sv = spacy.load("sv_core_news_sm")
-            stop |= set(nlp_sv.Defaults.stop_words)
-        except Exception:
-            from spacy.lang.sv.stop_words import STOP_WORDS as SV_STOP
-            stop |= set(SV_STOP)
+        from spacy.lang.en.stop_words import STOP_WORDS as EN_STOP
+        from spacy.lang.sv.stop_words import STOP_WORDS as SV_STOP
+        stop |= set(EN_STOP) | set(SV_STOP)
     except Exception:
         # If spaCy isn't even importable, just minimal stopwords
         stop |= {"the","and","of","to","in","for","on","with","is","are"}
-    domain_stop = {"shall","must","may","also","ensure","process","procedure","document","requirement"}
-    stop |= domain_stop
-    return stop
+    stop |= _DOMAIN_STOPWORDS
+    return frozenset(stop)
 
-STOPWORDS = _stopwords()
+def __getattr__(name: str):
+    # Keeps ``keywords.STOPWORDS`` working without loading the tables at import.
+    if name == "STOPWORDS":
+        return stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def term_counts(text: str) -> Counter:
+    """Lower-cased keyword candidates (stop words and bare numbers removed) with counts."""
+    stop = stopwords()
+    return Counter(t for t in map(str.lower, TOKEN_RE.findall(text)) if t not in stop and not t.isdigit())
 
 def extract_keywords(text: str, top_k: int = 12) -> list[str]:
-    tokens = [t.lower() for t in TOKEN_RE.findall(text)]
-    tokens = [t for t in tokens if t not in STOPWORDS and not t.isdigit()]
-    counts = Counter(tokens)
-    return [w for w,_ in counts.most_common(top_k)]
+    return [w for w,_ in term_counts(text).most_common(top_k)]
+
+def _chunk_counts(chunk: tuple[str, str]) -> tuple[Counter, Counter]:
+    title, text = chunk
+    return term_counts(title), term_counts(text)
 
-def build_keyword_index(chunks: list[dict], per_chunk_k: int = 12) -> tuple[list[dict], dict[str, list[str]]]:
+def _count_chunks(chunks: list[dict], workers: int) -> list[tuple[Counter, Counter]]:
+    pairs = [(ch["section_title"], ch["text"]) for ch in chunks]
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(pairs) < _MIN_PARALLEL_CHUNKS:
+        return [_chunk_counts(p) for p in pairs]
+    logger.info(f"  Tokenizing with {workers} worker processes")
+    with process_pool(workers) as pool:
+        return list(pool.map(_chunk_counts, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+def _select_keywords(title_counts: Counter, text_counts: Counter, is_common, per_chunk_k: int) -> list[str]:
+    counts = title_counts.copy()
+    counts.update(text_counts)
+    kws = [k for k, _ in counts.most_common(30) if not is_common(k)]
+    return kws[:per_chunk_k]
+
+def build_keyword_index(
+    chunks: list[dict], per_chunk_k: int = 12, workers: int = 1,
+) -> tuple[list[dict], dict[str, list[str]]]:
+    """Tokenize every chunk once; the counts feed both document frequency and top-k selection."""
     logger.info("Building keyword inverted index...")
+    counts = _count_chunks(chunks, workers)
     df = Counter()
-    for ch in chunks:
-        tokens = set(t.lower() for t in TOKEN_RE.findall(ch["text"]))
-        tokens = {t for t in tokens if t not in STOPWORDS and not t.isdigit()}
-        df.update(tokens)
+    for _, text_counts in counts:
+        df.update(text_counts.keys())
 
     too_common_threshold = max(3, int(0.5 * len(chunks))) if chunks else 3
     too_common = {w for w,c in df.items() if c >= too_common_threshold}
 
     kw_to_chunks = defaultdict(set)
-    for ch in chunks:
-        text = ch["section_title"] + "\n" + ch["text"]
-        kws = [k for k in extract_keywords(text, top_k=30) if k not in too_common]
-        ch["keywords"] = kws[:per_chunk_k]
+    for ch, (title_counts, text_counts) in zip(chunks, counts):
+        ch["keywords"] = _select_keywords(title_counts, text_counts, too_common.__contains__, per_chunk_k)
         for kw in ch["keywords"]:
             kw_to_chunks[kw].add(ch["chunk_id"])
 
     kw_to_chunks = {k: sorted(v) for k,v in kw_to_chunks.items()}
     logger.info(f"Keywords: {len(kw_to_chunks)} unique")
     return chunks, kw_to_chunks
+
+def update_keyword_index(
+    kw_to_chunks: dict[str, list[str]],
+    removed: list[dict],
+    added: list[dict],
+    total_chunks: int,
+    per_chunk_k: int = 12,
+) -> dict[str, list[str]]:
+    """Patch the inverted index in place for an incremental build.
+
+    Document frequencies for the whole corpus aren't kept, so posting-list
+    sizes stand in for them when dropping overly common keywords.
+    """
+    for ch in removed:
+        for kw in ch.get("keywords", []):
+            ids = kw_to_chunks.get(kw)
+            if ids is None:
+                continue
+            ids = [cid for cid in ids if cid != ch["chunk_id"]]
+            if ids:
+                kw_to_chunks[kw] = ids
+            else:
+                del kw_to_chunks[kw]
+
+    too_common_threshold = max(3, int(0.5 * total_chunks)) if total_chunks else 3
+
+    def is_common(k: str) -> bool:
+        return len(kw_to_chunks.get(k, ())) >= too_common_threshold
+
+    touched = defaultdict(set)
+    for ch in added:
+        ch["keywords"] = _select_keywords(*_chunk_counts((ch["section_title"], ch["text"])), is_common, per_chunk_k)
+        for kw in ch["keywords"]:
+            touched[kw].add(ch["chunk_id"])
+
+    for kw, ids in touched.items():
+        kw_to_chunks[kw] = sorted(ids.union(kw_to_chunks.get(kw, ())))
+    logger.info(f"Keywords: {len(kw_to_chunks)} unique (-{len(removed)} / +{len(added)} chunks)")
+    return kw_to_chunks
+
+
+class KeywordPostings:
+    """Keyword -> sorted chunk rows, packed into two flat integer arrays.
+
+    ``rows[offsets[t]:offsets[t + 1]]`` are the chunk rows (positions in the
+    chunk list / FAISS index) for term ``t``.
+    """
+
+    def __init__(self, terms: dict[str, int], offsets: np.ndarray, rows: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+
+    @classmethod
+    def from_index(cls, kw_to_chunks: dict[str, list[str]], chunk_ids: list[str]) -> "KeywordPostings":
+        row_of = {cid: i for i, cid in enumerate(chunk_ids)}
+        terms: dict[str, int] = {}
+        lists = []
+        for kw, ids in kw_to_chunks.items():
+            terms[kw] = len(lists)
+            lists.append(sorted({row_of[c] for c in ids if c in row_of}))
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(l) for l in lists])
+        rows = np.fromiter((r for l in lists for r in l), dtype=np.int32, count=int(offsets[-1]))
+        return cls(terms, offsets, rows)
+
+    def to_index(self, chunk_ids: list[str]) -> dict[str, list[str]]:
+        """Back to keyword -> sorted chunk ids (for incremental updates)."""
+        return {kw: sorted(chunk_ids[r] for r in self.get(kw).tolist()) for kw in self.terms}
+
+    def save(self, d: Path):
+        terms = PackedStrings.pack(sorted(self.terms, key=self.terms.get))
+        save_arrays(d, {"terms_buf": terms.buf, "terms_off": terms.offsets,
+                        "offsets": self.offsets, "rows": self.rows})
+
+    @classmethod
+    def load(cls, d: Path, mmap: bool = True) -> "KeywordPostings":
+        a = load_arrays(d, mmap=mmap)
+        terms = PackedStrings(a["terms_buf"], a["terms_off"])
+        return cls({t: i for i, t in enumerate(terms)}, a["offsets"], a["rows"])
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self.terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, keyword: str) -> np.ndarray:
+        t = self.terms.get(keyword)
+        if t is None:
+            return np.empty(0, dtype=np.int32)
+        return self.rows[self.offsets[t]:self.offsets[t + 1]]
+
+    def candidates(self, keywords: list[str]) -> np.ndarray:
+        """Rows containing every keyword (intersection, shortest list first)."""
+        lists = sorted((self.get(k) for k in keywords), key=len)
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        out = lists[0]
+        for l in lists[1:]:
+            if not out.size:
+                break
+            out = np.intersect1d(out, l, assume_unique=True)
+        return out
@@ -0,0 +1,26 @@
+from __future__ import annotations
+import importlib
+import threading
+from types import ModuleType
+
+class LazyModule:
+    """Stand-in for a heavy module (faiss, torch, ...) that is imported on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
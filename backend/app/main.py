@@ -1,28 +1,201 @@
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException
+from contextlib import ExitStack, asynccontextmanager
+from typing import AsyncIterable, Iterable, Iterator
+import json
+import os
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from .config import load_config, AppConfig
-from .schemas import BuildRequest, SearchRequest, QARequest
+from .schemas import (
+    BuildRequest, BuildCorpusRequest, BuildShardsRequest, SearchRequest, QARequest, BatchSearchRequest,
+    BatchQARequest, ShardSearchRequest,
+)
 from .pipeline import QAPipeline
+from .sharding import ShardedSearcher, open_shards
+from .executor import InferenceExecutor, ExecutorSaturated
+from .jobs import JobManager
 from .logging_utils import get_logger
+from .metrics import REGISTRY, request_trace, server_timing, timer
+from .profiler import PROFILER
+from .reranker import FALLBACKS as RERANK_FALLBACKS
+from .result_cache import ResultCache, result_key
 
 logger = get_logger(__name__)
-app = FastAPI(title="PDF FAISS API Service", version="1.0.0")
 
-CFG: AppConfig = load_config(None)
+# Nothing heavy happens at import: the model and index load in the background after startup.
+# SOP_QA_CONFIG points at a config.yaml, e.g. to start a shard server on one shard directory.
+CFG: AppConfig = load_config(os.environ.get("SOP_QA_CONFIG"))
 PIPE = QAPipeline(CFG)
+EXECUTOR = InferenceExecutor(CFG.inference_workers, CFG.inference_queue_size)
+JOBS = JobManager()
+RESULTS = ResultCache(CFG.result_cache_size, CFG.result_cache_ttl_s, CFG.result_cache_path or None)
+SHARDS: ShardedSearcher | None = None
+_shards_lock = threading.Lock()
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "ready": PIPE.ready(), "index_dir": CFG.index_dir}
+REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status.", ("method", "path", "status"))
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request latency by route.", ("path",))
+INFERENCE_IN_FLIGHT = REGISTRY.gauge("inference_in_flight", "Requests running or queued on the inference pool.")
+QUERY_CACHE = REGISTRY.gauge("query_cache_lookups", "Query-embedding cache lookups since startup.", ("result",))
+INDEX_CHUNKS = REGISTRY.gauge("index_chunks", "Chunks in the live index.")
 
-@app.post("/build")
-def build(req: BuildRequest):
+def _shards() -> ShardedSearcher:
+    global SHARDS
+    with _shards_lock:
+        if SHARDS is None:
+            SHARDS = open_shards(CFG)
+        return SHARDS
+
+def _close_shards():
+    global SHARDS
+    with _shards_lock:
+        if SHARDS is not None:
+            SHARDS.close()
+            SHARDS = None
+
+def _warm_up():
+    t0 = time.time()
+    if CFG.autoload_index:
+        try:
+            PIPE.load()
+            logger.info(f"Auto-loaded index from {CFG.index_dir} ({len(PIPE.chunks)} chunks)")
+        except FileNotFoundError:
+            logger.info(f"No persisted index in {CFG.index_dir}; waiting for /build or /load")
+        except Exception as e:
+            logger.warning(f"⚠ Auto-loading index failed: {e}")
+    if CFG.preload_model:
+        try:
+            PIPE.model
+        except Exception as e:
+            logger.warning(f"⚠ Preloading model failed (will retry on first use): {e}")
+    logger.info(f"Warm-up finished in {time.time()-t0:.2f}s")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    yield
+    _close_shards()
+    RESULTS.close()
+
+app = FastAPI(title="PDF FAISS API Service", version="1.0.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """Per-route request metrics; with ``server_timing`` also a Server-Timing header of stage durations."""
+    started = time.perf_counter()
+    with request_trace() as trace:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # The route template, not the raw path, so /chunks/{chunk_id} is one series.
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    REQUESTS.inc(method=request.method, path=path, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, path=path)
+    if CFG.server_timing:
+        response.headers["Server-Timing"] = server_timing(trace, elapsed)
+    return response
+
+async def _offload(fn, *args, **kwargs):
     try:
-        PIPE.build(req.pdf_path, persist=req.persist)
-        return {"status": "built", "chunks": len(PIPE.chunks), "index_dir": CFG.index_dir}
+        return await EXECUTOR.run(fn, *args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/health")
+def health():
+    """Liveness: answers as soon as the process is up, whatever is still loading."""
+    return {
+        "status": "ok",
+        "alive": True,
+        "model_loaded": PIPE.model_loaded(),
+        "index_loaded": PIPE.ready(),
+        "ready": PIPE.ready() and PIPE.model_loaded(),
+        "index_dir": CFG.index_dir,
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of request, stage and cache metrics."""
+    INFERENCE_IN_FLIGHT.set(EXECUTOR.depth)
+    QUERY_CACHE.set(PIPE.query_encoder.hits, result="hit")
+    QUERY_CACHE.set(PIPE.query_encoder.misses, result="miss")
+    INDEX_CHUNKS.set(len(PIPE.chunks) if PIPE.ready() else 0)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _require_profiler():
+    if not CFG.profiler_enabled:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set profiler_enabled: true)")
+
+@app.get("/debug/profiler")
+def profiler_status():
+    _require_profiler()
+    return PROFILER.status()
+
+@app.post("/debug/profiler/start")
+def profiler_start(interval_ms: float = 10.0):
+    """Start sampling every thread's stack; stop returns collapsed stacks for a flamegraph."""
+    _require_profiler()
+    try:
+        PROFILER.start(interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PROFILER.status()
+
+@app.post("/debug/profiler/stop")
+def profiler_stop():
+    _require_profiler()
+    try:
+        return PlainTextResponse(PROFILER.stop())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/ready")
+def ready():
+    """Readiness: 503 until both the model and an index are loaded."""
+    status = health()
+    if not status["ready"]:
+        raise HTTPException(status_code=503, detail="Model or index not loaded yet")
+    return status
+
+def _run_build(pdf_path: str, persist: bool) -> dict:
+    PIPE.build(pdf_path, persist=persist)
+    return {"chunks": len(PIPE.chunks), "index_dir": CFG.index_dir}
+
+def _run_build_corpus(pdf_dir: str | None, persist: bool) -> dict:
+    stats = PIPE.build_corpus(pdf_dir, persist=persist)
+    return {"chunks": len(PIPE.chunks), "files": stats, "index_dir": CFG.index_dir}
+
+def _run_build_shards(pdf_dir: str | None, num_shards: int | None) -> dict:
+    counts = PIPE.build_shards(pdf_dir, num_shards=num_shards)
+    # Local shard processes hold the previous shards; reopen on next search.
+    _close_shards()
+    return {"shards": counts, "index_dir": CFG.index_dir}
+
+@app.post("/build", status_code=202)
+def build(req: BuildRequest):
+    job = JOBS.submit("build", _run_build, req.pdf_path, req.persist)
+    return job.to_dict()
+
+@app.post("/build/corpus", status_code=202)
+def build_corpus(req: BuildCorpusRequest):
+    job = JOBS.submit("build_corpus", _run_build_corpus, req.pdf_dir, req.persist)
+    return job.to_dict()
+
+@app.post("/build/shards", status_code=202)
+def build_shards(req: BuildShardsRequest):
+    job = JOBS.submit("build_shards", _run_build_shards, req.pdf_dir, req.num_shards)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @app.post("/load")
 def load():
     try:
@@ -31,33 +204,187 @@ def load():
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/search")
-def search(req: SearchRequest):
+@app.post("/reload")
+def reload():
+    """Swap in the newest on-disk generation without interrupting in-flight queries."""
     try:
-        hits = PIPE.search(req.query, keywords=req.keywords, top_k=req.top_k, pool_k=req.pool_k)
-        return [{
+        changed = PIPE.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "reloaded" if changed else "unchanged", "generation": PIPE.generation,
+            "chunks": len(PIPE.chunks), "index_dir": CFG.index_dir}
+
+def _iter_hits(hits) -> Iterator[dict]:
+    for score, ch in hits:
+        yield {
             "score": score,
             "chunk_id": ch["chunk_id"],
             "section_title": ch["section_title"],
             "page_start": ch["page_start"],
             "page_end": ch["page_end"],
             "keywords": ch.get("keywords", [])[:12],
-        } for score, ch in hits]
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        }
+
+def _hit_dicts(hits) -> list[dict]:
+    with timer("serialize"):
+        return list(_iter_hits(hits))
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+def _stream(kind: str, items: Iterable[dict] | AsyncIterable[dict], summary: dict, request: Request,
+            started: float, cache: str) -> StreamingResponse:
+    """Send each item as soon as it is produced, then a summary record.
+
+    NDJSON by default (one ``{"type": kind, ...}`` object per line); server-sent
+    events when the client asks for ``text/event-stream``. An item with its own
+    ``type`` (an ``error`` record) keeps it.
+    """
+    sse = SSE in request.headers.get("accept", "")
+
+    async def records():
+        n = 0
+        async for item in _aiter(items):
+            n += 1
+            yield {"type": kind, **item}
+        yield {"type": "summary", **summary, "count": n,
+               "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    async def body():
+        async for rec in records():
+            line = json.dumps(rec, ensure_ascii=False)
+            yield f"event: {rec['type']}\ndata: {line}\n\n" if sse else line + "\n"
+
+    return StreamingResponse(body(), media_type=SSE if sse else NDJSON,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": cache})
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+def _search(req: SearchRequest) -> tuple[list[dict], str | None]:
+    hits, outcome = PIPE.search(req.query, keywords=req.keywords, top_k=req.top_k, pool_k=req.pool_k, mode=req.mode,
+                                rerank=req.rerank, rerank_budget_ms=req.rerank_budget_ms, with_outcome=True)
+    return _hit_dicts(hits), outcome
+
+def _qa(question: str, top_k: int) -> tuple[dict, str | None]:
+    return PIPE.answer_extractive(question, top_k, with_outcome=True)
+
+def _search_batch(req: BatchSearchRequest) -> list[dict]:
+    queries = [q.query for q in req.queries]
+    hits = PIPE.search_batch(queries, [q.keywords for q in req.queries],
+                             top_k=req.top_k, pool_k=req.pool_k, mode=req.mode)
+    return [{"query": q, "results": _hit_dicts(h)} for q, h in zip(queries, hits)]
+
+async def _cached(kind: str, query: str, response: Response, fn, *args, **params):
+    """Serve a repeat request from RESULTS without touching the inference pool; ``params`` form the key.
+
+    ``fn`` returns the response and its re-rank outcome.
+    """
+    index_key = PIPE.index_key()
+    key = result_key(kind, query, index_key, **params)
+    value = RESULTS.get(key, index_key, kind=kind)
+    response.headers["X-Cache"] = "hit" if value is not None else "miss"
+    if value is None:
+        value, outcome = await _offload(fn, *args)
+        # A re-rank that fell back to vector order is not the answer we want to keep serving.
+        if outcome not in RERANK_FALLBACKS:
+            RESULTS.put(key, index_key, value)
+    return value
+
+@app.post("/search")
+async def search(req: SearchRequest, request: Request, response: Response):
+    params = dict(keywords=req.keywords, top_k=req.top_k, pool_k=req.pool_k, mode=req.mode or CFG.search_mode,
+                  rerank=CFG.cross_encoder_default if req.rerank is None else req.rerank)
+    if not req.stream:
+        return await _cached("search", req.query, response, _search, req, **params)
+    # Hits come out of one top-k search, so the stream starts once it is done; it shares the cache entry.
+    started = time.perf_counter()
+    index_key = PIPE.index_key()
+    key = result_key("search", req.query, index_key, **params)
+    hits = RESULTS.get(key, index_key, kind="search")
+    cache = "hit" if hits is not None else "miss"
+    if hits is None:
+        hits, outcome = await _offload(_search, req)
+        if outcome not in RERANK_FALLBACKS:
+            RESULTS.put(key, index_key, hits)
+    return _stream("hit", hits, {"query": req.query}, request, started, cache)
+
+@app.post("/search/batch")
+async def search_batch(req: BatchSearchRequest):
+    return await _offload(_search_batch, req)
+
+def _search_sharded(req: SearchRequest) -> dict:
+    if req.mode not in (None, "vector"):
+        raise ValueError("Sharded search supports vector mode only")
+    q = PIPE.query_encoder.encode_many([req.query])
+    hits, report = _shards().search(q, [req.keywords], top_k=req.top_k, pool_k=req.pool_k)
+    return {"results": _hit_dicts(hits[0]), "shards": report}
+
+@app.post("/search/sharded")
+async def search_sharded(req: SearchRequest):
+    return await _offload(_search_sharded, req)
+
+def _shard_search(req: ShardSearchRequest) -> dict:
+    hits = PIPE.search_embedded(req.vectors, req.keywords, top_k=req.top_k, pool_k=req.pool_k)
+    return {"results": [[{"score": score, "chunk": ch} for score, ch in h] for h in hits],
+            "generation": PIPE.generation}
+
+@app.post("/shard/search")
+async def shard_search(req: ShardSearchRequest):
+    """Called by a coordinator's /search/sharded when this instance serves one shard."""
+    return await _offload(_shard_search, req)
 
 @app.post("/qa")
-def qa(req: QARequest):
+async def qa(req: QARequest, request: Request, response: Response):
+    if not req.stream:
+        return await _cached("qa", req.question, response, _qa, req.question, req.top_k, top_k=req.top_k)
+    started = time.perf_counter()
+    index_key = PIPE.index_key()
+    key = result_key("qa", req.question, index_key, top_k=req.top_k)
+    cached = RESULTS.get(key, index_key, kind="qa")
+    summary = {"question": req.question}
+    if cached is not None:
+        return _stream("context", cached["contexts"], summary, request, started, "hit")
+    # Retrieve once up front (errors still get a status code), then score and excerpt hit by hit.
+    pin = ExitStack()
+    snap = pin.enter_context(PIPE.acquire())
     try:
-        return PIPE.answer_extractive(req.question, top_k=req.top_k)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        hits, q_embs, outcomes = await _offload(PIPE.answer_retrieve, snap, [req.question], req.top_k)
+    except BaseException:
+        pin.close()
+        raise
+    q_emb = q_embs[0] if q_embs is not None else None
+
+    async def contexts():
+        done = []
+        with pin:
+            for hit in hits[0]:
+                try:
+                    ctx = await EXECUTOR.run(PIPE.answer_context, snap, q_emb, hit)
+                except ExecutorSaturated as e:
+                    yield {"type": "error", "detail": str(e)}
+                    return
+                done.append(ctx)
+                yield ctx
+        if outcomes[0] not in RERANK_FALLBACKS:
+            RESULTS.put(key, index_key, {"question": req.question, "contexts": done})
+
+    return _stream("context", contexts(), summary, request, started, "miss")
+
+@app.post("/qa/batch")
+async def qa_batch(req: BatchQARequest):
+    return await _offload(PIPE.answer_extractive_batch, req.questions, top_k=req.top_k)
 
 @app.get("/chunks/{chunk_id}")
 def get_chunk(chunk_id: str):
     if not PIPE.ready():
         raise HTTPException(status_code=400, detail="Pipeline not ready. Build or load first.")
-    for ch in PIPE.chunks:
-        if ch["chunk_id"] == chunk_id:
-            return ch
-    raise HTTPException(status_code=404, detail="Chunk not found")
+    ch = PIPE.get_chunk(chunk_id)
+    if ch is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return ch
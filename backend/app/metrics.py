@@ -0,0 +1,205 @@
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+import threading
+import time
+
+# Seconds; spans sub-millisecond FAISS calls up to multi-minute builds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+PREFIX = "sop_qa_"
+
+def _label_str(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(v: float) -> str:
+    """Exposition value; ``:g`` would round large counters to 6 significant digits."""
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labels), 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_label_str(self.labels, key)} {_num(v)}"
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[tuple(str(labels.get(n, "")) for n in self.labels)] = value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_label_str(self.labels, key)} {_num(v)}"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus data model."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def count(self, **labels) -> int:
+        s = self._series.get(tuple(str(labels.get(n, "")) for n in self.labels))
+        return s[-1] if s else 0
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(s)) for k, s in self._series.items())
+        for key, s in items:
+            running = 0
+            for le, n in zip(self.buckets, s):
+                running += n
+                le_label = 'le="%g"' % le
+                yield f"{self.name}_bucket{_label_str(self.labels, key, le_label)} {running}"
+            inf_label = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_str(self.labels, key, inf_label)} {s[-1]}"
+            yield f"{self.name}_sum{_label_str(self.labels, key)} {s[-2]:.6f}"
+            yield f"{self.name}_count{_label_str(self.labels, key)} {s[-1]}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: tuple[str, ...], **kw):
+        name = PREFIX + name
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labels, **kw)
+            return m
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("stage_seconds", "Time spent in each build/query stage.", ("stage",))
+STAGE_ITEMS = REGISTRY.counter("stage_items_total", "Items (pages, chunks, texts, queries) processed per stage.",
+                               ("stage",))
+
+# Stage timings of the current request, for the Server-Timing header; None outside a traced request.
+_trace: ContextVar[dict[str, float] | None] = ContextVar("sop_qa_trace", default=None)
+
+@contextmanager
+def timer(stage: str, items: int | None = None):
+    """Record the block's duration in ``stage_seconds`` and in the current request trace, if any.
+
+    ``items`` also counts what the stage processed (pages, texts, queries).
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0, items)
+
+def observe(stage: str, seconds: float, items: int | None = None):
+    """``timer`` for durations measured elsewhere, e.g. summed over a generator's steps."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if items is not None:
+        STAGE_ITEMS.inc(items, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds
+
+class TimedIterator:
+    """Wrap an iterator, summing the time spent producing its items.
+
+    For streamed stages, where a consumer's ``timer`` would also count the
+    producer. With ``stage`` set the total is observed once it is exhausted.
+    """
+
+    def __init__(self, iterable, stage: str | None = None):
+        self._it = iter(iterable)
+        self.stage = stage
+        self.seconds = 0.0
+        self.items = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            item = next(self._it)
+        except StopIteration:
+            self.seconds += time.perf_counter() - t0
+            if self.stage:
+                observe(self.stage, self.seconds, self.items)
+            raise
+        self.seconds += time.perf_counter() - t0
+        self.items += 1
+        return item
+
+@contextmanager
+def request_trace() -> Iterator[dict[str, float]]:
+    """Collect ``timer`` durations from this context (and executor work it offloads) into a dict."""
+    trace: dict[str, float] = {}
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+def server_timing(trace: dict[str, float], total: float | None = None) -> str:
+    """A Server-Timing header value (durations in ms); stage names have '.' replaced for token safety."""
+    parts = [f"{stage.replace('.', '-')};dur={dt * 1000:.2f}" for stage, dt in trace.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
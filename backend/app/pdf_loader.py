@@ -1,12 +1,21 @@
 from __future__ import annotations
 from pathlib import Path
+from typing import Iterator
 from pypdf import PdfReader
 import re
 import time
 from .logging_utils import get_logger
+from .metrics import TimedIterator
+from .workers import process_pool, resolve_workers
 
 logger = get_logger(__name__)
 
+# Below this many pages a process pool costs more than it saves.
+_MIN_PARALLEL_PAGES = 32
+_RANGES_PER_WORKER = 4
+
+_worker_reader: PdfReader | None = None
+
 def cleanup_keep_newlines(text: str) -> str:
     text = text.replace("\r\n", "\n").replace("\r", "\n")
     text = re.sub(r"[ \t]+\n", "\n", text)
@@ -14,10 +23,43 @@ def cleanup_keep_newlines(text: str) -> str:
     text = re.sub(r"[ \t]{2,}", " ", text)
     return text.strip()
 
-def extract_pdf_pages(pdf_path: str, progress_interval: int = 10) -> list[dict]:
-    p = Path(pdf_path)
-    if not p.exists():
-        raise FileNotFoundError(f"PDF not found: {p}")
+def _extract_page(reader: PdfReader, i: int) -> tuple[int, str, str | None]:
+    try:
+        text = reader.pages[i].extract_text() or ""
+        return i + 1, cleanup_keep_newlines(text), None
+    except Exception as e:
+        return i + 1, "", str(e)
+
+def _init_worker(pdf_path: str):
+    global _worker_reader
+    _worker_reader = PdfReader(pdf_path)
+
+def _extract_range(start: int, stop: int) -> list[tuple[int, str, str | None]]:
+    return [_extract_page(_worker_reader, i) for i in range(start, stop)]
+
+def _page_ranges(num_pages: int, workers: int) -> list[tuple[int, int]]:
+    size = max(1, -(-num_pages // (workers * _RANGES_PER_WORKER)))
+    return [(s, min(s + size, num_pages)) for s in range(0, num_pages, size)]
+
+def _iter_raw_pages(p: Path, reader: PdfReader, num_pages: int, workers: int) -> Iterator[tuple[int, str, str | None]]:
+    if workers <= 1 or num_pages < _MIN_PARALLEL_PAGES:
+        for i in range(num_pages):
+            yield _extract_page(reader, i)
+        return
+    ranges = _page_ranges(num_pages, workers)
+    logger.info(f"  Extracting with {workers} worker processes ({len(ranges)} page ranges)")
+    with process_pool(workers, initializer=_init_worker, initargs=(str(p),)) as pool:
+        futures = [pool.submit(_extract_range, start, stop) for start, stop in ranges]
+        try:
+            # Ranges are consumed in submission order, so pages come out in
+            # page order while later ranges keep extracting in the background.
+            for fut in futures:
+                yield from fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+def _iter_pages(p: Path, progress_interval: int, workers: int) -> Iterator[dict]:
     safe_name = p.name.replace(" ", "_")
     logger.info(f"Opening PDF: {p.name}")
     t0 = time.time()
@@ -25,31 +67,42 @@ def extract_pdf_pages(pdf_path: str, progress_interval: int = 10) -> list[dict]:
     num_pages = len(reader.pages)
     logger.info(f"Total pages: {num_pages}")
 
-    pages: list[dict] = []
+    kept = 0
     empty_pages = 0
     error_pages: list[tuple[int,str]] = []
     step = max(1, num_pages // max(1, progress_interval))
 
-    for i, page in enumerate(reader.pages, start=1):
+    for i, text, err in TimedIterator(_iter_raw_pages(p, reader, num_pages, workers), stage="pdf.extract"):
         if i == 1 or i % step == 0 or i == num_pages:
             logger.info(f"  Page {i}/{num_pages}...")
-        try:
-            text = page.extract_text() or ""
-            text = cleanup_keep_newlines(text)
-            if text:
-                pages.append({"page": i, "text": text, "source_file": safe_name})
-            else:
-                empty_pages += 1
-        except Exception as e:
-            error_pages.append((i, str(e)))
+        if err is not None:
+            error_pages.append((i, err))
+        elif text:
+            kept += 1
+            yield {"page": i, "text": text, "source_file": safe_name}
+        else:
+            empty_pages += 1
 
     elapsed = time.time() - t0
     empty_ratio = empty_pages / num_pages if num_pages else 0.0
     logger.info(f"Extraction complete ({elapsed:.2f}s)")
-    logger.info(f"  Non-empty pages: {len(pages)}")
+    logger.info(f"  Non-empty pages: {kept}")
     logger.info(f"  Empty pages: {empty_pages} ({empty_ratio*100:.1f}%)")
     if error_pages:
         logger.warning(f"  Extraction errors on pages: {[p for p,_ in error_pages]}")
     if empty_ratio > 0.3:
         logger.warning("  High empty page ratio - likely scanned/image PDF")
-    return pages
+
+def iter_pdf_pages(pdf_path: str, progress_interval: int = 10, workers: int = 1) -> Iterator[dict]:
+    """Yield non-empty pages in page order as soon as they are extracted.
+
+    With ``workers > 1`` the page range is split across a process pool.
+    """
+    p = Path(pdf_path)
+    if not p.exists():
+        raise FileNotFoundError(f"PDF not found: {p}")
+    return _iter_pages(p, progress_interval, resolve_workers(workers))
+
+def extract_pdf_pages(pdf_path: str, progress_interval: int = 10, workers: int = 1, stream: bool = False):
+    pages = iter_pdf_pages(pdf_path, progress_interval=progress_interval, workers=workers)
+    return pages if stream else list(pages)
@@ -1,12 +1,33 @@
 from __future__ import annotations
+from pathlib import Path
+from typing import Iterator
+import os
+import threading
+import time
 import numpy as np
 from .config import AppConfig
 from .logging_utils import get_logger
+from .metrics import timer
 from .pdf_loader import extract_pdf_pages
 from .chunking import chunk_pages
-from .keywords import build_keyword_index
-from .embeddings import get_model, embed_texts
-from .faiss_store import build_index, save_artifacts, load_artifacts
+from .keywords import build_keyword_index, update_keyword_index, KeywordPostings
+from .embeddings import (
+    get_model, embed_texts, embed_texts_multiprocess, check_backend_parity, MIN_MULTIPROCESS_TEXTS,
+)
+from .embedding_cache import EmbeddingCache
+from .bm25 import BM25Index, fuse_rrf, fuse_weighted
+from .chunk_store import ChunkStore
+from .query_encoder import QueryEncoder
+from .faiss_store import (
+    build_index, tune_index, search_subset, rerank, save_artifacts, load_bundle, remove_rows, writable_index,
+)
+from .corpus import scan_pdf_dir, file_fingerprint, chunk_text_hash, plan_corpus_update
+from .artifacts import current_generation
+from .snapshot import IndexSnapshot, SnapshotManager
+from .sentences import SentenceIndex
+from .reranker import CrossEncoderReranker, get_cross_encoder
+from .sharding import shard_of, shard_dir, save_shard_manifest
+from .workers import resolve_workers
 
 logger = get_logger(__name__)
 
@@ -14,88 +35,640 @@ class QAPipeline:
     def __init__(self, cfg: AppConfig):
         self.cfg = cfg
         # TODO: Replace with OpenAI embedding client when switching providers.
-        self.model = get_model(cfg.model_name)
-        self.index = None
-        self.chunks: list[dict] = []
-        self.keyword_to_chunks: dict[str, list[str]] = {}
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.query_encoder = QueryEncoder(
+            lambda texts: self.model.encode(texts, normalize_embeddings=True),
+            cache_size=cfg.query_cache_size,
+            batch_window_ms=cfg.query_batch_window_ms,
+            max_batch=cfg.query_batch_max_size,
+        )
+        self._snapshots = SnapshotManager(IndexSnapshot(bm25_params=self._bm25_params()))
+        self._reranker: CrossEncoderReranker | None = None
 
-    def build(self, pdf_path: str | None = None, persist: bool = True):
-        pdf_path = pdf_path or self.cfg.pdf_path
-        pages = extract_pdf_pages(pdf_path, progress_interval=self.cfg.progress_interval)
-        chunks = chunk_pages(pages)
-        chunks, kw_to_chunks = build_keyword_index(chunks)
+    @property
+    def model(self):
+        """The embedding model, loaded on first use (or by ``main``'s startup warm-up)."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        cfg = self.cfg
+        model = get_model(cfg.model_name, backend=cfg.embedding_backend, threads=cfg.embedding_threads,
+                          onnx_file=cfg.onnx_file or None)
+        if cfg.embedding_backend != "torch" and cfg.embedding_parity_check:
+            report = check_backend_parity(cfg.model_name, model, min_cosine=cfg.embedding_parity_min_cosine)
+            if not report["passed"]:
+                raise RuntimeError(
+                    f"{cfg.embedding_backend} embeddings disagree with the PyTorch model "
+                    f"(min cosine {report['min_cosine']:.4f} < {cfg.embedding_parity_min_cosine})")
+        return model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    @property
+    def reranker(self) -> CrossEncoderReranker:
+        """Cross-encoder re-ranker for ``cross_encoder_model``, loaded on first use."""
+        if self._reranker is None:
+            if not self.cfg.cross_encoder_model:
+                raise ValueError("Re-ranking needs cross_encoder_model in the config")
+            with self._model_lock:
+                if self._reranker is None:
+                    self._reranker = CrossEncoderReranker(
+                        get_cross_encoder(self.cfg.cross_encoder_model),
+                        cache_size=self.cfg.cross_encoder_cache_size, batch_size=self.cfg.cross_encoder_batch_size,
+                    )
+        return self._reranker
+
+    def model_loaded(self) -> bool:
+        return self._model is not None
+
+    def _bm25_params(self) -> tuple[float, float]:
+        return self.cfg.bm25_k1, self.cfg.bm25_b
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """The live index snapshot, unpinned.
+
+        A retired snapshot is emptied once its last pinned reader finishes, so
+        read through ``acquire()`` or the accessors below, which pin for the read.
+        """
+        return self._snapshots.current
+
+    def acquire(self):
+        return self._snapshots.acquire()
+
+    def index_key(self) -> str:
+        """Identifies the live index for result caching: its generation, shared by every worker
+        that loaded it, or a process-local version for unpersisted builds."""
+        with self.acquire() as snap:
+            return snap.generation or f"pid{os.getpid()}-v{snap.version}"
+
+    def _publish(self, snapshot: IndexSnapshot):
+        self._snapshots.swap(snapshot)
+
+    # Convenience accessors, each pinning the snapshot for its read; assigning one
+    # publishes a new snapshot with that part replaced.
+    @property
+    def index(self):
+        with self.acquire() as snap:
+            return snap.index
+
+    @index.setter
+    def index(self, index):
+        with self.acquire() as snap:
+            new = snap.replace(index=index)
+        self._publish(new)
+
+    @property
+    def chunks(self) -> ChunkStore:
+        with self.acquire() as snap:
+            return snap.chunks
+
+    @chunks.setter
+    def chunks(self, chunks: ChunkStore | list[dict]):
+        with self.acquire() as snap:
+            new = snap.replace(chunks=chunks)
+        self._publish(new)
+
+    @property
+    def keyword_to_chunks(self) -> dict[str, list[str]]:
+        with self.acquire() as snap:
+            return snap.keyword_to_chunks
+
+    @keyword_to_chunks.setter
+    def keyword_to_chunks(self, kw_to_chunks: dict[str, list[str]]):
+        with self.acquire() as snap:
+            new = snap.replace(keyword_to_chunks=kw_to_chunks)
+        self._publish(new)
+
+    @property
+    def corpus_files(self) -> dict[str, str]:
+        """source_file -> content sha256 of the PDFs behind the current index."""
+        with self.acquire() as snap:
+            return snap.corpus_files
+
+    @property
+    def generation(self) -> str | None:
+        with self.acquire() as snap:
+            return snap.generation
+
+    @property
+    def postings(self) -> KeywordPostings:
+        with self.acquire() as snap:
+            return snap.postings
+
+    @property
+    def bm25(self) -> BM25Index:
+        with self.acquire() as snap:
+            return snap.bm25
+
+    def _chunk_pdf(self, pdf_path: str) -> list[dict]:
+        pages = extract_pdf_pages(pdf_path, progress_interval=self.cfg.progress_interval,
+                                  workers=self.cfg.pdf_workers, stream=True)
+        return chunk_pages(pages, **self._chunk_opts())
+
+    def _prepare(self, pdf_path: str | None) -> tuple[list[dict], dict[str, list[str]], list[str], np.ndarray]:
+        """Extract, chunk, keyword and embed one PDF."""
+        return self._prepare_chunks(self._chunk_pdf(pdf_path or self.cfg.pdf_path))
+
+    def _prepare_chunks(self, chunks: list[dict]) -> tuple[list[dict], dict[str, list[str]], list[str], np.ndarray]:
+        with timer("keywords", items=len(chunks)):
+            chunks, kw_to_chunks = build_keyword_index(chunks, workers=self.cfg.keyword_workers)
         texts = [c["section_title"] + "\n" + c["text"] for c in chunks]
-        emb = embed_texts(texts, self.model, batch_size=self.cfg.embedding_batch_size)
-        index = build_index(emb)
+        return chunks, kw_to_chunks, texts, self._embed(texts)
 
-        self.index = index
-        self.chunks = chunks
-        self.keyword_to_chunks = kw_to_chunks
+    def build(self, pdf_path: str | None = None, persist: bool = True):
+        chunks, kw_to_chunks, texts, emb = self._prepare(pdf_path)
+        vectors = self._rerank_vectors(emb)
+        index = self._build_index(emb, vectors)
+        sentences = self._sentence_index(chunks)
 
+        store = ChunkStore.from_dicts(chunks)
+        del chunks
+        postings = KeywordPostings.from_index(kw_to_chunks, store.chunk_ids())
+        bm25 = BM25Index.build(texts, k1=self.cfg.bm25_k1, b=self.cfg.bm25_b)
+        generation = None
         if persist:
-            save_artifacts(self.cfg.index_dir, index, chunks, kw_to_chunks)
+            generation = save_artifacts(self.cfg.index_dir, index, store, postings, bm25=bm25, vectors=vectors,
+                                        sentences=sentences).name
+        self._publish(IndexSnapshot(
+            index=index, chunks=store, keyword_to_chunks=kw_to_chunks, postings=postings, bm25=bm25,
+            generation=generation, bm25_params=self._bm25_params(), vectors=vectors, sentences=sentences,
+        ))
+
+    def build_shards(self, pdf_dir: str | None = None, num_shards: int | None = None,
+                     by: str | None = None) -> list[int]:
+        """Build N independent shard artifacts under ``index_dir/shards`` from every PDF in ``pdf_dir``.
+
+        Each shard is a normal artifact directory (its own generations and
+        CURRENT), so it can be served by a local worker process or by another
+        API instance pointed at it. Returns the chunk count per shard.
+        """
+        num_shards = num_shards or self.cfg.num_shards
+        by = by or self.cfg.shard_by
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        files = scan_pdf_dir(pdf_dir or self.cfg.pdf_dir)
+        if not files:
+            raise FileNotFoundError(f"No PDFs in {pdf_dir or self.cfg.pdf_dir}")
+        if by == "source" and len(files) == 1 and num_shards > 1:
+            logger.warning("⚠ Only one source PDF; sharding by chunk_id instead")
+            by = "chunk_id"
+        chunks = [ch for path in files.values() for ch in self._chunk_pdf(str(path))]
+        chunks, kw_to_chunks, texts, emb = self._prepare_chunks(chunks)
+        assign = np.array([shard_of(ch, num_shards, by) for ch in chunks], dtype=np.int64)
+        sentences = self._sentence_index(chunks)
+        counts = []
+        for i in range(num_shards):
+            rows = np.flatnonzero(assign == i)
+            counts.append(len(rows))
+            if not len(rows):
+                logger.warning(f"⚠ Shard {i} received no chunks")
+                continue
+            shard_chunks = [chunks[r] for r in rows]
+            ids = {ch["chunk_id"] for ch in shard_chunks}
+            shard_kw = {kw: [c for c in cids if c in ids] for kw, cids in kw_to_chunks.items()}
+            shard_kw = {kw: cids for kw, cids in shard_kw.items() if cids}
+            vectors = self._rerank_vectors(emb[rows])
+            save_artifacts(
+                str(shard_dir(self.cfg.index_dir, i)), self._build_index(emb[rows], vectors), shard_chunks, shard_kw,
+                bm25=BM25Index.build([texts[r] for r in rows], k1=self.cfg.bm25_k1, b=self.cfg.bm25_b),
+                vectors=vectors, sentences=sentences.take(rows) if sentences is not None else None,
+            )
+        save_shard_manifest(self.cfg.index_dir, by, counts)
+        logger.info(f"Shards: {num_shards} by {by} ({', '.join(map(str, counts))} chunks)")
+        return counts
+
+    def build_corpus(self, pdf_dir: str | None = None, persist: bool = True) -> dict:
+        """Incrementally (re)build the index over every PDF in a directory.
+
+        Only new or modified files are re-extracted and re-chunked, and only
+        chunks whose text changed are re-embedded; their vectors and keywords
+        are patched into the live index.
+        """
+        pdf_dir = pdf_dir or self.cfg.pdf_dir
+        files = scan_pdf_dir(pdf_dir)
+        fingerprints = {name: file_fingerprint(path) for name, path in files.items()}
+
+        if self.index is None and not self.corpus_files:
+            try:
+                self.load()
+            except FileNotFoundError:
+                pass
+        with self.acquire() as base:
+            return self._update_corpus(base, files, fingerprints, persist)
+
+    def _update_corpus(self, base: IndexSnapshot, files: dict, fingerprints: dict[str, str], persist: bool) -> dict:
+        # Work on copies so queries keep using ``base`` until the new snapshot is published.
+        if base.corpus_files:
+            old_chunks, old_index, kw_to_chunks = base.chunks, base.index, dict(base.keyword_to_chunks)
+            old_vectors, old_sentences = base.vectors, base.sentences
+        else:
+            # Whatever is loaded wasn't built from a corpus; start clean.
+            old_chunks, old_index, kw_to_chunks = ChunkStore.from_dicts([]), None, {}
+            old_vectors = old_sentences = None
+
+        plan = plan_corpus_update(fingerprints, base.corpus_files)
+        logger.info(
+            f"Corpus: {len(plan.added)} added, {len(plan.changed)} changed, "
+            f"{len(plan.removed)} removed, {len(plan.unchanged)} unchanged"
+        )
+        stats = {"added": len(plan.added), "changed": len(plan.changed),
+                 "removed": len(plan.removed), "unchanged": len(plan.unchanged), "embedded": 0}
+        if plan.is_noop():
+            return stats
+
+        dirty_sources = set(plan.changed) | set(plan.removed)
+        old_rows = {}
+        for row in range(len(old_chunks)):
+            if old_chunks.source_file(row) in dirty_sources:
+                ch = old_chunks[row]
+                old_rows[ch["chunk_id"]] = (row, ch.get("text_hash") or chunk_text_hash(ch))
+
+        new_chunks = []
+        keep_rows = set()
+        for name in plan.dirty:
+            pages = extract_pdf_pages(str(files[name]), progress_interval=self.cfg.progress_interval,
+                                      workers=self.cfg.pdf_workers, stream=True)
+            for ch in chunk_pages(pages, **self._chunk_opts()):
+                ch["text_hash"] = chunk_text_hash(ch)
+                old = old_rows.get(ch["chunk_id"])
+                if old is not None and old[1] == ch["text_hash"]:
+                    keep_rows.add(old[0])
+                else:
+                    new_chunks.append(ch)
+        drop_rows = sorted(row for row, _ in old_rows.values() if row not in keep_rows)
+
+        dropped = [old_chunks[r] for r in drop_rows]
+        drop_set = set(drop_rows)
+        chunks = [old_chunks[r] for r in range(len(old_chunks)) if r not in drop_set]
+        index = None
+        if old_index is not None:
+            index = remove_rows(writable_index(old_index), drop_rows)
+        # Re-ranking vectors get the same row edits as the index.
+        keep_vectors = self.cfg.rerank_factor > 1 and (old_index is None or old_vectors is not None)
+        if self.cfg.rerank_factor > 1 and not keep_vectors:
+            logger.warning("⚠ Current index has no re-ranking vectors; run a full build to enable re-ranking")
+        vectors = None
+        if keep_vectors and old_vectors is not None:
+            vectors = np.delete(np.asarray(old_vectors), drop_rows, axis=0)
+        # Likewise the sentence index, which is keyed by chunk row.
+        keep_sentences = self.cfg.sentence_index and (old_index is None or old_sentences is not None)
+        if self.cfg.sentence_index and not keep_sentences:
+            logger.warning("⚠ Current index has no sentence index; run a full build to enable answer spans")
+        sentences = None
+        if keep_sentences and old_sentences is not None:
+            sentences = old_sentences.take([r for r in range(len(old_chunks)) if r not in drop_set])
+
+        if new_chunks:
+            texts = [c["section_title"] + "\n" + c["text"] for c in new_chunks]
+            emb = self._embed(texts)
+            if keep_vectors:
+                new_vectors = self._rerank_vectors(emb)
+                vectors = new_vectors if vectors is None else np.concatenate([vectors, new_vectors])
+            if index is None:
+                index = self._build_index(emb, vectors)
+            else:
+                index.add(emb)
+            if keep_sentences:
+                new_sentences = self._sentence_index(new_chunks)
+                sentences = new_sentences if sentences is None else sentences.concat(new_sentences)
+        chunks.extend(new_chunks)
+        kw_to_chunks = update_keyword_index(kw_to_chunks, dropped, new_chunks, total_chunks=len(chunks))
+        stats["embedded"] = len(new_chunks)
+        logger.info(f"Chunks: {len(chunks)} ({len(dropped)} dropped, {len(new_chunks)} embedded)")
+
+        store = ChunkStore.from_dicts(chunks)
+        del chunks
+        postings = bm25 = generation = None
+        if persist and index is not None:
+            # BM25 statistics are corpus-wide, so it is rebuilt rather than patched.
+            postings = KeywordPostings.from_index(kw_to_chunks, store.chunk_ids())
+            bm25 = BM25Index.build(store.embedding_texts(), k1=self.cfg.bm25_k1, b=self.cfg.bm25_b)
+            generation = save_artifacts(self.cfg.index_dir, index, store, postings,
+                                        bm25=bm25, corpus_files=fingerprints, vectors=vectors,
+                                        sentences=sentences).name
+        snap = IndexSnapshot(
+            index=index, chunks=store, keyword_to_chunks=kw_to_chunks, postings=postings, bm25=bm25,
+            corpus_files=fingerprints, generation=generation, bm25_params=self._bm25_params(), vectors=vectors,
+            sentences=sentences,
+        )
+        self._publish(snap)
+        return stats
+
+    def _chunk_opts(self) -> dict:
+        return {"max_tokens": self.cfg.chunk_max_tokens, "overlap": self.cfg.chunk_overlap_tokens}
+
+    def _rerank_vectors(self, emb: np.ndarray) -> np.ndarray | None:
+        """float16 copy of the embeddings kept for re-ranking, if enabled."""
+        return emb.astype("float16") if self.cfg.rerank_factor > 1 else None
+
+    def _sentence_index(self, chunks: list[dict]) -> SentenceIndex | None:
+        """Sentence spans and embeddings of each chunk's text, if enabled."""
+        if not self.cfg.sentence_index:
+            return None
+        # Own cache and budget: sentences outnumber chunks and would evict chunk vectors.
+        return SentenceIndex.build([c["text"] for c in chunks],
+                                   lambda texts: self._embed(texts, "sentence_cache", self.cfg.sentence_cache_size))
+
+    def _build_index(self, emb: np.ndarray, vectors: np.ndarray | None = None):
+        c = self.cfg
+        return build_index(
+            emb, index_type=c.index_type, nlist=c.ivf_nlist, nprobe=c.ivf_nprobe,
+            pq_m=c.pq_m, pq_nbits=c.pq_nbits, hnsw_m=c.hnsw_m,
+            ef_construction=c.hnsw_ef_construction, ef_search=c.hnsw_ef_search,
+            recall_queries=c.index_recall_queries, storage=c.vector_storage,
+            rerank_vectors=vectors, rerank_factor=c.rerank_factor,
+        )
+
+    def _embed(self, texts: list[str], cache_dir: str = "embedding_cache", cache_size: int | None = None) -> np.ndarray:
+        def encode(batch: list[str]) -> np.ndarray:
+            workers = resolve_workers(self.cfg.embedding_workers)
+            if workers > 1 and len(batch) >= MIN_MULTIPROCESS_TEXTS:
+                return embed_texts_multiprocess(batch, self.model, workers, batch_size=self.cfg.embedding_batch_size)
+            return embed_texts(batch, self.model, batch_size=self.cfg.embedding_batch_size)
+        cache_size = self.cfg.embedding_cache_size if cache_size is None else cache_size
+        if cache_size <= 0 or not texts:
+            return encode(texts)
+        # Vectors from different backends differ slightly, so each gets its own cache.
+        backend = self.cfg.embedding_backend
+        cache = EmbeddingCache(
+            Path(self.cfg.index_dir) / cache_dir,
+            self.cfg.model_name if backend == "torch" else f"{self.cfg.model_name}@{backend}",
+            self.model.get_sentence_embedding_dimension(),
+            max_entries=cache_size,
+        )
+        return cache.embed(texts, encode)
 
     def load(self):
-        index, chunks, kw_to_chunks = load_artifacts(self.cfg.index_dir)
-        self.index = index
-        self.chunks = chunks
-        self.keyword_to_chunks = kw_to_chunks
+        b = load_bundle(self.cfg.index_dir, mmap=self.cfg.mmap_artifacts, verify=self.cfg.verify_artifacts)
+        bm25 = b.bm25 if b.bm25 is not None and b.bm25.n_docs == len(b.chunks) else None
+        self._publish(IndexSnapshot(
+            index=tune_index(b.index, nprobe=self.cfg.ivf_nprobe, ef_search=self.cfg.hnsw_ef_search),
+            chunks=b.chunks, postings=b.postings, bm25=bm25, corpus_files=b.corpus_files,
+            generation=b.generation, bm25_params=self._bm25_params(),
+            vectors=b.vectors if b.vectors is not None and len(b.vectors) == len(b.chunks) else None,
+            sentences=b.sentences if b.sentences is not None and b.sentences.n_chunks == len(b.chunks) else None,
+        ))
+
+    def reload(self) -> bool:
+        """Load the on-disk artifacts if CURRENT points at a different generation."""
+        gen = current_generation(self.cfg.index_dir)
+        with self.acquire() as snap:
+            current = snap.generation
+        if gen is not None and gen.name == current:
+            return False
+        self.load()
+        return True
 
     def ready(self) -> bool:
-        return self.index is not None and bool(self.chunks)
-    
+        with self.acquire() as snap:
+            return snap.ready()
+
     def get_chunk(self, chunk_id: str) -> dict | None:
         """Return the full chunk dict by chunk_id, or None if not found."""
-        if not self.ready():
-            raise RuntimeError("Pipeline not ready. Call build() or load() first.")
-        for ch in self.chunks:
-            if ch.get("chunk_id") == chunk_id:
-                return ch
-        return None
+        with self.acquire() as snap:
+            if not snap.ready():
+                raise RuntimeError("Pipeline not ready. Call build() or load() first.")
+            return snap.chunks.get(chunk_id)
+
+    def _vector_search_many(self, snap: IndexSnapshot, q_embs: np.ndarray, rows: list[np.ndarray | None],
+                            k: int, subset_k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Vector hits per query; all unfiltered queries share one multi-row index.search."""
+        out: list = [None] * len(rows)
+        plain = [i for i, r in enumerate(rows) if r is None]
+        if plain:
+            q = q_embs[plain]
+            if snap.vectors is not None and self.cfg.rerank_factor > 1:
+                # Over-fetch from the compressed index, then rescore with the float16 copy.
+                _, cand = snap.index.search(q, min(k * self.cfg.rerank_factor, snap.index.ntotal))
+                scores, ids = rerank(q, cand, snap.vectors, k)
+            else:
+                scores, ids = snap.index.search(q, k)
+            for j, i in enumerate(plain):
+                keep = ids[j] >= 0
+                out[i] = (scores[j][keep], ids[j][keep])
+        for i, r in enumerate(rows):
+            if r is not None:
+                out[i] = search_subset(snap.index, q_embs[i:i + 1], r, subset_k,
+                                       exact_max=self.cfg.prefilter_exact_max, vectors=snap.vectors)
+        return out
+
+    def search(
+        self,
+        query: str,
+        keywords: list[str] | None = None,
+        top_k: int | None = None,
+        pool_k: int | None = None,
+        mode: str | None = None,
+        rerank: bool | None = None,
+        rerank_budget_ms: float | None = None,
+        with_outcome: bool = False,
+    ):
+        """Return [(score, chunk)] using vector, bm25 or hybrid (fused) retrieval.
+
+        With ``with_outcome`` returns ``(hits, outcome)``, where outcome is the
+        re-rank result (``reranked``, ``cached``, ``timeout``, ...) or None.
+        """
+        hits, outcomes = self.search_batch([query], [keywords], top_k=top_k, pool_k=pool_k, mode=mode, rerank=rerank,
+                                           rerank_budget_ms=rerank_budget_ms, with_outcomes=True)
+        return (hits[0], outcomes[0]) if with_outcome else hits[0]
+
+    def search_batch(
+        self,
+        queries: list[str],
+        keywords: list[list[str] | None] | None = None,
+        top_k: int | None = None,
+        pool_k: int | None = None,
+        mode: str | None = None,
+        rerank: bool | None = None,
+        rerank_budget_ms: float | None = None,
+        with_outcomes: bool = False,
+    ):
+        """``search`` for many queries: one encode call and one FAISS search, results in input order.
+
+        With ``rerank`` the ``pool_k`` candidates are re-ordered by the
+        cross-encoder, within ``rerank_budget_ms`` for the whole batch.
+        """
+        keywords = keywords or [None] * len(queries)
+        if len(keywords) != len(queries):
+            raise ValueError("keywords must have one entry per query")
+        # Pin one snapshot so a concurrent swap can't mix index rows with another chunk store.
+        with self.acquire() as snap:
+            results, outcomes = self._search_batch(snap, queries, keywords, top_k, pool_k, mode,
+                                                   rerank=rerank, rerank_budget_ms=rerank_budget_ms)
+        return (results, outcomes) if with_outcomes else results
 
-    def search(self, query: str, keywords: list[str] | None = None, top_k: int | None = None, pool_k: int | None = None):
-        if not self.ready():
+    def search_embedded(
+        self,
+        q_embs: np.ndarray,
+        keywords: list[list[str] | None] | None = None,
+        top_k: int | None = None,
+        pool_k: int | None = None,
+    ) -> list[list[tuple[float, dict]]]:
+        """Vector search for queries that are already embedded (shards get vectors from the coordinator)."""
+        q_embs = np.atleast_2d(np.asarray(q_embs, dtype="float32"))
+        keywords = keywords or [None] * len(q_embs)
+        with self.acquire() as snap:
+            return self._search_batch(snap, [""] * len(q_embs), keywords, top_k, pool_k, "vector", q_embs=q_embs,
+                                      rerank=False)[0]
+
+    def _search_batch(self, snap: IndexSnapshot, queries, keywords, top_k, pool_k, mode, q_embs=None,
+                      rerank=None, rerank_budget_ms=None):
+        """Results per query, and per query the re-rank outcome (None when not re-ranked)."""
+        if not snap.ready():
             raise RuntimeError("Pipeline not ready. Call build() or load() first.")
         top_k = top_k or self.cfg.top_k_search
         pool_k = pool_k or self.cfg.pool_k_search
         pool_k = max(pool_k, top_k)
-        keywords = [k.lower() for k in (keywords or [])]
-
-        candidate_ids = None
-        if keywords:
-            sets = [set(self.keyword_to_chunks.get(kw, [])) for kw in keywords]
-            candidate_ids = set.intersection(*sets) if sets else None
-            if candidate_ids is not None and not candidate_ids:
-                logger.warning(f"No chunks contain all keywords: {keywords}")
-
-        q_emb = self.model.encode([query], normalize_embeddings=True)
-        q_emb = np.asarray(q_emb, dtype="float32")
-        scores, ids = self.index.search(q_emb, pool_k)
-        scores, ids = scores[0], ids[0]
-
-        results = []
-        for score, idx in zip(scores, ids):
-            if idx < 0 or idx >= len(self.chunks):
-                continue
-            ch = self.chunks[int(idx)]
-            if candidate_ids is not None and ch["chunk_id"] not in candidate_ids:
-                continue
-            results.append((float(score), ch))
-            if len(results) >= top_k:
-                break
-        return results
-
-    def answer_extractive(self, question: str, top_k: int = 5) -> dict:
-        hits = self.search(question, top_k=top_k)
-        contexts = []
-        for score, ch in hits:
-            excerpt = ch["text"].split("\n\n")[0].strip()
-            contexts.append({
+        mode = mode or self.cfg.search_mode
+        if mode not in ("vector", "bm25", "hybrid"):
+            raise ValueError(f"Unknown search mode {mode!r}; expected vector, bm25 or hybrid")
+        if self.cfg.cross_encoder_default if rerank is None else rerank:
+            # Retrieve the whole pool, then let the cross-encoder pick the top_k.
+            results, _ = self._search_batch(snap, queries, keywords, pool_k, pool_k, mode, q_embs=q_embs,
+                                            rerank=False)
+            return self._rerank(queries, results, top_k, rerank_budget_ms)
+
+        results: list[list[tuple[float, dict]]] = [[] for _ in queries]
+        outcomes = [None] * len(queries)
+        rows: list[np.ndarray | None] = []
+        active = []
+        with timer("search.filter"):
+            for i, kws in enumerate(keywords):
+                kws = [k.lower() for k in (kws or [])]
+                r = snap.postings.candidates(kws) if kws else None
+                if r is not None and not r.size:
+                    logger.warning(f"No chunks contain all keywords: {kws}")
+                    continue
+                active.append(i)
+                rows.append(r)
+        if not active:
+            return results, outcomes
+
+        vec = None
+        if mode != "bm25":
+            if q_embs is None:
+                with timer("search.encode", items=len(active)):
+                    q_embs = self.query_encoder.encode_many([queries[i] for i in active])
+            else:
+                q_embs = q_embs[active]
+            # Keyword-filtered vector search is exact, so it needs no candidate pool.
+            with timer("search.vector", items=len(active)):
+                vec = self._vector_search_many(snap, q_embs, rows, pool_k, top_k if mode == "vector" else pool_k)
+
+        with timer("search.rank"):
+            self._rank(snap, queries, active, rows, vec, results, top_k, pool_k, mode)
+        return results, outcomes
+
+    def _rerank(self, queries: list[str], results, top_k: int, budget_ms: float | None):
+        reranker = self.reranker
+        budget = (self.cfg.cross_encoder_budget_ms if budget_ms is None else budget_ms) / 1000.0
+        deadline = time.perf_counter() + budget
+        ranked = [reranker.rerank(q, hits, top_k, max(0.0, deadline - time.perf_counter()) * 1000)
+                  for q, hits in zip(queries, results)]
+        return [hits for hits, _ in ranked], [outcome for _, outcome in ranked]
+
+    def _rank(self, snap: IndexSnapshot, queries, active, rows, vec, results, top_k: int, pool_k: int, mode: str):
+        """BM25 / fusion where needed, then map row ids to chunks into ``results``."""
+        chunks = snap.chunks
+        for j, i in enumerate(active):
+            if mode == "vector":
+                scores, ids = vec[j]
+            elif mode == "bm25":
+                scores, ids = snap.bm25.search(queries[i], top_k, rows=rows[j])
+            else:
+                lex = snap.bm25.search(queries[i], pool_k, rows=rows[j])
+                if self.cfg.hybrid_fusion == "weighted":
+                    scores, ids = fuse_weighted(vec[j], lex, top_k, alpha=self.cfg.hybrid_alpha)
+                else:
+                    scores, ids = fuse_rrf([vec[j][1], lex[1]], top_k, rrf_k=self.cfg.rrf_k)
+            for score, idx in zip(scores, ids):
+                if idx < 0 or idx >= len(chunks):
+                    continue
+                results[i].append((float(score), chunks[int(idx)]))
+                if len(results[i]) >= top_k:
+                    break
+
+    @staticmethod
+    def iter_contexts(hits: list[tuple[float, dict]], spans: list[list[dict]] | None = None) -> Iterator[dict]:
+        """Excerpt search hits one at a time, so callers can stream them as they're produced.
+
+        With ``spans`` (from ``answer_hits``) the excerpt is the best-matching
+        sentences in reading order, and ``sentences`` gives their offsets in
+        the chunk text; otherwise it is the chunk's first paragraph.
+        """
+        for i, (score, ch) in enumerate(hits):
+            best = spans[i] if spans else None
+            if best:
+                excerpt = " ".join(s["text"] for s in sorted(best, key=lambda s: s["start"]))
+            else:
+                excerpt = ch["text"].split("\n\n")[0].strip()
+            ctx = {
                 "score": score,
                 "chunk_id": ch["chunk_id"],
                 "section_title": ch["section_title"],
                 "page_start": ch["page_start"],
                 "page_end": ch["page_end"],
                 "excerpt": excerpt[:800],
-            })
-        return {"question": question, "contexts": contexts}
+            }
+            if best:
+                ctx["sentences"] = best
+            yield ctx
+
+    def answer_hits(self, questions: list[str], top_k: int = 5):
+        """Search hits per question plus, per hit, its best sentences as ``{text, start, end, score}``.
+
+        Also returns the re-rank outcome per question (see ``search``).
+        """
+        with self.acquire() as snap:
+            hits, q_embs, outcomes = self.answer_retrieve(snap, questions, top_k)
+            with timer("qa.sentences"):
+                spans = self._best_sentences(snap, q_embs, hits)
+        return hits, spans, outcomes
+
+    def answer_retrieve(self, snap: IndexSnapshot, questions: list[str], top_k: int = 5):
+        """The search half of ``answer_hits``: hits, question vectors (None without sentences) and outcomes."""
+        q_embs = None
+        if snap.sentences is not None and self.cfg.answer_sentences > 0:
+            # Embedded once here and shared by the search and the sentence scoring.
+            with timer("search.encode", items=len(questions)):
+                q_embs = self.query_encoder.encode_many(questions)
+        hits, outcomes = self._search_batch(snap, questions, [None] * len(questions), top_k, None, None,
+                                            q_embs=q_embs)
+        return hits, q_embs, outcomes
+
+    def answer_context(self, snap: IndexSnapshot, q_emb: np.ndarray | None, hit: tuple[float, dict]) -> dict:
+        """One hit's context from ``answer_retrieve`` output, so a stream can send each as it is scored."""
+        with timer("qa.contexts"):
+            spans = self._best_sentences(snap, None if q_emb is None else np.atleast_2d(q_emb), [[hit]])[0]
+            return next(self.iter_contexts([hit], spans))
+
+    def _best_sentences(self, snap: IndexSnapshot, q_embs: np.ndarray | None, hits: list[list[tuple[float, dict]]]):
+        if q_embs is None or not any(hits):
+            return [None] * len(hits)
+        n = self.cfg.answer_sentences
+        out = []
+        for q, q_hits in zip(q_embs, hits):
+            rows = [snap.chunks.row_of(ch["chunk_id"]) for _, ch in q_hits]
+            best = snap.sentences.best(q, rows, n)
+            out.append([[{"text": ch["text"][a:b], "start": a, "end": b, "score": s} for s, a, b in spans]
+                        for (_, ch), spans in zip(q_hits, best)])
+        return out
+
+    def answer_extractive(self, question: str, top_k: int = 5, with_outcome: bool = False):
+        answers, outcomes = self.answer_extractive_batch([question], top_k=top_k, with_outcomes=True)
+        return (answers[0], outcomes[0]) if with_outcome else answers[0]
+
+    def answer_extractive_batch(self, questions: list[str], top_k: int = 5, with_outcomes: bool = False):
+        hits, spans, outcomes = self.answer_hits(questions, top_k=top_k)
+        with timer("qa.contexts"):
+            answers = [{"question": q, "contexts": list(self.iter_contexts(h, s))}
+                       for q, h, s in zip(questions, hits, spans)]
+        return (answers, outcomes) if with_outcomes else answers
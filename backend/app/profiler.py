@@ -0,0 +1,89 @@
+from __future__ import annotations
+from collections import Counter
+import sys
+import threading
+import time
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+MAX_DEPTH = 64
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for all threads, off by default.
+
+    A daemon thread snapshots ``sys._current_frames()`` every ``interval_ms``
+    and counts stacks, so the overhead is bounded by the sampling rate and
+    nothing is instrumented. Output is collapsed-stack text (one
+    ``frame;frame;frame count`` line per stack) for flamegraph tools.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks: Counter[str] = Counter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.interval = 0.01
+        self.samples = 0
+        self.started_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = 10.0):
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler already running")
+            self.interval = max(1.0, interval_ms) / 1000.0
+            self._stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started ({interval_ms:g} ms interval)")
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks."""
+        thread = self._thread
+        if thread is None:
+            raise RuntimeError("Profiler is not running")
+        self._stop.set()
+        thread.join()
+        self._thread = None
+        logger.info(f"Sampling profiler stopped: {self.samples} samples")
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {n}\n" for stack, n in items)
+
+    def status(self) -> dict:
+        return {"running": self.running, "samples": self.samples, "interval_ms": self.interval * 1000,
+                "started_at": self.started_at}
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            batch = []
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                batch.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(batch)
+                self.samples += 1
+
+PROFILER = SamplingProfiler()
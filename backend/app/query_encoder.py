@@ -0,0 +1,115 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+import queue
+import threading
+import time
+import numpy as np
+from .embedding_cache import normalize_text
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+class QueryEncoder:
+    """Query embedding front-end: an LRU cache plus an optional micro-batcher.
+
+    With ``batch_window_ms > 0`` concurrent callers are parked for at most that
+    long so their queries can share one ``encode`` call.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        cache_size: int = 1024,
+        batch_window_ms: float = 0.0,
+        max_batch: int = 32,
+    ):
+        self._encode = encode
+        self.cache_size = max(0, cache_size)
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cache_get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            vec = self._cache.get(key)
+            if vec is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return vec
+
+    def _cache_put(self, key: str, vec: np.ndarray):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = vec
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self._encode(texts), dtype="float32")
+
+    def encode(self, query: str) -> np.ndarray:
+        """Return a (1, dim) float32 embedding for one query."""
+        return self.encode_many([query])
+
+    def encode_many(self, queries: list[str]) -> np.ndarray:
+        """Return (n, dim) embeddings; cache misses are encoded together."""
+        keys = [normalize_text(q) for q in queries]
+        vecs: list[np.ndarray | None] = [self._cache_get(k) for k in keys]
+        missing = list(dict.fromkeys(k for k, v in zip(keys, vecs) if v is None))
+        if missing:
+            if self.batch_window > 0 and len(missing) == 1:
+                encoded = {missing[0]: self._submit(missing[0]).result()}
+            else:
+                encoded = dict(zip(missing, self._encode_batch(missing)))
+                for k, v in encoded.items():
+                    self._cache_put(k, v)
+            vecs = [encoded[k] if v is None else v for k, v in zip(keys, vecs)]
+        return np.stack(vecs).astype("float32", copy=False)
+
+    def _submit(self, text: str) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+                self._worker.start()
+        self._queue.put((text, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = list(dict.fromkeys(t for t, _ in batch))
+            try:
+                encoded = dict(zip(texts, self._encode_batch(texts)))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for k, v in encoded.items():
+                self._cache_put(k, v)
+            for t, fut in batch:
+                fut.set_result(encoded[t])
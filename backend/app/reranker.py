@@ -0,0 +1,128 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import TYPE_CHECKING
+import threading
+import time
+import numpy as np
+from .embedding_cache import normalize_text
+from .logging_utils import get_logger
+from .metrics import REGISTRY, observe
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+logger = get_logger(__name__)
+
+OUTCOMES = REGISTRY.counter("rerank_total", "Cross-encoder re-rank outcomes.", ("outcome",))
+
+# Chunk text beyond this is cut before tokenization; the model truncates at 512 tokens anyway.
+MAX_PASSAGE_CHARS = 2000
+_WORKERS = 2
+# Outcomes that returned the vector order instead of a re-ranked one.
+FALLBACKS = frozenset({"timeout", "busy", "error"})
+
+_models: dict[str, CrossEncoder] = {}
+_models_lock = threading.Lock()
+
+def get_cross_encoder(model_name: str) -> CrossEncoder:
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            # Deferred import: sentence_transformers pulls in torch.
+            from sentence_transformers import CrossEncoder
+            logger.info(f"Loading cross-encoder: {model_name}...")
+            model = _models[model_name] = CrossEncoder(model_name)
+        return model
+
+def passage(ch: dict) -> str:
+    return (ch["section_title"] + "\n" + ch["text"])[:MAX_PASSAGE_CHARS]
+
+class CrossEncoderReranker:
+    """Re-orders a candidate pool with a cross-encoder under a per-request time budget.
+
+    Uncached (query, chunk) pairs are scored in one batched ``predict`` call
+    on a small worker pool. If it does not finish within the budget the
+    caller gets the vector order back, and the call still completes in the
+    background so its scores are cached for the next identical request.
+    Requests arriving while both workers are busy fall back immediately
+    rather than queueing behind them.
+    """
+
+    def __init__(self, model, cache_size: int = 10_000, batch_size: int = 32):
+        self.model = model
+        self.cache_size = max(0, cache_size)
+        self.batch_size = batch_size
+        self._cache: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="rerank")
+        self._running = 0
+
+    def _key(self, query: str, ch: dict) -> tuple:
+        return normalize_text(query), ch["chunk_id"], hash(ch["text"])
+
+    def _score(self, query: str, keys: list[tuple], texts: list[str]) -> np.ndarray:
+        try:
+            scores = np.asarray(self.model.predict([(query, t) for t in texts], batch_size=self.batch_size,
+                                                   show_progress_bar=False), dtype="float32").reshape(-1)
+            with self._lock:
+                for k, s in zip(keys, scores):
+                    self._cache[k] = float(s)
+                    self._cache.move_to_end(k)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return scores
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def rerank(self, query: str, hits: list[tuple[float, dict]], top_k: int,
+               budget_ms: float) -> tuple[list[tuple[float, dict]], str]:
+        """Top ``top_k`` of ``hits`` by cross-encoder score, or by their input order on fallback.
+
+        Returns the hits and the outcome: ``reranked``, ``cached`` (no model
+        call needed), ``timeout``, ``busy`` or ``error``.
+        """
+        if not hits:
+            return hits, "cached"
+        t0 = time.perf_counter()
+        keys = [self._key(query, ch) for _, ch in hits]
+        with self._lock:
+            scores = [self._cache.get(k) for k in keys]
+            for k, s in zip(keys, scores):
+                if s is not None:
+                    self._cache.move_to_end(k)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        outcome = "cached"
+        if missing:
+            with self._lock:
+                busy = self._running >= _WORKERS
+                if not busy:
+                    self._running += 1
+            if busy:
+                return self._fallback(hits, top_k, "busy", t0)
+            fut: Future = self._pool.submit(self._score, query, [keys[i] for i in missing],
+                                            [passage(hits[i][1]) for i in missing])
+            remaining = budget_ms / 1000.0 - (time.perf_counter() - t0)
+            try:
+                new = fut.result(timeout=max(0.0, remaining))
+            except FutureTimeout:
+                return self._fallback(hits, top_k, "timeout", t0)
+            except Exception as e:
+                logger.warning(f"⚠ Cross-encoder failed, keeping vector order: {e}")
+                return self._fallback(hits, top_k, "error", t0)
+            for i, s in zip(missing, new):
+                scores[i] = float(s)
+            outcome = "reranked"
+        order = sorted(range(len(hits)), key=lambda i: -scores[i])[:top_k]
+        OUTCOMES.inc(outcome=outcome)
+        observe("search.rerank", time.perf_counter() - t0)
+        return [(scores[i], hits[i][1]) for i in order], outcome
+
+    def _fallback(self, hits, top_k: int, outcome: str, t0: float):
+        OUTCOMES.inc(outcome=outcome)
+        observe("search.rerank", time.perf_counter() - t0)
+        return hits[:top_k], outcome
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
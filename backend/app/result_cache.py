@@ -0,0 +1,152 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from .embedding_cache import normalize_text
+from .logging_utils import get_logger
+from .metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+LOOKUPS = REGISTRY.counter("result_cache_lookups_total", "Response cache lookups.", ("kind", "result"))
+
+# Expired and surplus sqlite rows are pruned once per this many writes.
+_PRUNE_EVERY = 100
+
+def result_key(kind: str, query: str, index_key: str, **params) -> str:
+    """Cache key for one request: endpoint, normalized query, parameters and index version."""
+    for name, value in params.items():
+        if name == "keywords" and value:
+            params[name] = sorted({k.lower() for k in value})
+    raw = json.dumps([kind, normalize_text(query), index_key, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """TTL + LRU cache of JSON responses, optionally backed by a sqlite file.
+
+    Keys include the index version, so a build, load or reload makes every
+    older entry unreachable. The in-memory tier tags each entry with its
+    version and lets old versions' entries fall off the LRU end (or expire)
+    rather than wiping the tier on every version flip, which a reload makes
+    happen repeatedly while requests on both generations are in flight. Values
+    are stored as JSON text and decoded on each hit, so callers never share a
+    mutable object. With ``path`` set, uvicorn workers on one host share
+    entries through sqlite (one connection per thread, used outside the
+    memory lock) while each keeps an in-memory front; there, other versions'
+    rows age out by TTL and size.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 300.0, path: str | None = None):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_s if ttl_s > 0 else float("inf")
+        # key -> (expires, index_key, JSON text)
+        self._mem: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._path = path if path and self.max_entries else None
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._writes = 0
+        if self._path:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            db = self._db()
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, index_key TEXT NOT NULL, "
+                       "value TEXT NOT NULL, expires REAL NOT NULL, created REAL NOT NULL)")
+            logger.info(f"Result cache shared via {self._path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _db(self) -> sqlite3.Connection | None:
+        """This thread's sqlite connection (None without a shared file)."""
+        if not self._path:
+            return None
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._path, isolation_level=None, timeout=1.0, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._lock:
+                self._conns.append(db)
+        return db
+
+    def get(self, key: str, index_key: str, kind: str = "search"):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            self._drop_expired(now)
+            entry = self._mem.get(key)
+            if entry is not None and entry[0] > now and entry[1] == index_key:
+                self._mem.move_to_end(key)
+                text = entry[2]
+            else:
+                self._mem.pop(key, None)
+                text = None
+        if text is None and (db := self._db()) is not None:
+            row = db.execute("SELECT value, expires FROM results WHERE key = ? AND index_key = ? AND expires > ?",
+                             (key, index_key, now)).fetchone()
+            if row is not None:
+                text = row[0]
+                with self._lock:
+                    self._remember(key, row[1], index_key, text)
+        LOOKUPS.inc(kind=kind, result="miss" if text is None else "hit")
+        return None if text is None else json.loads(text)
+
+    def put(self, key: str, index_key: str, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        expires = now + self.ttl
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._drop_expired(now)
+            self._remember(key, expires, index_key, text)
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if (db := self._db()) is not None:
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                       (key, index_key, text, min(expires, 1e18), now))
+            if prune:
+                self._prune(db, now)
+
+    def _remember(self, key: str, expires: float, index_key: str, text: str):
+        """Called with the lock held."""
+        self._mem[key] = (expires, index_key, text)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _drop_expired(self, now: float):
+        """Pop expired entries from the LRU end; with a fixed TTL, entries of old versions go this way too."""
+        while self._mem:
+            expires = next(iter(self._mem.values()))[0]
+            if expires > now:
+                break
+            self._mem.popitem(last=False)
+
+    def _prune(self, db: sqlite3.Connection, now: float):
+        db.execute("DELETE FROM results WHERE expires <= ?", (now,))
+        db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created DESC "
+                   "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        if (db := self._db()) is not None:
+            db.execute("DELETE FROM results")
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._path = None
+        for db in conns:
+            db.close()
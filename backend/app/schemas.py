@@ -1,20 +1,48 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class BuildRequest(BaseModel):
     pdf_path: str = Field(..., description="Path to PDF file")
     persist: bool = Field(default=True, description="Save index+metadata to data/index")
 
+class BuildCorpusRequest(BaseModel):
+    pdf_dir: Optional[str] = Field(default=None, description="Directory of PDFs (defaults to config pdf_dir)")
+    persist: bool = Field(default=True, description="Save index+metadata to data/index")
+
+class BuildShardsRequest(BaseModel):
+    pdf_dir: Optional[str] = Field(default=None, description="Directory of PDFs (defaults to config pdf_dir)")
+    num_shards: Optional[int] = Field(default=None, ge=1, description="Defaults to config num_shards")
+
 class SearchRequest(BaseModel):
     query: str
     keywords: Optional[List[str]] = None
     top_k: int = 5
     pool_k: int = 25
+    mode: Optional[Literal["vector", "bm25", "hybrid"]] = Field(default=None, description="Defaults to config search_mode")
+    stream: bool = Field(default=False, description="Stream hits as NDJSON (or SSE with Accept: text/event-stream)")
+    rerank: Optional[bool] = Field(default=None, description="Cross-encoder re-rank the pool_k candidates; "
+                                                             "defaults to config cross_encoder_default")
+    rerank_budget_ms: Optional[float] = Field(default=None, ge=0, description="Defaults to config cross_encoder_budget_ms")
 
 class QARequest(BaseModel):
     question: str
     top_k: int = 5
+    stream: bool = Field(default=False, description="Stream contexts as NDJSON (or SSE with Accept: text/event-stream)")
+
+class BatchQuery(BaseModel):
+    query: str
+    keywords: Optional[List[str]] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(..., min_length=1, max_length=1000)
+    top_k: int = 5
+    pool_k: int = 25
+    mode: Optional[Literal["vector", "bm25", "hybrid"]] = Field(default=None, description="Defaults to config search_mode")
+
+class BatchQARequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=1000)
+    top_k: int = 5
 
 class ChunkResponse(BaseModel):
     chunk_id: str
@@ -25,3 +53,9 @@ class ChunkResponse(BaseModel):
     keywords: Optional[List[str]] = None
     source_file: Optional[str] = None
     section_id: Optional[str] = None
+
+class ShardSearchRequest(BaseModel):
+    vectors: List[List[float]] = Field(..., min_length=1)
+    keywords: Optional[List[Optional[List[str]]]] = None
+    top_k: int = 5
+    pool_k: int = 25
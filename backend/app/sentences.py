@@ -0,0 +1,134 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable
+import re
+import numpy as np
+from .artifacts import save_arrays, load_arrays
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Sentence ends, paragraph breaks, and line breaks before a bullet or numbered item.
+_BREAK_RE = re.compile(r"(?<=[.!?])\s+(?=\S)|\n\s*\n|\n(?=[ \t]*(?:[•\-\*·]|\d{1,2}[.)]\s))")
+_LINE_RE = re.compile(r"[^\n]+")
+MIN_SENTENCE_CHARS = 12
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """(start, end) character offsets of the sentences in ``text``.
+
+    PDF text wraps lines mid-sentence, so single newlines only split before
+    bullets and around upper-case heading lines. Spans without a lower-case
+    letter (headings, bare codes) or shorter than MIN_SENTENCE_CHARS are dropped.
+    """
+    gaps = [m.span() for m in _BREAK_RE.finditer(text)]
+    for m in _LINE_RE.finditer(text):
+        if m.group().isupper():
+            gaps += [(m.start(), m.start()), (m.end(), m.end())]
+    gaps.sort()
+    spans, pos = [], 0
+    for a, b in gaps + [(len(text), len(text))]:
+        if a > pos:
+            spans.append(_strip(text, pos, a))
+        pos = max(pos, b)
+    return [(a, b) for a, b in spans
+            if b - a >= MIN_SENTENCE_CHARS and any(c.islower() for c in text[a:b])]
+
+def _strip(text: str, a: int, b: int) -> tuple[int, int]:
+    while a < b and text[a].isspace():
+        a += 1
+    while b > a and text[b - 1].isspace():
+        b -= 1
+    return a, b
+
+class SentenceIndex:
+    """Sentence offsets and float16 embeddings per chunk, in CSR layout.
+
+    Sentences of chunk row ``r`` are ``ptr[r]:ptr[r + 1]``, so scoring the
+    sentences of a set of hits is one gather and one matrix-vector product.
+    """
+
+    def __init__(self, ptr: np.ndarray, spans: np.ndarray, vectors: np.ndarray):
+        self.ptr = ptr
+        self.spans = spans
+        self.vectors = vectors
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.ptr) - 1
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    @classmethod
+    def build(cls, texts: list[str], embed: Callable[[list[str]], np.ndarray]) -> "SentenceIndex":
+        """Split every chunk text and embed all sentences in one batch."""
+        per_chunk = [sentence_spans(t) for t in texts]
+        counts = np.fromiter((len(s) for s in per_chunk), dtype=np.int64, count=len(per_chunk))
+        ptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum(counts)
+        spans = np.array([s for spans in per_chunk for s in spans], dtype=np.int32).reshape(-1, 2)
+        sentences = [t[a:b] for t, chunk_spans in zip(texts, per_chunk) for a, b in chunk_spans]
+        logger.info(f"Sentences: {len(sentences)} over {len(texts)} chunks")
+        if sentences:
+            vectors = np.asarray(embed(sentences)).astype("float16")
+        else:
+            vectors = np.zeros((0, 0), dtype="float16")
+        return cls(ptr, spans, vectors)
+
+    def take(self, rows) -> "SentenceIndex":
+        """Sub-index for chunk ``rows`` (in that order)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.ptr[rows + 1] - self.ptr[rows]
+        sel = _ranges(self.ptr[rows], counts)
+        ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum(counts)
+        return SentenceIndex(ptr, np.asarray(self.spans)[sel], np.asarray(self.vectors)[sel])
+
+    def concat(self, other: "SentenceIndex") -> "SentenceIndex":
+        if not len(self):
+            vectors = np.asarray(other.vectors)
+        elif not len(other):
+            vectors = np.asarray(self.vectors)
+        else:
+            vectors = np.concatenate([self.vectors, other.vectors])
+        return SentenceIndex(
+            np.concatenate([self.ptr, other.ptr[1:] + self.ptr[-1]]),
+            np.concatenate([self.spans, other.spans]),
+            vectors,
+        )
+
+    def best(self, q: np.ndarray, rows: list[int | None], n: int) -> list[list[tuple[float, int, int]]]:
+        """Top ``n`` (score, start, end) sentences of each chunk row; ``None`` rows get none."""
+        rows_ = [r if r is not None and 0 <= r < self.n_chunks else -1 for r in rows]
+        starts = np.array([self.ptr[r] if r >= 0 else 0 for r in rows_], dtype=np.int64)
+        counts = np.array([self.ptr[r + 1] - self.ptr[r] if r >= 0 else 0 for r in rows_], dtype=np.int64)
+        sel = _ranges(starts, counts)
+        if not sel.size:
+            return [[] for _ in rows]
+        scores = np.asarray(self.vectors[sel], dtype="float32") @ np.asarray(q, dtype="float32").reshape(-1)
+        out, pos = [], 0
+        for c in counts:
+            s = scores[pos:pos + c]
+            top = np.argsort(-s, kind="stable")[:n]
+            out.append([(float(s[i]), int(self.spans[sel[pos + i], 0]), int(self.spans[sel[pos + i], 1]))
+                        for i in top])
+            pos += c
+        return out
+
+    def save(self, d: Path):
+        save_arrays(d, {"ptr": self.ptr, "spans": self.spans, "vectors": self.vectors})
+
+    @classmethod
+    def load(cls, d: Path, mmap: bool = True) -> "SentenceIndex | None":
+        if not d.is_dir():
+            return None
+        a = load_arrays(d, mmap=mmap)
+        return cls(a["ptr"], a["spans"], a["vectors"])
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of ``arange(s, s + c)`` for each pair, without a Python loop."""
+    total = int(counts.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return np.arange(total, dtype=np.int64) + offsets
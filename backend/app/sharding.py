@@ -0,0 +1,227 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from dataclasses import asdict
+from itertools import chain, count
+from pathlib import Path
+import hashlib
+import heapq
+import json
+import multiprocessing as mp
+import threading
+import time
+import urllib.request
+import numpy as np
+from .config import AppConfig
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+SHARD_KEYS = ("source", "chunk_id")
+SHARDS_DIR = "shards"
+SHARDS_MANIFEST = "shards.json"
+
+Hits = list[list[tuple[float, dict]]]
+
+def shard_of(chunk: dict, num_shards: int, by: str = "source") -> int:
+    """Stable shard number for a chunk: by source document (keeps a PDF together) or by chunk_id."""
+    if by not in SHARD_KEYS:
+        raise ValueError(f"Unknown shard_by {by!r}; expected one of {SHARD_KEYS}")
+    key = (chunk.get("source_file") or "") if by == "source" else chunk["chunk_id"]
+    # A full digest, not crc32: crc32 of short similar names (SOP-1.pdf, SOP-2.pdf) clusters modulo small n.
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+def shard_dir(index_dir: str, i: int) -> Path:
+    return Path(index_dir) / SHARDS_DIR / f"shard-{i:03d}"
+
+def save_shard_manifest(index_dir: str, by: str, counts: list[int]):
+    d = Path(index_dir) / SHARDS_DIR
+    d.mkdir(parents=True, exist_ok=True)
+    shards = [{"dir": shard_dir(index_dir, i).name, "chunks": n} for i, n in enumerate(counts)]
+    tmp = d / (SHARDS_MANIFEST + ".tmp")
+    tmp.write_text(json.dumps({"num_shards": len(counts), "by": by, "shards": shards}, indent=2), encoding="utf-8")
+    tmp.replace(d / SHARDS_MANIFEST)
+
+def load_shard_manifest(index_dir: str) -> dict:
+    p = Path(index_dir) / SHARDS_DIR / SHARDS_MANIFEST
+    if not p.exists():
+        raise FileNotFoundError(f"No sharded index at {p.parent}; build one with /build/shards")
+    return json.loads(p.read_text(encoding="utf-8"))
+
+def _serve_shard(index_dir: str, cfg: dict, conn):
+    """Shard worker process: load one shard and answer (seq, vectors, keywords, top_k, pool_k) requests.
+
+    Requests are handled on ``inference_workers`` threads, so replies can come
+    back out of order; ``seq`` pairs each one with its request.
+    """
+    from .pipeline import QAPipeline
+    pipe = QAPipeline(AppConfig(**{**cfg, "index_dir": index_dir}))
+    error = None
+    try:
+        pipe.load()
+    except Exception as e:
+        error = f"{index_dir}: {e}"
+    send_lock = threading.Lock()
+
+    def handle(seq, q_embs, keywords, top_k, pool_k):
+        try:
+            if error:
+                raise RuntimeError(error)
+            reply = (seq, True, pipe.search_embedded(q_embs, keywords, top_k=top_k, pool_k=pool_k))
+        except Exception as e:
+            reply = (seq, False, str(e))
+        with send_lock:
+            conn.send(reply)
+
+    with ThreadPoolExecutor(max_workers=max(1, cfg.get("inference_workers", 1)), thread_name_prefix="shard") as pool:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                return
+            if msg is None:
+                return
+            pool.submit(handle, *msg)
+
+class ProcessShard:
+    """A shard served by a local worker process over a pipe.
+
+    Requests are pipelined: each carries a sequence number, and a reader
+    thread hands every reply to the request waiting for it, so concurrent
+    searches don't queue behind one another on the pipe.
+    """
+
+    def __init__(self, index_dir: str, cfg: AppConfig):
+        self.name = Path(index_dir).name
+        ctx = mp.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=_serve_shard, args=(index_dir, asdict(cfg), child),
+                                 name=f"shard-{self.name}", daemon=True)
+        self._proc.start()
+        child.close()
+        self._send_lock = threading.Lock()
+        self._pending: dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._seq = count(1)
+        self._reader = threading.Thread(target=self._read_replies, name=f"shard-{self.name}-reader", daemon=True)
+        self._reader.start()
+
+    def _read_replies(self):
+        while True:
+            try:
+                seq, ok, payload = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                fut = self._pending.pop(seq, None)
+            # Replies to requests that already timed out are dropped here.
+            if fut is not None:
+                fut.set_result((ok, payload))
+        with self._pending_lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for fut in pending:
+            fut.set_exception(RuntimeError("shard process exited"))
+
+    def search(self, q_embs: np.ndarray, keywords, top_k: int, pool_k: int, timeout: float) -> Hits:
+        seq, fut = next(self._seq), Future()
+        with self._pending_lock:
+            self._pending[seq] = fut
+        try:
+            with self._send_lock:
+                self._conn.send((seq, q_embs, keywords, top_k, pool_k))
+            ok, payload = fut.result(timeout=timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"no reply within {timeout * 1000:.0f} ms") from None
+        finally:
+            with self._pending_lock:
+                self._pending.pop(seq, None)
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._proc.join(timeout=5)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        self._conn.close()
+
+class HttpShard:
+    """A shard served by another API instance (``index_dir`` pointing at one shard) via POST /shard/search."""
+
+    def __init__(self, url: str):
+        self.name = url
+        self._url = url.rstrip("/") + "/shard/search"
+
+    def search(self, q_embs: np.ndarray, keywords, top_k: int, pool_k: int, timeout: float) -> Hits:
+        body = json.dumps({"vectors": np.asarray(q_embs).tolist(), "keywords": keywords,
+                           "top_k": top_k, "pool_k": pool_k}).encode("utf-8")
+        req = urllib.request.Request(self._url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            data = json.load(r)
+        return [[(h["score"], h["chunk"]) for h in hits] for hits in data["results"]]
+
+    def close(self):
+        pass
+
+class ShardedSearcher:
+    """Scatter a query batch to every shard, gather within a per-shard timeout, merge the top-k.
+
+    Scores are inner products of the same query vector, so they are
+    comparable across shards and a plain top-k merge is exact. Shards that
+    fail or time out are left out and reported, not fatal, unless all do.
+    ``concurrency`` is how many searches may be in flight at once (the
+    inference worker count); the fan-out pool has a thread per shard for each.
+    """
+
+    def __init__(self, shards: list, timeout_ms: float = 2000, concurrency: int = 1):
+        if not shards:
+            raise ValueError("ShardedSearcher needs at least one shard")
+        self.shards = shards
+        self.timeout = timeout_ms / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=len(shards) * max(1, concurrency), thread_name_prefix="shard")
+
+    def search(self, q_embs: np.ndarray, keywords=None, top_k: int = 5, pool_k: int = 25) -> tuple[Hits, dict]:
+        t0 = time.perf_counter()
+        futures = {self._pool.submit(s.search, q_embs, keywords, top_k, pool_k, self.timeout): s
+                   for s in self.shards}
+        wait(futures, timeout=self.timeout + 0.5)
+        answered, failed = [], []
+        for fut, shard in futures.items():
+            if not fut.done():
+                failed.append({"shard": shard.name, "error": "timeout"})
+            elif fut.exception() is not None:
+                e = fut.exception()
+                failed.append({"shard": shard.name, "error": "timeout" if isinstance(e, TimeoutError) else str(e)})
+            else:
+                answered.append(fut.result())
+        if not answered:
+            raise RuntimeError(f"All {len(self.shards)} shards failed: {failed}")
+        for f in failed:
+            logger.warning(f"⚠ Shard {f['shard']} left out of results: {f['error']}")
+        merged = [heapq.nlargest(top_k, chain.from_iterable(r[i] for r in answered), key=lambda h: h[0])
+                  for i in range(len(q_embs))]
+        report = {"shards": len(self.shards), "answered": len(answered), "failed": failed,
+                  "partial": bool(failed), "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+        return merged, report
+
+    def close(self):
+        for s in self.shards:
+            s.close()
+        self._pool.shutdown(wait=False)
+
+def open_shards(cfg: AppConfig) -> ShardedSearcher:
+    """HTTP shards from ``shard_urls`` if set, else one local process per shard under ``index_dir``."""
+    if cfg.shard_urls:
+        shards = [HttpShard(u) for u in cfg.shard_urls]
+    else:
+        manifest = load_shard_manifest(cfg.index_dir)
+        # Empty shards have no artifacts to load; leaving them out keeps them from reading as failures.
+        shards = [ProcessShard(str(shard_dir(cfg.index_dir, i)), cfg)
+                  for i, s in enumerate(manifest["shards"]) if s["chunks"]]
+    logger.info(f"Opened {len(shards)} shards ({'http' if cfg.shard_urls else 'local processes'})")
+    return ShardedSearcher(shards, timeout_ms=cfg.shard_timeout_ms, concurrency=cfg.inference_workers)
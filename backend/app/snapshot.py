@@ -0,0 +1,176 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Iterator
+import itertools
+import threading
+import numpy as np
+from .bm25 import BM25Index
+from .chunk_store import ChunkStore
+from .keywords import KeywordPostings
+from .logging_utils import get_logger
+from .sentences import SentenceIndex
+
+logger = get_logger(__name__)
+
+_versions = itertools.count(1)
+_UNSET = object()
+
+class IndexSnapshot:
+    """An immutable view of everything a query touches: index, chunks, keyword and BM25 indexes.
+
+    Snapshots are never modified after publication; builds and loads create
+    a new one and swap it in, so a query always sees a consistent set. The
+    keyword postings and BM25 matrix are derived lazily on first use.
+    """
+
+    def __init__(
+        self,
+        index=None,
+        chunks: ChunkStore | None = None,
+        keyword_to_chunks: dict[str, list[str]] | None = None,
+        postings: KeywordPostings | None = None,
+        bm25: BM25Index | None = None,
+        corpus_files: dict[str, str] | None = None,
+        generation: str | None = None,
+        bm25_params: tuple[float, float] = (1.2, 0.75),
+        vectors: np.ndarray | None = None,
+        sentences: SentenceIndex | None = None,
+    ):
+        self.version = next(_versions)
+        self._index = index
+        self._chunks = chunks if chunks is not None else ChunkStore.from_dicts([])
+        self._keyword_to_chunks = keyword_to_chunks
+        self._postings = postings
+        self._bm25 = bm25
+        self._corpus_files = dict(corpus_files or {})
+        self._generation = generation
+        self._bm25_params = bm25_params
+        self._vectors = vectors
+        self._sentences = sentences
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._retired = False
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def chunks(self) -> ChunkStore:
+        return self._chunks
+
+    @property
+    def corpus_files(self) -> dict[str, str]:
+        return self._corpus_files
+
+    @property
+    def generation(self) -> str | None:
+        return self._generation
+
+    @property
+    def vectors(self) -> np.ndarray | None:
+        """float16 embeddings, row-aligned with the index, for re-ranking lossy search results."""
+        return self._vectors
+
+    @property
+    def sentences(self) -> SentenceIndex | None:
+        """Sentence offsets and embeddings per chunk row, for answer spans."""
+        return self._sentences
+
+    @property
+    def postings(self) -> KeywordPostings:
+        with self._lock:
+            if self._postings is None:
+                self._postings = KeywordPostings.from_index(self._keyword_to_chunks or {}, self._chunks.chunk_ids())
+            return self._postings
+
+    @property
+    def keyword_to_chunks(self) -> dict[str, list[str]]:
+        if self._keyword_to_chunks is None:
+            postings = self.postings
+            with self._lock:
+                if self._keyword_to_chunks is None:
+                    self._keyword_to_chunks = postings.to_index(self._chunks.chunk_ids())
+        return self._keyword_to_chunks
+
+    @property
+    def bm25(self) -> BM25Index:
+        with self._lock:
+            if self._bm25 is None:
+                k1, b = self._bm25_params
+                self._bm25 = BM25Index.build(self._chunks.embedding_texts(), k1=k1, b=b)
+            return self._bm25
+
+    def ready(self) -> bool:
+        return self._index is not None and len(self._chunks) > 0
+
+    def replace(self, index=_UNSET, chunks=_UNSET, keyword_to_chunks=_UNSET, corpus_files=_UNSET) -> "IndexSnapshot":
+        """Copy with some parts swapped; derived indexes are kept only if still valid."""
+        new_chunks = self._chunks if chunks is _UNSET else (
+            chunks if isinstance(chunks, ChunkStore) else ChunkStore.from_dicts(chunks))
+        same_rows = chunks is _UNSET
+        if keyword_to_chunks is not _UNSET:
+            kw = keyword_to_chunks
+        elif same_rows:
+            kw = self._keyword_to_chunks
+        else:
+            # Row numbers change, so carry keywords over in their id-keyed form.
+            kw = self.keyword_to_chunks
+        return IndexSnapshot(
+            index=self._index if index is _UNSET else index,
+            chunks=new_chunks,
+            keyword_to_chunks=kw,
+            postings=self._postings if same_rows and keyword_to_chunks is _UNSET else None,
+            bm25=self._bm25 if same_rows else None,
+            corpus_files=self._corpus_files if corpus_files is _UNSET else corpus_files,
+            generation=None,
+            bm25_params=self._bm25_params,
+            vectors=self._vectors if same_rows and index is _UNSET else None,
+            sentences=self._sentences if same_rows else None,
+        )
+
+    def _release(self):
+        if self._index is not None:
+            logger.info(f"Released index snapshot v{self.version}")
+        self._index = None
+        self._chunks = ChunkStore.from_dicts([])
+        self._postings = self._bm25 = self._keyword_to_chunks = self._vectors = self._sentences = None
+
+class SnapshotManager:
+    """Read-copy-update holder for the live snapshot.
+
+    Readers pin the current snapshot for the duration of a request; ``swap``
+    publishes a new one immediately, and a retired snapshot drops its
+    index and chunk data as soon as its last reader finishes.
+    """
+
+    def __init__(self, snapshot: IndexSnapshot | None = None):
+        self._current = snapshot or IndexSnapshot()
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> IndexSnapshot:
+        return self._current
+
+    @contextmanager
+    def acquire(self) -> Iterator[IndexSnapshot]:
+        with self._lock:
+            snap = self._current
+            snap._refs += 1
+        try:
+            yield snap
+        finally:
+            with self._lock:
+                snap._refs -= 1
+                release = snap._retired and snap._refs == 0
+            if release:
+                snap._release()
+
+    def swap(self, snapshot: IndexSnapshot) -> IndexSnapshot:
+        with self._lock:
+            old, self._current = self._current, snapshot
+            old._retired = True
+            release = old._refs == 0
+        if release:
+            old._release()
+        return old
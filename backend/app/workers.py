@@ -0,0 +1,17 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import os
+
+def resolve_workers(workers: int) -> int:
+    """0 (or negative) means one worker per CPU."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def process_pool(workers: int, **kwargs) -> ProcessPoolExecutor:
+    """Process pool started with spawn, not fork.
+
+    Builds run on a job thread of the multi-threaded API process (torch,
+    the inference pool), and a forked child can inherit a lock another
+    thread held and deadlock on it.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"), **kwargs)
@@ -0,0 +1 @@
+"""Benchmarks for the build and query hot paths: ``python -m bench --help`` (run from ``backend/``)."""
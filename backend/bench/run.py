@@ -0,0 +1,266 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from app import pipeline as pipeline_mod
+from app.config import load_config
+from app.logging_utils import get_logger
+from app.pipeline import QAPipeline
+from .synthetic import StubModel, sop_queries, write_sop_pdf
+
+logger = get_logger(__name__)
+
+BUILD_STAGES = ("extract", "chunk", "keywords", "embed", "index", "persist")
+PERCENTILES = (50, 90, 95, 99)
+
+class _StageTimer:
+    def __init__(self):
+        self.seconds = {s: 0.0 for s in BUILD_STAGES}
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - t0
+        return timed
+
+    def wrap_pages(self, fn: Callable) -> Callable:
+        """Extraction is streamed into chunking, so time each page pulled from the iterator."""
+        def pages(*args, **kwargs):
+            it = iter(fn(*args, **kwargs))
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    page = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    self.seconds["extract"] += time.perf_counter() - t0
+                yield page
+        return pages
+
+@contextmanager
+def _timed_stages():
+    """Time the functions ``QAPipeline.build`` calls for each stage, without changing the pipeline."""
+    timer = _StageTimer()
+    patches = [
+        (pipeline_mod, "extract_pdf_pages", timer.wrap_pages(pipeline_mod.extract_pdf_pages)),
+        (pipeline_mod, "chunk_pages", timer.wrap("chunk", pipeline_mod.chunk_pages)),
+        (pipeline_mod, "build_keyword_index", timer.wrap("keywords", pipeline_mod.build_keyword_index)),
+        (pipeline_mod, "save_artifacts", timer.wrap("persist", pipeline_mod.save_artifacts)),
+        (QAPipeline, "_embed", timer.wrap("embed", QAPipeline._embed)),
+        (QAPipeline, "_build_index", timer.wrap("index", QAPipeline._build_index)),
+    ]
+    saved = [(obj, name, getattr(obj, name)) for obj, name, _ in patches]
+    for obj, name, fn in patches:
+        setattr(obj, name, fn)
+    try:
+        yield timer
+    finally:
+        for obj, name, fn in saved:
+            setattr(obj, name, fn)
+
+def bench_build(pipe: QAPipeline, pdf_path: str) -> dict:
+    """Run ``pipe.build`` once and return per-stage seconds."""
+    with _timed_stages() as timer:
+        t0 = time.perf_counter()
+        pipe.build(pdf_path=pdf_path, persist=True)
+        total = time.perf_counter() - t0
+    s = timer.seconds
+    # chunk_pages pulls the page stream, so its wall time includes extraction.
+    s["chunk"] = max(0.0, s["chunk"] - s["extract"])
+    s["other"] = max(0.0, total - sum(s.values()))
+    s["total"] = total
+    return {"seconds": {k: round(v, 4) for k, v in s.items()}, "chunks": len(pipe.chunks)}
+
+def _latency_stats(latencies: list[float], errors: int, wall: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    stats = {"requests": len(latencies) + errors, "errors": errors,
+             "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0}
+    if len(ms):
+        stats.update({f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES})
+        stats.update(mean_ms=round(float(ms.mean()), 3), max_ms=round(float(ms.max()), 3))
+    return stats
+
+def bench_queries(post: Callable[[str, dict], int], path: str, payloads: list[dict], concurrency: int) -> dict:
+    """Send ``payloads`` to ``path`` from ``concurrency`` threads; latency percentiles over 2xx replies."""
+    def one(payload: dict) -> tuple[float, bool]:
+        t0 = time.perf_counter()
+        try:
+            ok = 200 <= post(path, payload) < 300
+        except Exception:
+            ok = False
+        return time.perf_counter() - t0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, payloads))
+    wall = time.perf_counter() - t0
+    return _latency_stats([dt for dt, ok in results if ok], sum(not ok for _, ok in results), wall)
+
+def _http_post(base_url: str) -> Callable[[str, dict], int]:
+    def post(path: str, payload: dict) -> int:
+        req = urllib.request.Request(base_url.rstrip("/") + path, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as r:
+                r.read()
+                return r.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return post
+
+@contextmanager
+def _in_process_api(pipe: QAPipeline):
+    """The real FastAPI app (executor, routing, serialization) serving ``pipe`` in this process.
+
+    The app's config and inference pool come from ``pipe.cfg``; the response
+    cache is off so repeated bench queries measure the search, not a cache hit.
+    """
+    from fastapi.testclient import TestClient
+    from app import main as main_mod
+    from app.executor import InferenceExecutor
+    from app.result_cache import ResultCache
+    cfg = replace(pipe.cfg, autoload_index=False, preload_model=False, result_cache_size=0)
+    names = ("CFG", "PIPE", "EXECUTOR", "RESULTS")
+    saved = {name: getattr(main_mod, name) for name in names}
+    main_mod.CFG, main_mod.PIPE = cfg, pipe
+    main_mod.EXECUTOR = InferenceExecutor(cfg.inference_workers, cfg.inference_queue_size)
+    main_mod.RESULTS = ResultCache(max_entries=0)
+    try:
+        with TestClient(main_mod.app) as client:
+            yield lambda path, payload: client.post(path, json=payload).status_code
+    finally:
+        main_mod.EXECUTOR.shutdown()
+        for name, value in saved.items():
+            setattr(main_mod, name, value)
+
+def _meta() -> dict:
+    meta = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__}
+    try:
+        import faiss
+        meta["faiss"] = faiss.__version__
+    except ImportError:
+        pass
+    try:
+        meta["git_commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                            text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return meta
+
+def run(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory(prefix="sop-bench-") as tmp:
+        base = load_config(args.config)
+        cfg = replace(base, index_dir=str(Path(tmp) / "index"), embedding_cache_size=0,
+                      embedding_workers=args.embedding_workers)
+        pdf = write_sop_pdf(Path(tmp) / "synthetic.pdf", args.pages, sections_per_page=args.sections_per_page,
+                            lines_per_section=args.lines_per_section, seed=args.seed)
+        pipe = QAPipeline(cfg)
+        if args.real_model:
+            logger.info(f"Using real embedding model: {cfg.model_name}")
+        else:
+            pipe.model = StubModel(dim=args.dim)
+
+        builds = [bench_build(pipe, str(pdf)) for _ in range(args.build_repeats)]
+        # Fastest run per stage: the least noisy estimate of each stage's cost.
+        build = {"chunks": builds[-1]["chunks"],
+                 "seconds": {k: min(b["seconds"][k] for b in builds) for k in builds[-1]["seconds"]}}
+
+        queries = sop_queries(args.requests + args.warmup, seed=args.seed + 1)
+        endpoints = {
+            "search": ("/search", [{"query": q, "top_k": 5, "pool_k": 25} for q in queries]),
+            "qa": ("/qa", [{"question": q, "top_k": 5} for q in queries]),
+        }
+        ctx = _in_process_api(pipe) if not args.url else nullcontext(_http_post(args.url))
+        results = {}
+        with ctx as post:
+            for name, (path, payloads) in endpoints.items():
+                for p in payloads[:args.warmup]:
+                    post(path, p)
+                results[name] = bench_queries(post, path, payloads[args.warmup:], args.concurrency)
+                logger.info(f"• {path}: p50 {results[name].get('p50_ms')} ms, "
+                            f"p99 {results[name].get('p99_ms')} ms, {results[name]['throughput_rps']} req/s")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("command", "out", "config")}
+    return {"meta": _meta(), "params": params,
+            "config": {k: v for k, v in asdict(cfg).items() if k not in ("index_dir", "pdf_path", "pdf_dir")},
+            "build": {"pages": args.pages, **build}, "queries": results}
+
+def _flatten(d: dict, prefix: str = "") -> dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+def compare(old: dict, new: dict) -> list[str]:
+    """One line per build/query metric: old, new and relative change."""
+    a = _flatten({"build": old.get("build", {}), "queries": old.get("queries", {})})
+    b = _flatten({"build": new.get("build", {}), "queries": new.get("queries", {})})
+    lines = []
+    for key in sorted(a.keys() & b.keys()):
+        change = f"{(b[key] - a[key]) / a[key] * 100:+.1f}%" if a[key] else "n/a"
+        lines.append(f"{key:<40} {a[key]:>12g} {b[key]:>12g} {change:>9}")
+    return lines
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Build and query benchmarks")
+    sub = parser.add_subparsers(dest="command")
+    r = sub.add_parser("run", help="benchmark build stages and /search, /qa latency (default)")
+    r.add_argument("--pages", type=int, default=200)
+    r.add_argument("--sections-per-page", type=int, default=2)
+    r.add_argument("--lines-per-section", type=int, default=6)
+    r.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+    r.add_argument("--warmup", type=int, default=20)
+    r.add_argument("--concurrency", type=int, default=8)
+    r.add_argument("--build-repeats", type=int, default=1)
+    r.add_argument("--embedding-workers", type=int, default=1)
+    r.add_argument("--dim", type=int, default=384, help="stub model embedding dimension")
+    r.add_argument("--real-model", action="store_true", help="use config model_name instead of the stub")
+    r.add_argument("--url", help="load-test a running API instead of the in-process app (build still runs locally)")
+    r.add_argument("--config", help="config.yaml to start from (index_dir is always a temp dir)")
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--out", help="write JSON results here (default: stdout)")
+    c = sub.add_parser("compare", help="diff two result files")
+    c.add_argument("old")
+    c.add_argument("new")
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("run", "compare", "-h", "--help"):
+        argv = ["run", *argv]
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        old, new = (json.loads(Path(p).read_text(encoding="utf-8")) for p in (args.old, args.new))
+        print("\n".join(compare(old, new)))
+        return 0
+    result = json.dumps(run(args), indent=2)
+    if args.out:
+        Path(args.out).write_text(result + "\n", encoding="utf-8")
+        logger.info(f"Results written to {args.out}")
+    else:
+        print(result)
+    return 0
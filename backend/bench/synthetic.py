@@ -0,0 +1,106 @@
+from __future__ import annotations
+from pathlib import Path
+import random
+import zlib
+
+import numpy as np
+
+TITLES = [
+    "PURPOSE", "SCOPE", "RESPONSIBILITIES", "DEFINITIONS", "PROCEDURE", "DEVIATION HANDLING",
+    "CALIBRATION", "CLEANING", "TRAINING", "DOCUMENTATION", "CHANGE CONTROL", "REFERENCES",
+]
+WORDS = (
+    "operator supervisor quality assurance batch record deviation investigation root cause corrective "
+    "preventive action calibration balance logbook equipment cleaning validation protocol approval "
+    "signature review sample specification release inspection audit training qualification procedure "
+    "document archive retention backup access system change request incident escalation priority "
+    "temperature humidity pressure filter gasket valve torque label storage warehouse shipment"
+).split()
+CODES = ["V-2231", "SOP-104", "QA-17", "EQ-550", "CR-2024-09", "PRV-12"]
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), rng.choice(CODES))
+    return " ".join(words).capitalize() + "."
+
+def sop_page_lines(page: int, sections_per_page: int, lines_per_section: int, rng: random.Random) -> list[str]:
+    """Lines of one page: numbered upper-case headings, each followed by short body lines."""
+    lines = []
+    for s in range(sections_per_page):
+        n = (page - 1) * sections_per_page + s + 1
+        lines.append(f"{n % 99 or 99} {rng.choice(TITLES)}")
+        lines.extend(_sentence(rng) for _ in range(lines_per_section))
+    return lines
+
+def sop_pages(num_pages: int, sections_per_page: int = 2, lines_per_section: int = 6,
+              source_file: str = "synthetic.pdf", seed: int = 0) -> list[dict]:
+    """Page dicts shaped like ``extract_pdf_pages`` output, for benchmarks that skip the PDF."""
+    rng = random.Random(seed)
+    return [{"page": p, "source_file": source_file,
+             "text": "\n".join(sop_page_lines(p, sections_per_page, lines_per_section, rng))}
+            for p in range(1, num_pages + 1)]
+
+def _pdf_string(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_sop_pdf(path: str | Path, num_pages: int, sections_per_page: int = 2, lines_per_section: int = 6,
+                  seed: int = 0) -> Path:
+    """Write a text-only PDF of SOP-style pages (one Helvetica line per text line, ASCII only)."""
+    rng = random.Random(seed)
+    objects: list[bytes] = [b"", b""]  # catalog and page tree are filled in last
+    font = len(objects) + 1
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for p in range(1, num_pages + 1):
+        lines = sop_page_lines(p, sections_per_page, lines_per_section, rng)
+        body = "BT /F1 9 Tf 11 TL 40 800 Td\n" + "".join(f"({_pdf_string(l)}) '\n" for l in lines) + "ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (content, font))
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(bytes(out))
+    return path
+
+def sop_queries(n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7))) for _ in range(n)]
+
+class StubModel:
+    """Deterministic hashed bag-of-words embedder with the SentenceTransformer methods the service uses.
+
+    Needs no download, and similar texts get similar vectors, so search
+    work (filters, re-ranking, answer extraction) is realistic.
+    """
+
+    def __init__(self, dim: int = 384):
+        self._dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self._dim
+
+    def encode(self, texts, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs):
+        out = np.zeros((len(texts), self._dim), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in (t or "").lower().split():
+                h = zlib.crc32(w.encode("utf-8"))
+                out[i, h % self._dim] += 1.0 if (h >> 20) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
@@ -1,4 +1,5 @@
-
+import json
+import time
 import numpy as np
 import pytest
 faiss = pytest.importorskip("faiss")
@@ -11,6 +12,8 @@ def test_health_endpoint():
     r = client.get("/health")
     assert r.status_code == 200
     assert "status" in r.json()
+    assert r.json()["alive"] is True
+    assert {"model_loaded", "index_loaded"} <= set(r.json())
 
 def test_build_and_search_endpoints(monkeypatch, tmp_path, dummy_model):
     mainmod.CFG.index_dir = str(tmp_path)
@@ -29,13 +32,95 @@ def test_build_and_search_endpoints(monkeypatch, tmp_path, dummy_model):
 
     client = TestClient(mainmod.app)
     r = client.post("/build", json={"pdf_path":"data/pdfs/x.pdf","persist":False})
-    assert r.status_code == 200
+    assert r.status_code == 202
 
     r2 = client.post("/search", json={"query":"hello","keywords":["hello"],"top_k":1,"pool_k":5})
     assert r2.status_code == 200
     assert isinstance(r2.json(), list)
 
 
+@pytest.fixture()
+def client(monkeypatch, tmp_path, dummy_model):
+    """API over a one-chunk in-memory index, with an empty result cache."""
+    from app.result_cache import ResultCache
+    monkeypatch.setattr(mainmod.CFG, "index_dir", str(tmp_path))
+    monkeypatch.setattr(mainmod, "RESULTS", ResultCache())
+    mainmod.PIPE.index = faiss.IndexFlatIP(8)
+    mainmod.PIPE.index.add(np.eye(8, dtype="float32"))
+    mainmod.PIPE.chunks = [{
+        "chunk_id": "c0", "section_title": "T", "text": "Hello",
+        "page_start": 1, "page_end": 1, "keywords": ["hello"]
+    }]
+    mainmod.PIPE.keyword_to_chunks = {"hello": ["c0"]}
+    mainmod.PIPE.model = dummy_model
+    return TestClient(mainmod.app)
+
+def _records(r) -> list[dict]:
+    return [json.loads(line) for line in r.text.splitlines()]
+
+def test_build_job_is_polled_until_done(client, monkeypatch):
+    monkeypatch.setattr("app.main.PIPE.build", lambda pdf_path, persist=True: None)
+    r = client.post("/build", json={"pdf_path": "data/pdfs/x.pdf", "persist": False})
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "succeeded"
+
+def test_search_and_qa_batch_endpoints(client):
+    r = client.post("/search/batch", json={"queries": [{"query": "hello", "keywords": ["hello"]}, {"query": "x"}],
+                                           "top_k": 1})
+    assert r.status_code == 200
+    assert [q["query"] for q in r.json()] == ["hello", "x"]
+    assert r.json()[0]["results"][0]["chunk_id"] == "c0"
+
+    r = client.post("/qa/batch", json={"questions": ["hello", "x"], "top_k": 1})
+    assert r.status_code == 200
+    assert [a["question"] for a in r.json()] == ["hello", "x"]
+
+def test_qa_and_search_stream(client):
+    r = client.post("/qa", json={"question": "hello", "top_k": 1, "stream": True})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    records = _records(r)
+    assert [rec["type"] for rec in records] == ["context", "summary"]
+    assert records[0]["chunk_id"] == "c0" and records[1]["count"] == 1
+
+    r = client.post("/search", json={"query": "hello", "top_k": 1, "stream": True},
+                    headers={"Accept": "text/event-stream"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text.startswith("event: hit\ndata: ") and "event: summary" in r.text
+
+def test_qa_stream_is_cached_like_plain_qa(client):
+    first = client.post("/qa", json={"question": "hello", "top_k": 1, "stream": True})
+    assert first.headers["x-cache"] == "miss"
+    assert [r["type"] for r in _records(first)] == ["context", "summary"]
+    second = client.post("/qa", json={"question": "hello", "top_k": 1, "stream": True})
+    assert second.headers["x-cache"] == "hit"
+    assert _records(second)[0] == _records(first)[0]
+    plain = client.post("/qa", json={"question": "hello", "top_k": 1})
+    assert plain.headers["x-cache"] == "hit" and plain.json()["contexts"][0]["chunk_id"] == "c0"
+
+def test_server_timing_and_metrics(client, monkeypatch):
+    monkeypatch.setattr(mainmod.CFG, "server_timing", True)
+    r = client.post("/search", json={"query": "a new query", "top_k": 1})
+    stages = {part.split(";")[0] for part in r.headers["server-timing"].split(", ")}
+    assert {"search-filter", "search-encode", "search-vector", "serialize", "total"} <= stages
+
+    metrics = client.get("/metrics").text
+    assert 'sop_qa_http_requests_total{method="POST",path="/search",status="200"}' in metrics
+    assert 'sop_qa_stage_seconds_count{stage="search.vector"}' in metrics
+
+def test_repeat_search_is_served_from_cache(client):
+    first = client.post("/search", json={"query": "a new query", "top_k": 1})
+    assert first.headers["x-cache"] == "miss"
+    again = client.post("/search", json={"query": "a  new query", "top_k": 1})
+    assert again.headers["x-cache"] == "hit" and again.json() == first.json()
+    mainmod.PIPE.keyword_to_chunks = {"hello": ["c0"]}  # publishes a new snapshot
+    assert client.post("/search", json={"query": "a new query", "top_k": 1}).headers["x-cache"] == "miss"
+
 def test_get_chunk_endpoint(monkeypatch, tmp_path):
     mainmod.CFG.index_dir = str(tmp_path)
     # Make pipeline "ready"
@@ -48,3 +133,25 @@ def test_get_chunk_endpoint(monkeypatch, tmp_path):
     r = client.get("/chunks/cid")
     assert r.status_code == 200
     assert r.json()["chunk_id"] == "cid"
+
+
+def test_build_job_failure_is_reported(monkeypatch):
+    def boom(pdf_path, persist=True):
+        raise FileNotFoundError("PDF not found: nope.pdf")
+    monkeypatch.setattr("app.main.PIPE.build", boom)
+    client = TestClient(mainmod.app)
+    job_id = client.post("/build", json={"pdf_path": "nope.pdf"}).json()["job_id"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] == "failed":
+            break
+        time.sleep(0.01)
+    assert job["error"] == "PDF not found: nope.pdf"
+    assert client.get("/jobs/unknown").status_code == 404
+
+def test_search_returns_503_when_executor_saturated(client, monkeypatch):
+    from app.executor import InferenceExecutor
+    monkeypatch.setattr(mainmod, "EXECUTOR", InferenceExecutor(max_workers=1, max_queue=0))
+    mainmod.EXECUTOR._inflight = 1
+    r = client.post("/search", json={"query": "hello"})
+    assert r.status_code == 503
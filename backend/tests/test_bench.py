@@ -0,0 +1,36 @@
+import json
+import pytest
+faiss = pytest.importorskip("faiss")
+
+from app.chunking import chunk_pages
+from app.pdf_loader import extract_pdf_pages
+from app import main as main_mod
+from app.config import AppConfig
+from app.pipeline import QAPipeline
+from bench.run import BUILD_STAGES, _in_process_api, compare, main
+from bench.synthetic import sop_pages, write_sop_pdf
+
+def test_synthetic_pdf_extracts_to_sop_sections(tmp_path):
+    pdf = write_sop_pdf(tmp_path / "s.pdf", num_pages=3, sections_per_page=2)
+    pages = extract_pdf_pages(str(pdf), workers=1)
+    assert [p["text"] for p in pages] == [p["text"] for p in sop_pages(3, sections_per_page=2)]
+    assert len(chunk_pages(pages)) == 6
+
+def test_bench_run_writes_comparable_json(tmp_path):
+    out = tmp_path / "result.json"
+    assert main(["--pages", "4", "--requests", "5", "--warmup", "1", "--concurrency", "2",
+                 "--dim", "16", "--out", str(out)]) == 0
+    result = json.loads(out.read_text())
+    assert set(BUILD_STAGES) <= set(result["build"]["seconds"])
+    for endpoint in ("search", "qa"):
+        assert result["queries"][endpoint]["errors"] == 0
+        assert "p99_ms" in result["queries"][endpoint]
+    assert any(line.startswith("queries.search.p50_ms") for line in compare(result, result))
+
+def test_in_process_api_uses_bench_config_without_result_cache():
+    saved = main_mod.CFG, main_mod.EXECUTOR, main_mod.RESULTS
+    pipe = QAPipeline(AppConfig(inference_workers=3, inference_queue_size=5, server_timing=True))
+    with _in_process_api(pipe):
+        assert main_mod.PIPE is pipe and main_mod.CFG.server_timing
+        assert main_mod.EXECUTOR.capacity == 8 and not main_mod.RESULTS.enabled
+    assert (main_mod.CFG, main_mod.EXECUTOR, main_mod.RESULTS) == saved
@@ -0,0 +1,40 @@
+
+import math
+import numpy as np
+from app.bm25 import BM25Index, fuse_rrf, fuse_weighted, tokenize
+
+TEXTS = [
+    "Calibrate gauge PN-4471 before each shift.",
+    "Cleaning procedure for mixing tanks and gauge housings.",
+    "Archive batch records after release.",
+]
+
+def test_bm25_matches_reference_formula():
+    bm = BM25Index.build(TEXTS, k1=1.2, b=0.75)
+    toks = [tokenize(t) for t in TEXTS]
+    avgdl = sum(map(len, toks)) / len(toks)
+    def ref(term, doc):
+        tf = doc.count(term)
+        df = sum(term in d for d in toks)
+        idf = math.log1p((len(toks) - df + 0.5) / (df + 0.5))
+        return idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(doc) / avgdl))
+    expected = [ref("gauge", d) + ref("pn-4471", d) for d in toks]
+    assert np.allclose(bm.score("gauge PN-4471"), expected, atol=1e-5)
+
+def test_bm25_search_filters_and_roundtrip(tmp_path):
+    bm = BM25Index.build(TEXTS)
+    scores, rows = bm.search("pn-4471 gauge", k=5)
+    assert rows.tolist() == [0, 1]
+    _, rows = bm.search("gauge", k=5, rows=np.array([1, 2]))
+    assert rows.tolist() == [1]
+    assert bm.search("unknownterm", k=5)[1].size == 0
+    bm.save(tmp_path / "bm25")
+    bm2 = BM25Index.load(tmp_path / "bm25")
+    assert np.allclose(bm2.score("gauge"), bm.score("gauge"))
+
+def test_fusion():
+    _, rows = fuse_rrf([np.array([1, 2, 3]), np.array([3, 1])], k=2)
+    assert rows.tolist() == [1, 3]
+    _, rows = fuse_weighted((np.array([0.9, 0.1]), np.array([5, 6])), (np.array([10.0, 1.0]), np.array([6, 7])), k=3, alpha=0.5)
+    assert rows.tolist()[0] in (5, 6)
+    assert set(rows.tolist()) == {5, 6, 7}
@@ -0,0 +1,30 @@
+
+from app.chunk_store import ChunkStore, PackedStrings
+
+CHUNKS = [
+    {"chunk_id": "a1", "section_id": "1", "section_title": "1. PURPOSE", "text": "Purpose text – åäö",
+     "page_start": 1, "page_end": 1, "source_file": "x.pdf", "keywords": ["purpose", "åäö"], "text_hash": "h1"},
+    {"chunk_id": "b2", "section_id": None, "section_title": "FULL_PAGE", "text": "More",
+     "page_start": 2, "page_end": 4, "source_file": "x.pdf", "keywords": []},
+]
+
+def test_packed_strings_roundtrip():
+    ps = PackedStrings.pack(["", "abc", "åäö"])
+    assert list(ps) == ["", "abc", "åäö"]
+
+def test_chunk_store_roundtrip_and_lookup():
+    store = ChunkStore.from_dicts(CHUNKS)
+    assert len(store) == 2
+    assert store[0] == CHUNKS[0]
+    assert store[-1] == CHUNKS[1]
+    assert store.get("b2")["page_end"] == 4
+    assert store.get("zz") is None
+    assert store.row_of("a1") == 0
+    assert store.embedding_texts()[1] == "FULL_PAGE\nMore"
+    # source file and shared strings are stored once
+    assert list(store._strings).count("x.pdf") == 1
+
+def test_chunk_store_fills_missing_optional_fields():
+    store = ChunkStore.from_dicts([{"chunk_id": "c", "section_title": "T", "text": "Hi", "page_start": 1, "page_end": 1}])
+    ch = store[0]
+    assert ch["source_file"] is None and ch["section_id"] is None and ch["keywords"] == []
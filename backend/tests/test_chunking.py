@@ -1,5 +1,4 @@
-
-from app.chunking import chunk_pages
+from app.chunking import chunk_pages, iter_chunks
 
 def test_chunk_pages_with_headings():
     pages = [{
@@ -18,3 +17,34 @@ def test_chunk_pages_full_page_fallback():
     chunks = chunk_pages(pages)
     assert len(chunks) == 1
     assert chunks[0]["section_title"] == "FULL_PAGE"
+
+def test_sections_span_page_boundaries():
+    pages = [
+        {"page": 1, "source_file": "x.pdf", "text": "Cover text\n1 PURPOSE\nThis is the purpose."},
+        {"page": 2, "source_file": "x.pdf", "text": "More purpose on page two.\n2 SCOPE\nThis is the scope."},
+        {"page": 3, "source_file": "x.pdf", "text": "Scope continues without any heading."},
+    ]
+    chunks = chunk_pages(pages)
+    assert [c["section_title"] for c in chunks] == ["FULL_PAGE", "1. PURPOSE", "2. SCOPE"]
+    purpose, scope = chunks[1], chunks[2]
+    assert (purpose["page_start"], purpose["page_end"]) == (1, 2)
+    assert "More purpose on page two." in purpose["text"]
+    assert (scope["page_start"], scope["page_end"]) == (2, 3)
+    assert scope["text"].endswith("Scope continues without any heading.")
+
+def test_iter_chunks_is_streaming():
+    def pages():
+        yield {"page": 1, "source_file": "x.pdf", "text": "1 PURPOSE\nThis is the purpose."}
+        yield {"page": 2, "source_file": "x.pdf", "text": "2 SCOPE\nThis is the scope."}
+        raise AssertionError("read past the page that closed the first section")
+    assert next(iter_chunks(pages()))["section_id"] == "1"
+
+def test_max_tokens_splits_with_overlap():
+    words = " ".join(f"w{i}" for i in range(25))
+    pages = [{"page": 1, "source_file": "x.pdf", "text": "1 PURPOSE\n" + words}]
+    chunks = chunk_pages(pages, max_tokens=10, overlap=2)
+    assert len(chunks) == 4
+    assert chunks[0]["text"].startswith("1 PURPOSE") and chunks[1]["text"].split()[:2] == ["w6", "w7"]
+    assert chunks[-1]["text"].endswith("w24")
+    assert len({c["chunk_id"] for c in chunks}) == 4
+    assert chunk_pages(pages)[0]["chunk_id"] == chunks[0]["chunk_id"]
@@ -13,3 +13,8 @@ def test_load_config_from_yaml(tmp_path: Path):
     cfg = load_config(str(p))
     assert cfg.pdf_path == "data/pdfs/x.pdf"
     assert cfg.embedding_batch_size == 7
+
+def test_load_config_list_field(tmp_path: Path):
+    p = tmp_path / "cfg.yaml"
+    p.write_text("shard_urls:\n  - http://a:8000\n  - http://b:8000\n", encoding="utf-8")
+    assert load_config(str(p)).shard_urls == ["http://a:8000", "http://b:8000"]
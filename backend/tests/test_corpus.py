@@ -0,0 +1,28 @@
+
+from pathlib import Path
+from app.corpus import (
+    plan_corpus_update, scan_pdf_dir, file_fingerprint, chunk_text_hash,
+    save_corpus_manifest, load_corpus_manifest,
+)
+
+def test_plan_corpus_update():
+    plan = plan_corpus_update({"a.pdf": "1", "b.pdf": "2", "c.pdf": "3"}, {"a.pdf": "1", "b.pdf": "x", "d.pdf": "4"})
+    assert plan.added == ["c.pdf"]
+    assert plan.changed == ["b.pdf"]
+    assert plan.removed == ["d.pdf"]
+    assert plan.unchanged == ["a.pdf"]
+    assert not plan.is_noop()
+
+def test_scan_fingerprint_and_manifest_roundtrip(tmp_path: Path):
+    (tmp_path / "my doc.pdf").write_bytes(b"abc")
+    (tmp_path / "notes.txt").write_bytes(b"ignored")
+    files = scan_pdf_dir(str(tmp_path))
+    assert list(files) == ["my_doc.pdf"]
+    fp = file_fingerprint(files["my_doc.pdf"])
+    save_corpus_manifest(str(tmp_path), {"my_doc.pdf": fp})
+    assert load_corpus_manifest(str(tmp_path)) == {"my_doc.pdf": fp}
+
+def test_chunk_text_hash_tracks_text():
+    a = {"section_title": "1 PURPOSE", "text": "x"}
+    assert chunk_text_hash(a) == chunk_text_hash(dict(a))
+    assert chunk_text_hash(a) != chunk_text_hash({**a, "text": "y"})
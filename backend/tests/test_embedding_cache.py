@@ -0,0 +1,75 @@
+
+import numpy as np
+from app.embedding_cache import EmbeddingCache
+
+def _encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.stack([np.full(4, len(t), dtype="float32") for t in texts])
+    return encode
+
+def test_embedding_cache_hits_and_persistence(tmp_path):
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=4)
+    out = cache.embed(["aa", "bbb", "aa"], _encoder(calls))
+    assert calls == [["aa", "bbb"]]
+    assert out[:, 0].tolist() == [2, 3, 2]
+
+    calls.clear()
+    cache2 = EmbeddingCache(tmp_path, "m", dim=4)
+    out2 = cache2.embed(["bbb", " aa ", "cccc"], _encoder(calls))
+    assert calls == [["cccc"]]  # " aa " normalizes to "aa"
+    assert out2[:, 0].tolist() == [3, 2, 4]
+    assert (cache2.hits, cache2.misses) == (2, 1)
+
+def test_embedding_cache_is_per_model(tmp_path):
+    calls = []
+    EmbeddingCache(tmp_path, "m1", dim=4).embed(["x1y"], _encoder(calls))
+    EmbeddingCache(tmp_path, "m2", dim=4).embed(["x1y"], _encoder(calls))
+    assert len(calls) == 2
+
+def test_embedding_cache_lru_eviction(tmp_path):
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=4, max_entries=2)
+    cache.embed(["a1", "b22"], _encoder(calls))
+    cache.embed(["a1"], _encoder(calls))          # touch a1
+    cache.embed(["c333"], _encoder(calls))        # evicts b22
+    assert len(cache) == 2
+    calls.clear()
+    cache.embed(["a1", "b22"], _encoder(calls))
+    assert calls == [["b22"]]
+
+def test_embedding_cache_crash_while_reusing_rows_never_serves_wrong_vectors(tmp_path):
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=4, max_entries=2)
+    cache.embed(["a1", "b22"], _encoder(calls))
+    # Evicting a1 reuses its row; simulate a crash after the row is written but before the put is logged.
+    cache.put_many([cache.key("c333")], np.full((1, 4), 4, dtype="float32"))
+    log = tmp_path / "m" / "index.log"
+    lines = log.read_bytes().splitlines(keepends=True)
+    log.write_bytes(b"".join(lines[:-1]) + lines[-1][:5])
+    calls.clear()
+    out = EmbeddingCache(tmp_path, "m", dim=4, max_entries=2).embed(["a1", "b22", "c333"], _encoder(calls))
+    assert calls == [["a1", "c333"]] and out[:, 0].tolist() == [2, 3, 4]
+
+def test_embedding_cache_shared_between_instances(tmp_path):
+    calls = []
+    a = EmbeddingCache(tmp_path, "m", dim=4, max_entries=3)
+    b = EmbeddingCache(tmp_path, "m", dim=4, max_entries=3)
+    a.embed(["a1"], _encoder(calls))
+    b.embed(["a1", "b22"], _encoder(calls))
+    a.embed(["b22", "c333", "d4444"], _encoder(calls))  # evicts a1 for both
+    assert calls == [["a1"], ["b22"], ["c333", "d4444"]]
+    calls.clear()
+    out = b.embed(["a1", "d4444"], _encoder(calls))
+    assert calls == [["a1"]] and out[:, 0].tolist() == [2, 5] and len(b) == 3
+
+def test_embedding_cache_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.embedding_cache._MIN_CAPACITY", 1)
+    calls = []
+    cache = EmbeddingCache(tmp_path, "m", dim=4, max_entries=2)
+    for _ in range(20):
+        cache.embed(["a1", "b22"], _encoder(calls))
+    log = (tmp_path / "m" / "index.log").read_text().splitlines()
+    assert len(log) <= 1 + 4 * 2 + 1
+    assert len(calls) == 1 and len(EmbeddingCache(tmp_path, "m", dim=4, max_entries=2)) == 2
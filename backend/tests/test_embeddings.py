@@ -1,5 +1,6 @@
 
 import numpy as np
+import pytest
 from app.embeddings import embed_texts
 
 def test_embed_texts_with_dummy_model(dummy_model):
@@ -8,3 +9,51 @@ def test_embed_texts_with_dummy_model(dummy_model):
     assert isinstance(emb, np.ndarray)
     assert emb.shape[0] == 2
     assert emb.shape[1] == dummy_model.get_sentence_embedding_dimension()
+
+def test_parity_check_flags_disagreeing_backend(dummy_model):
+    from app.embeddings import parity_check, get_model
+
+    class Shifted(type(dummy_model)):
+        def encode(self, texts, **kwargs):
+            return np.roll(super().encode(texts, **kwargs), 1, axis=1)
+
+    texts = ["a", "bb", "ccc"]
+    assert parity_check(dummy_model, dummy_model, texts)["passed"]
+    report = parity_check(dummy_model, Shifted(dim=8), texts)
+    assert not report["passed"] and report["min_cosine"] == 0.0
+    with pytest.raises(ValueError):
+        get_model("m", backend="tensorrt")
+
+def test_embed_texts_multiprocess_sorts_and_restores_order(dummy_model):
+    from app.embeddings import embed_texts_multiprocess
+
+    class PoolModel(type(dummy_model)):
+        seen = None
+
+        def start_multi_process_pool(self, target_devices):
+            return {"processes": target_devices}
+
+        def stop_multi_process_pool(self, pool):
+            pool["stopped"] = True
+
+        def encode(self, texts, pool=None, chunk_size=None, **kwargs):
+            PoolModel.seen = list(texts)
+            return super().encode(texts)
+
+    model = PoolModel(dim=8)
+    texts = ["a", "abcdef", "abc", "ab", "abcdefg"]
+    emb = embed_texts_multiprocess(texts, model, workers=2, batch_size=2)
+    assert [len(t) for t in PoolModel.seen] == [7, 6, 3, 2, 1]
+    np.testing.assert_array_equal(emb, dummy_model.encode(texts))
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx_int8"])
+def test_onnx_backend_matches_torch_reference(backend):
+    pytest.importorskip("onnxruntime")
+    from app.config import AppConfig
+    from app.embeddings import check_backend_parity, get_model
+    model_name = AppConfig().model_name
+    try:
+        model = get_model(model_name, backend=backend)
+    except OSError as e:  # model files not downloaded and no network
+        pytest.skip(f"{model_name} ({backend}) unavailable: {e}")
+    assert check_backend_parity(model_name, model)["passed"]
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+from app.executor import InferenceExecutor
+
+def test_cancelled_request_keeps_its_slot_until_the_work_finishes():
+    ex = InferenceExecutor(max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        task = asyncio.create_task(ex.run(work))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert ex.depth == 1
+        release.set()
+        for _ in range(100):
+            if ex.depth == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert ex.depth == 0
+
+    asyncio.run(scenario())
+    ex.shutdown()
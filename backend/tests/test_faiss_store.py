@@ -15,3 +15,116 @@ def test_build_save_load_artifacts(tmp_path):
     assert idx2.ntotal == 4
     assert chunks2[0]["chunk_id"] == "c1"
     assert "x" in kw2
+
+def _unit_vectors(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    v = rng.standard_normal((n, dim)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+def test_build_ann_index_and_reload(tmp_path, index_type):
+    from app.faiss_store import recall_at_k, tune_index
+    emb = _unit_vectors(1200)
+    index = build_index(emb, index_type=index_type, nlist=16, nprobe=16, pq_m=4, pq_nbits=8, recall_queries=0)
+    assert index.ntotal == 1200
+    assert recall_at_k(index, emb, k=5, n_queries=50) > 0.5
+    save_artifacts(str(tmp_path), index, [], {})
+    idx2, _, _ = load_artifacts(str(tmp_path))
+    tune_index(idx2, nprobe=4, ef_search=32)
+    assert idx2.ntotal == 1200
+
+def test_ivf_falls_back_for_tiny_corpus():
+    index = build_index(_unit_vectors(10), index_type="ivf_pq", nlist=64)
+    assert index.ntotal == 10
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_remove_rows_keeps_alignment(index_type):
+    from app.faiss_store import remove_rows
+    emb = _unit_vectors(100)
+    index = build_index(emb, index_type=index_type, nlist=2, recall_queries=0)
+    index = remove_rows(index, [0, 5, 99])
+    kept = np.delete(emb, [0, 5, 99], axis=0)
+    assert index.ntotal == 97
+    _, ids = index.search(kept[[10]], 1)
+    assert ids[0][0] == 10
+
+def test_artifact_generations_swap_and_verify(tmp_path):
+    from app.artifacts import current_generation, read_manifest, verify_generation
+    from app.faiss_store import load_bundle
+    chunks = [{"chunk_id":"c1","section_title":"t","text":"x","page_start":1,"page_end":1,"source_file":"x.pdf"}]
+    save_artifacts(str(tmp_path), build_index(np.eye(4, dtype="float32")), chunks, {"x":["c1"]})
+    first = current_generation(str(tmp_path))
+    save_artifacts(str(tmp_path), build_index(np.eye(4, dtype="float32")[:2]), chunks, {"y":["c1"]},
+                   corpus_files={"x.pdf": "abc"})
+    second = current_generation(str(tmp_path))
+    assert second != first and first.exists()  # previous generation kept for rollback
+
+    b = load_bundle(str(tmp_path), verify=True)
+    assert b.generation == second.name
+    assert b.index.ntotal == 2
+    assert "y" in b.postings and "x" not in b.postings
+    assert b.corpus_files == {"x.pdf": "abc"}
+    assert b.chunks.get("c1")["source_file"] == "x.pdf"
+
+    manifest = read_manifest(second)
+    (second / "chunks" / "text_buf.npy").write_bytes(b"corrupt")
+    with pytest.raises(ValueError):
+        verify_generation(second, manifest)
+
+def test_prune_keeps_newest_generations_within_one_second(tmp_path, monkeypatch):
+    import types
+    from app import artifacts
+    # Same-second names whose random suffixes sort against commit order.
+    suffixes = iter(["ffffffff", "00000000", "11111111"])
+    monkeypatch.setattr(artifacts.uuid, "uuid4", lambda: types.SimpleNamespace(hex=next(suffixes)))
+    monkeypatch.setattr(artifacts.time, "strftime", lambda fmt: "20260101T000000")
+    gens = []
+    for i in range(3):
+        staged = tmp_path / f"staged{i}"
+        staged.mkdir()
+        gens.append(artifacts.commit_generation(str(tmp_path), staged))
+    assert [g.exists() for g in gens] == [False, True, True]
+
+def test_load_legacy_json_artifacts(tmp_path):
+    import json
+    faiss.write_index(build_index(np.eye(4, dtype="float32")), str(tmp_path / "index.faiss"))
+    (tmp_path / "chunks.json").write_text(json.dumps([
+        {"chunk_id":"c1","section_title":"t","text":"x","page_start":1,"page_end":1,"source_file":"x.pdf"}]))
+    (tmp_path / "keywords.json").write_text(json.dumps({"x": ["c1"]}))
+    idx, chunks, kw = load_artifacts(str(tmp_path))
+    assert idx.ntotal == 4 and chunks[0]["chunk_id"] == "c1" and kw.get("x").tolist() == [0]
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+@pytest.mark.parametrize("storage", ["fp16", "sq8"])
+def test_scalar_quantized_storage_with_rerank(tmp_path, index_type, storage):
+    from app.faiss_store import index_nbytes, recall_at_k, remove_rows, load_bundle
+    emb = _unit_vectors(1200, dim=32)
+    vectors = emb.astype("float16")
+    index = build_index(emb, index_type=index_type, nlist=16, nprobe=16, storage=storage, recall_queries=0)
+    assert index_nbytes(index) < index_nbytes(build_index(emb, index_type=index_type, nlist=16, recall_queries=0))
+    assert recall_at_k(index, emb, k=10, n_queries=50, vectors=vectors, rerank_factor=4) >= 0.9
+
+    save_artifacts(str(tmp_path), index, [], {}, vectors=vectors)
+    b = load_bundle(str(tmp_path))
+    assert b.vectors.dtype == np.float16 and b.vectors.shape == emb.shape
+    assert remove_rows(faiss.clone_index(index), [0, 5]).ntotal == 1198
+
+def test_rerank_orders_candidates_by_stored_vectors():
+    from app.faiss_store import rerank
+    vectors = np.eye(4, dtype="float16")
+    q = np.array([[0.1, 0.9, 0.0, 0.5]], dtype="float32")
+    scores, ids = rerank(q, np.array([[0, 3, 1, -1]]), vectors, k=3)
+    assert ids.tolist() == [[1, 3, 0]]
+    assert scores[0][0] == pytest.approx(0.9)
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_search_subset_exact_and_selector_paths_agree(index_type):
+    from app.faiss_store import search_subset
+    emb = _unit_vectors(500, dim=16)
+    index = build_index(emb, index_type=index_type, nlist=4, nprobe=4, recall_queries=0)
+    rows = np.arange(0, 500, 7)
+    q = emb[3:4]
+    expected = rows[np.argsort(-(emb[rows] @ q[0]))[:5]]
+    for exact_max, vectors in [(2000, None), (2000, emb.astype("float16")), (0, None)]:
+        _, ids = search_subset(index, q, rows, 5, exact_max=exact_max, vectors=vectors)
+        assert ids.tolist() == expected.tolist()
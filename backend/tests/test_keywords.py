@@ -15,3 +15,24 @@ def test_build_keyword_index():
     chunks2, inv = build_keyword_index(chunks, per_chunk_k=5)
     assert len(chunks2) == 2
     assert isinstance(inv, dict)
+
+def test_keyword_postings_candidates():
+    from app.keywords import KeywordPostings
+    kw = {"alpha": ["a", "b", "c"], "beta": ["c", "b"], "gamma": ["zzz"]}
+    post = KeywordPostings.from_index(kw, ["a", "b", "c"])
+    assert post.get("alpha").tolist() == [0, 1, 2]
+    assert post.candidates(["alpha", "beta"]).tolist() == [1, 2]
+    assert post.candidates(["alpha", "missing"]).size == 0
+    assert post.get("gamma").size == 0
+
+def test_build_keyword_index_process_pool_matches_serial(monkeypatch):
+    import copy
+    import app.keywords as kwmod
+    chunks = [{"chunk_id": str(i), "section_title": f"{i} VALVE CHECK",
+               "text": f"inspect valve{i % 7} gasket{i % 3} torque archive"} for i in range(40)]
+    serial = kwmod.build_keyword_index(copy.deepcopy(chunks))
+    monkeypatch.setattr(kwmod, "_MIN_PARALLEL_CHUNKS", 0)
+    pooled = kwmod.build_keyword_index(copy.deepcopy(chunks), workers=2)
+    assert pooled[1] == serial[1]
+    assert [c["keywords"] for c in pooled[0]] == [c["keywords"] for c in serial[0]]
+    assert "shall" in kwmod.STOPWORDS and kwmod.STOPWORDS is kwmod.stopwords()
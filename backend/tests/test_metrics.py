@@ -0,0 +1,51 @@
+import time
+
+from app.metrics import Registry, TimedIterator, observe, request_trace, server_timing, timer
+from app.profiler import SamplingProfiler
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    reg = Registry()
+    h = reg.histogram("lat_seconds", "Latency.", ("path",), buckets=(0.1, 1))
+    for v in (0.05, 0.5, 5):
+        h.observe(v, path="/search")
+    text = reg.render()
+    assert 'sop_qa_lat_seconds_bucket{path="/search",le="0.1"} 1' in text
+    assert 'sop_qa_lat_seconds_bucket{path="/search",le="1"} 2' in text
+    assert 'sop_qa_lat_seconds_bucket{path="/search",le="+Inf"} 3' in text
+    assert 'sop_qa_lat_seconds_count{path="/search"} 3' in text
+
+def test_counters_and_gauges_render_full_precision():
+    reg = Registry()
+    reg.counter("hits_total", "Hits.").inc(1234567)
+    reg.gauge("ratio", "Ratio.").set(0.1234567891)
+    text = reg.render()
+    assert "sop_qa_hits_total 1234567\n" in text
+    assert "sop_qa_ratio 0.1234567891\n" in text
+
+def test_request_trace_collects_stage_timers():
+    with request_trace() as trace:
+        with timer("test.stage"):
+            time.sleep(0.002)
+        observe("test.stage", 0.001)
+    observe("test.outside", 1.0)
+    assert set(trace) == {"test.stage"} and trace["test.stage"] >= 0.003
+    assert server_timing(trace).startswith("test-stage;dur=")
+
+def test_timed_iterator_counts_only_producer_time():
+    def slow():
+        for i in range(3):
+            time.sleep(0.002)
+            yield i
+    it = TimedIterator(slow())
+    for _ in it:
+        time.sleep(0.01)
+    assert it.items == 3 and 0.006 <= it.seconds < 0.03
+
+def test_sampling_profiler_collects_stacks():
+    prof = SamplingProfiler()
+    prof.start(interval_ms=1)
+    deadline = time.time() + 0.1
+    while time.time() < deadline:
+        sum(range(1000))
+    out = prof.stop()
+    assert prof.samples > 0 and "test_sampling_profiler_collects_stacks" in out
@@ -24,3 +24,38 @@ def test_extract_pdf_pages_blank_pdf(tmp_path: Path):
     pages = extract_pdf_pages(str(p), progress_interval=1)
     assert isinstance(pages, list)
     assert len(pages) == 0
+
+def _write_text_pdf(path: Path, texts: list[str]):
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    w = PdfWriter()
+    font = w._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for t in texts:
+        page = w.add_blank_page(width=300, height=300)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 20 250 Td ({t}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = w._add_object(stream)
+    with path.open("wb") as f:
+        w.write(f)
+
+def test_extract_pdf_pages_parallel_keeps_page_order(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr("app.pdf_loader._MIN_PARALLEL_PAGES", 1)
+    p = tmp_path / "multi.pdf"
+    texts = [f"Page {i}" if i % 3 else "" for i in range(1, 13)]
+    _write_text_pdf(p, texts)
+    pages = extract_pdf_pages(str(p), workers=2)
+    assert [pg["page"] for pg in pages] == [i for i in range(1, 13) if i % 3]
+    assert pages[0]["text"] == "Page 1"
+    assert extract_pdf_pages(str(p), workers=1) == pages
+
+def test_extract_pdf_pages_stream_is_lazy(tmp_path: Path):
+    p = tmp_path / "one.pdf"
+    _write_text_pdf(p, ["Hello"])
+    pages = extract_pdf_pages(str(p), stream=True)
+    assert not isinstance(pages, list)
+    assert [pg["text"] for pg in pages] == ["Hello"]
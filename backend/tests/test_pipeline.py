@@ -12,11 +12,11 @@ def test_pipeline_build_with_mocks(tmp_path, monkeypatch, dummy_model):
     monkeypatch.setattr("app.pipeline.extract_pdf_pages", lambda *a, **k: [
         {"page": 1, "source_file": "x.pdf", "text": "1 PURPOSE\nHello world"}
     ])
-    monkeypatch.setattr("app.pipeline.chunk_pages", lambda pages: [
+    monkeypatch.setattr("app.pipeline.chunk_pages", lambda pages, **k: [
         {"page_start":1,"page_end":1,"section_id":"1","section_title":"1 PURPOSE","text":"Hello world","source_file":"x.pdf","chunk_id":"abc"}
     ])
-    monkeypatch.setattr("app.pipeline.build_keyword_index", lambda chunks: (chunks, {"hello":["abc"]}))
-    monkeypatch.setattr("app.pipeline.get_model", lambda name: dummy_model)
+    monkeypatch.setattr("app.pipeline.build_keyword_index", lambda chunks, **k: (chunks, {"hello":["abc"]}))
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
     monkeypatch.setattr("app.pipeline.embed_texts", lambda texts, model, batch_size=32: np.eye(8, dtype="float32")[:len(texts)])
 
     pipe = QAPipeline(cfg)
@@ -24,3 +24,177 @@ def test_pipeline_build_with_mocks(tmp_path, monkeypatch, dummy_model):
     assert pipe.ready()
     results = pipe.search("hello", top_k=1, pool_k=5)
     assert len(results) == 1
+
+def test_pipeline_build_corpus_incremental(tmp_path, monkeypatch, dummy_model):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    (pdf_dir / "a.pdf").write_text("1 PURPOSE\nAlpha purpose text.\n\n2 SCOPE\nAlpha scope text.", encoding="utf-8")
+    (pdf_dir / "b.pdf").write_text("1 PURPOSE\nBeta purpose text here.", encoding="utf-8")
+    cfg = AppConfig(pdf_dir=str(pdf_dir), index_dir=str(tmp_path / "index"), rerank_factor=2, sentence_index=False)
+
+    # Stand-in PDFs are plain text files, one page each.
+    monkeypatch.setattr("app.pipeline.extract_pdf_pages", lambda path, **k: [
+        {"page": 1, "source_file": path.rsplit("/", 1)[-1], "text": open(path, encoding="utf-8").read()}
+    ])
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    embedded = []
+
+    def fake_embed(texts, model, batch_size=32):
+        embedded.extend(texts)
+        return np.eye(8, dtype="float32")[[len(t) % 8 for t in texts]]
+    monkeypatch.setattr("app.pipeline.embed_texts", fake_embed)
+
+    pipe = QAPipeline(cfg)
+    stats = pipe.build_corpus()
+    assert stats["added"] == 2 and stats["embedded"] == 3
+    assert pipe.index.ntotal == len(pipe.chunks) == 3
+
+    (pdf_dir / "a.pdf").write_text("1 PURPOSE\nAlpha purpose text.\n\n2 SCOPE\nAlpha scope text, revised.", encoding="utf-8")
+    (pdf_dir / "b.pdf").unlink()
+    embedded.clear()
+    stats = pipe.build_corpus()
+    assert stats == {"added": 0, "changed": 1, "removed": 1, "unchanged": 0, "embedded": 1}
+    assert len(embedded) == 1 and "revised" in embedded[0]
+    assert pipe.index.ntotal == len(pipe.chunks) == len(pipe.snapshot.vectors) == 2
+    assert all(ch["source_file"] == "a.pdf" for ch in pipe.chunks)
+    assert "beta" not in pipe.keyword_to_chunks
+
+    # A fresh pipeline picks up the persisted manifest and has nothing to do.
+    embedded.clear()
+    assert QAPipeline(cfg).build_corpus()["embedded"] == 0
+    assert embedded == []
+
+def test_keyword_filtered_search_is_exact_beyond_pool(tmp_path, monkeypatch, dummy_model):
+    cfg = AppConfig(index_dir=str(tmp_path))
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    pipe = QAPipeline(cfg)
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((200, 8)).astype("float32")
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    pipe.index = faiss.IndexFlatIP(8)
+    pipe.index.add(emb)
+    pipe.chunks = [{"chunk_id": f"c{i}", "section_title": "T", "text": "x", "page_start": 1, "page_end": 1}
+                   for i in range(200)]
+    rare = [f"c{i}" for i in range(0, 200, 20)]
+    pipe.keyword_to_chunks = {"rare": rare}
+
+    q = dummy_model.encode(["hello"])
+    expected = np.argsort(-(emb[::20] @ q[0]))[:5] * 20
+    results = pipe.search("hello", keywords=["RARE"], top_k=5, pool_k=5)
+    assert [ch["chunk_id"] for _, ch in results] == [f"c{i}" for i in expected]
+    assert pipe.search("hello", keywords=["rare", "nope"]) == []
+
+    pipe.cfg.prefilter_exact_max = 0  # force the FAISS IDSelector path
+    results = pipe.search("hello", keywords=["rare"], top_k=5, pool_k=5)
+    assert [ch["chunk_id"] for _, ch in results] == [f"c{i}" for i in expected]
+
+@pytest.mark.parametrize("mode", ["bm25", "hybrid"])
+def test_lexical_search_modes(tmp_path, monkeypatch, dummy_model, mode):
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    pipe = QAPipeline(AppConfig(index_dir=str(tmp_path)))
+    pipe.index = faiss.IndexFlatIP(8)
+    pipe.index.add(np.eye(8, dtype="float32")[:3])
+    pipe.chunks = [
+        {"chunk_id": f"c{i}", "section_title": "T", "text": t, "page_start": 1, "page_end": 1}
+        for i, t in enumerate(["Replace valve V-2231 seal.", "General valve guidance.", "Shift handover notes."])
+    ]
+    results = pipe.search("v-2231", top_k=1, mode=mode)
+    assert results[0][1]["chunk_id"] == "c0"
+
+def test_pipeline_load_memory_mapped_artifacts(tmp_path, monkeypatch, dummy_model):
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    cfg = AppConfig(index_dir=str(tmp_path))
+    pipe = QAPipeline(cfg)
+    pipe.index = faiss.IndexFlatIP(8)
+    pipe.index.add(np.eye(8, dtype="float32")[:2])
+    pipe.chunks = [{"chunk_id": f"c{i}", "section_title": "T", "text": f"text {i}", "page_start": 1, "page_end": 1,
+                    "keywords": ["shared"]} for i in range(2)]
+    pipe.keyword_to_chunks = {"shared": ["c0", "c1"]}
+    from app.faiss_store import save_artifacts
+    save_artifacts(cfg.index_dir, pipe.index, pipe.chunks, pipe.keyword_to_chunks, bm25=pipe.bm25)
+
+    loaded = QAPipeline(cfg)
+    loaded.load()
+    assert loaded.get_chunk("c1")["text"] == "text 1"
+    assert len(loaded.search("hello", keywords=["shared"], top_k=2)) == 2
+    assert loaded.keyword_to_chunks == {"shared": ["c0", "c1"]}
+
+def test_pipeline_reload_swaps_new_generation(tmp_path, monkeypatch, dummy_model):
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    from app.faiss_store import save_artifacts
+    cfg = AppConfig(index_dir=str(tmp_path))
+
+    def publish(n):
+        index = faiss.IndexFlatIP(8)
+        index.add(np.eye(8, dtype="float32")[:n])
+        chunks = [{"chunk_id": f"c{i}", "section_title": "T", "text": f"text {i}", "page_start": 1, "page_end": 1}
+                  for i in range(n)]
+        return save_artifacts(cfg.index_dir, index, chunks, {}).name
+
+    first = publish(2)
+    pipe = QAPipeline(cfg)
+    assert pipe.reload() is True
+    assert pipe.snapshot.generation == first
+    assert pipe.reload() is False
+
+    with pipe.acquire() as old:
+        second = publish(3)
+        assert pipe.reload() is True
+        assert len(old.chunks) == 2
+    assert pipe.snapshot.generation == second
+    assert len(pipe.search("hello", top_k=3)) == 3
+
+def test_search_batch_matches_single_queries(tmp_path, monkeypatch, dummy_model):
+    calls = []
+    class CountingModel(type(dummy_model)):
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            return super().encode(texts, **kwargs)
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: CountingModel(dim=8))
+    pipe = QAPipeline(AppConfig(index_dir=str(tmp_path), query_cache_size=0))
+    pipe.index = faiss.IndexFlatIP(8)
+    pipe.index.add(np.eye(8, dtype="float32"))
+    pipe.chunks = [{"chunk_id": f"c{i}", "section_title": "T", "text": f"text {i}", "page_start": 1, "page_end": 1}
+                   for i in range(8)]
+    pipe.keyword_to_chunks = {"odd": ["c1", "c3", "c5"], "none": []}
+
+    queries = ["a", "bb", "ccc", "dddd"]
+    keywords = [None, ["odd"], ["none"], None]
+    batch = pipe.search_batch(queries, keywords, top_k=2)
+    assert len(calls) == 1 and len(calls[0]) == 3  # the empty-filter query is never encoded
+    assert batch[2] == []
+    for q, kws, hits in zip(queries, keywords, batch):
+        assert hits == pipe.search(q, keywords=kws, top_k=2)
+    assert all(h[1]["chunk_id"] in {"c1", "c3", "c5"} for h in batch[1])
+
+def test_model_is_loaded_on_first_use(tmp_path, monkeypatch, dummy_model):
+    loads = []
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: loads.append(name) or dummy_model)
+    pipe = QAPipeline(AppConfig(index_dir=str(tmp_path)))
+    assert not pipe.model_loaded() and loads == []
+    pipe.index = faiss.IndexFlatIP(8)
+    pipe.index.add(np.eye(8, dtype="float32")[:1])
+    pipe.chunks = [{"chunk_id": "c0", "section_title": "T", "text": "text", "page_start": 1, "page_end": 1}]
+    assert len(pipe.search("hello", top_k=1)) == 1
+    assert pipe.model_loaded() and len(loads) == 1
+
+def test_sq8_index_reranks_with_stored_vectors(tmp_path, monkeypatch, dummy_model):
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((300, 8)).astype("float32")
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    chunks = [{"page_start": 1, "page_end": 1, "section_id": str(i), "section_title": "T", "text": f"text {i}",
+               "source_file": "x.pdf", "chunk_id": f"c{i}"} for i in range(300)]
+    monkeypatch.setattr("app.pipeline.extract_pdf_pages", lambda *a, **k: [])
+    monkeypatch.setattr("app.pipeline.chunk_pages", lambda pages, **k: chunks)
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    monkeypatch.setattr("app.pipeline.embed_texts", lambda texts, model, batch_size=32: emb[:len(texts)])
+    cfg = AppConfig(index_dir=str(tmp_path), vector_storage="sq8", rerank_factor=4, embedding_cache_size=0)
+    pipe = QAPipeline(cfg)
+    pipe.build("x.pdf")
+
+    loaded = QAPipeline(cfg)
+    loaded.load()
+    assert loaded.snapshot.vectors.dtype == np.float16
+    q = dummy_model.encode(["hello"])
+    best = int(np.argmax(emb.astype("float16").astype("float32") @ q[0]))
+    assert loaded.search("hello", top_k=1)[0][1]["chunk_id"] == f"c{best}"
@@ -0,0 +1,43 @@
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import numpy as np
+from app.query_encoder import QueryEncoder
+
+def _counting_encoder(calls):
+    lock = threading.Lock()
+    def encode(texts):
+        with lock:
+            calls.append(list(texts))
+        return np.stack([np.full(4, len(t), dtype="float32") for t in texts])
+    return encode
+
+def test_query_encoder_lru_cache():
+    calls = []
+    enc = QueryEncoder(_counting_encoder(calls), cache_size=2)
+    assert enc.encode("abc").shape == (1, 4)
+    enc.encode("abc ")
+    assert calls == [["abc"]]
+    enc.encode("de")
+    enc.encode("fghi")  # evicts "abc"
+    enc.encode("abc")
+    assert calls[-1] == ["abc"]
+    assert enc.hits == 1
+
+def test_query_encoder_encode_many_batches_misses():
+    calls = []
+    enc = QueryEncoder(_counting_encoder(calls))
+    enc.encode("a1")
+    out = enc.encode_many(["a1", "b22", "b22", "c333"])
+    assert calls[-1] == ["b22", "c333"]
+    assert out[:, 0].tolist() == [2, 3, 3, 4]
+
+def test_query_encoder_micro_batches_concurrent_queries():
+    calls = []
+    enc = QueryEncoder(_counting_encoder(calls), cache_size=0, batch_window_ms=200, max_batch=8)
+    queries = [f"q{i}" * (i + 1) for i in range(6)]
+    with ThreadPoolExecutor(max_workers=6) as ex:
+        outs = list(ex.map(enc.encode, queries))
+    assert [o[0, 0] for o in outs] == [len(q) for q in queries]
+    assert sum(len(c) for c in calls) == 6
+    assert len(calls) < 6
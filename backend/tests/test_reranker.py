@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.reranker import CrossEncoderReranker
+
+class StubCrossEncoder:
+    """Scores a pair by how many query words the passage contains."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        time.sleep(self.delay)
+        return np.array([sum(w in p.lower() for w in q.lower().split()) for q, p in pairs], dtype="float32")
+
+def _hits(*texts):
+    return [(1.0 - i / 10, {"chunk_id": f"c{i}", "section_title": "T", "text": t}) for i, t in enumerate(texts)]
+
+def test_rerank_orders_by_cross_encoder_and_caches_pairs():
+    model = StubCrossEncoder()
+    rr = CrossEncoderReranker(model)
+    hits = _hits("unrelated text", "calibrate the balance", "calibrate")
+    out, outcome = rr.rerank("calibrate balance", hits, top_k=2, budget_ms=1000)
+    assert outcome == "reranked" and [ch["chunk_id"] for _, ch in out] == ["c1", "c2"]
+    out, outcome = rr.rerank("calibrate  balance", hits, top_k=2, budget_ms=1000)
+    assert outcome == "cached" and model.calls == [3]
+
+def test_over_budget_falls_back_to_vector_order_and_fills_cache():
+    rr = CrossEncoderReranker(StubCrossEncoder(delay=0.2))
+    hits = _hits("unrelated text", "calibrate the balance")
+    out, outcome = rr.rerank("calibrate balance", hits, top_k=1, budget_ms=10)
+    assert outcome == "timeout" and out[0][1]["chunk_id"] == "c0"
+    time.sleep(0.3)
+    out, outcome = rr.rerank("calibrate balance", hits, top_k=1, budget_ms=10)
+    assert outcome == "cached" and out[0][1]["chunk_id"] == "c1"
+
+def test_pipeline_search_with_rerank(tmp_path, monkeypatch, dummy_model):
+    pytest.importorskip("faiss")
+    from app.config import AppConfig
+    from app.pipeline import QAPipeline
+    chunks = [{"page_start": 1, "page_end": 1, "section_id": str(i), "section_title": "T", "text": t,
+               "source_file": "x.pdf", "chunk_id": f"c{i}"}
+              for i, t in enumerate(["Backups are kept ten years.", "Calibrate the balance daily.", "Sign the form."])]
+    monkeypatch.setattr("app.pipeline.extract_pdf_pages", lambda *a, **k: [])
+    monkeypatch.setattr("app.pipeline.chunk_pages", lambda pages, **k: [dict(c) for c in chunks])
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    monkeypatch.setattr("app.pipeline.get_cross_encoder", lambda name: StubCrossEncoder())
+    pipe = QAPipeline(AppConfig(index_dir=str(tmp_path), embedding_cache_size=0, sentence_index=False))
+    pipe.build("x.pdf", persist=False)
+    with pytest.raises(ValueError):
+        pipe.search("calibrate balance", top_k=1, rerank=True)
+
+    pipe.cfg.cross_encoder_model = "stub"
+    hits, outcome = pipe.search("calibrate balance", top_k=1, pool_k=3, rerank=True, with_outcome=True)
+    assert hits[0][1]["chunk_id"] == "c1" and hits[0][0] == 2.0 and outcome == "reranked"
+    assert pipe.search("calibrate balance", top_k=1, with_outcome=True)[1] is None
@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from app.result_cache import ResultCache, result_key
+
+def test_key_normalizes_query_and_keywords():
+    a = result_key("search", "  How do I  calibrate?", "gen-1", keywords=["Balance", "qa"], top_k=5)
+    b = result_key("search", "How do I calibrate?", "gen-1", keywords=["qa", "balance"], top_k=5)
+    assert a == b
+    assert a != result_key("search", "How do I calibrate?", "gen-2", keywords=["qa", "balance"], top_k=5)
+    assert a != result_key("qa", "How do I calibrate?", "gen-1", keywords=["qa", "balance"], top_k=5)
+
+def test_ttl_lru_and_index_switch():
+    cache = ResultCache(max_entries=2, ttl_s=0.05)
+    cache.put("a", "g1", [1])
+    cache.put("b", "g1", [2])
+    assert cache.get("a", "g1") == [1]
+    cache.put("c", "g1", [3])  # evicts "b", the least recently used
+    assert cache.get("b", "g1") is None and cache.get("a", "g1") == [1]
+    time.sleep(0.06)
+    assert cache.get("a", "g1") is None
+
+    cache.put("d", "g1", [4])
+    # A new version doesn't wipe the tier; old entries age out through LRU and TTL.
+    assert cache.get("d", "g2") is None and len(cache) == 0
+    cache.put("e", "g1", [5])
+    cache.put("f", "g2", [6])
+    assert cache.get("e", "g1") == [5] and cache.get("f", "g2") == [6]
+
+def test_hits_are_copies():
+    cache = ResultCache(max_entries=4, ttl_s=60)
+    cache.put("k", "g1", {"contexts": [1]})
+    cache.get("k", "g1")["contexts"].append(2)
+    assert cache.get("k", "g1") == {"contexts": [1]}
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    w1, w2 = ResultCache(16, 60, path), ResultCache(16, 60, path)
+    w1.put("k", "gen-1", {"contexts": [{"excerpt": "Calibrate daily."}]})
+    assert w2.get("k", "gen-1") == {"contexts": [{"excerpt": "Calibrate daily."}]}
+    # Each thread reads through its own connection.
+    for i in range(8):
+        w1.put(f"k{i}", "gen-1", [i])
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(lambda i: w2.get(f"k{i}", "gen-1"), range(8))) == [[i] for i in range(8)]
+    w1.close()
+    w2.close()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.embedding_cache import EmbeddingCache
+from app.sentences import SentenceIndex, sentence_spans
+
+def test_sentence_spans_skip_headings_and_join_wrapped_lines():
+    text = "1 PURPOSE\nDeviations are reported\nwithin one day. QA closes them!\n\n• Record it in the logbook.\nV-2231"
+    assert [text[a:b] for a, b in sentence_spans(text)] == [
+        "Deviations are reported\nwithin one day.", "QA closes them!", "• Record it in the logbook.",
+    ]
+
+def test_sentence_index_take_concat_and_best():
+    texts = ["First sentence here. Second sentence here.", "no", "Only one sentence here."]
+    vecs = {"First sentence here.": [1, 0], "Second sentence here.": [0, 1], "Only one sentence here.": [1, 1]}
+    idx = SentenceIndex.build(texts, lambda s: np.array([vecs[t] for t in s], dtype="float32"))
+    assert idx.ptr.tolist() == [0, 2, 2, 3]
+
+    best = idx.best(np.array([0, 1]), [0, 1, None], n=1)
+    assert best[0] == [(1.0, 21, 42)] and best[1] == [] and best[2] == []
+
+    moved = idx.take([2, 0]).concat(idx.take([1]))
+    assert moved.ptr.tolist() == [0, 1, 3, 3]
+    assert moved.best(np.array([1, 0]), [1], n=2)[0][0] == (1.0, 0, 20)
+
+def test_answer_returns_best_sentences_with_offsets(tmp_path, monkeypatch, dummy_model):
+    pytest.importorskip("faiss")
+    from app.config import AppConfig
+    from app.pipeline import QAPipeline
+    text = "Calibrate the balance daily. Record every result in the logbook. Report deviations to QA."
+    chunks = [{"page_start": 1, "page_end": 1, "section_id": "1", "section_title": "1. PROCEDURE",
+               "text": text, "source_file": "x.pdf", "chunk_id": "c0"}]
+    monkeypatch.setattr("app.pipeline.extract_pdf_pages", lambda *a, **k: [])
+    monkeypatch.setattr("app.pipeline.chunk_pages", lambda pages, **k: [dict(c) for c in chunks])
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    cfg = AppConfig(
+        index_dir=str(tmp_path), embedding_cache_size=10, query_cache_size=0, sentence_index=True, answer_sentences=1
+    )
+    QAPipeline(cfg).build("x.pdf")
+    # Sentence vectors are cached apart from chunk vectors.
+    assert len(EmbeddingCache(tmp_path / "embedding_cache", cfg.model_name, 8)) == 1
+    assert len(EmbeddingCache(tmp_path / "sentence_cache", cfg.model_name, 8)) == 3
+
+    pipe = QAPipeline(cfg)
+    pipe.load()
+    calls = []
+    encode_many = pipe.query_encoder.encode_many
+    monkeypatch.setattr(pipe.query_encoder, "encode_many", lambda qs: calls.append(qs) or encode_many(qs))
+    # DummySTModel embeds by text length, so the question matches the equally long sentence.
+    question = "x" * len("Record every result in the logbook.")
+    ctx = pipe.answer_extractive(question, top_k=1)["contexts"][0]
+    (s,) = ctx["sentences"]
+    assert s["text"] == text[s["start"]:s["end"]] == "Record every result in the logbook."
+    assert ctx["excerpt"] == s["text"]
+    assert len(calls) == 1
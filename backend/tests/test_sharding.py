@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import zlib
+import numpy as np
+import pytest
+faiss = pytest.importorskip("faiss")
+
+from app.config import AppConfig
+from app.pipeline import QAPipeline
+from app.sharding import ProcessShard, ShardedSearcher, load_shard_manifest, shard_dir, shard_of
+from bench.synthetic import write_sop_pdf
+
+class LocalShard:
+    def __init__(self, pipe, name="local", delay=0.0):
+        self.pipe, self.name, self.delay = pipe, name, delay
+
+    def search(self, q_embs, keywords, top_k, pool_k, timeout):
+        time.sleep(self.delay)
+        return self.pipe.search_embedded(q_embs, keywords, top_k=top_k, pool_k=pool_k)
+
+    def close(self):
+        pass
+
+def test_shard_of_is_stable_and_keeps_sources_together():
+    a = {"source_file": "a.pdf", "chunk_id": "c1"}
+    b = {"source_file": "a.pdf", "chunk_id": "c2"}
+    assert shard_of(a, 4) == shard_of(b, 4) == shard_of(dict(a), 4)
+    assert 0 <= shard_of(a, 4, by="chunk_id") < 4
+    with pytest.raises(ValueError):
+        shard_of(a, 4, by="page")
+
+def _vec(text: str) -> np.ndarray:
+    v = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(8).astype("float32")
+    return v / np.linalg.norm(v)
+
+def test_shard_of_spreads_similar_names():
+    assert len({shard_of({"source_file": f"SOP-{i}.pdf"}, 4) for i in range(8)}) == 4
+
+def test_sharded_search_matches_single_index(tmp_path, monkeypatch, dummy_model):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for i in range(5):
+        write_sop_pdf(pdf_dir / f"SOP-{i}.pdf", num_pages=3, seed=i)
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    monkeypatch.setattr("app.pipeline.embed_texts",
+                        lambda texts, model, batch_size=32: np.stack([_vec(t) for t in texts]))
+    index_dir = tmp_path / "index"
+    cfg = AppConfig(index_dir=str(index_dir), embedding_cache_size=0, sentence_index=False, pdf_workers=1)
+    counts = QAPipeline(cfg).build_shards(str(pdf_dir), num_shards=3)
+    assert sum(counts) == 30 and sum(1 for n in counts if n) > 1
+    assert load_shard_manifest(str(index_dir))["num_shards"] == 3
+
+    shards = []
+    for i, n in enumerate(counts):
+        if n:
+            pipe = QAPipeline(AppConfig(index_dir=str(shard_dir(str(index_dir), i)), embedding_cache_size=0))
+            pipe.load()
+            shards.append(LocalShard(pipe, name=f"shard-{i}"))
+    chunks = [s.pipe.chunks[r] for s in shards for r in range(len(s.pipe.chunks))]
+    emb = np.stack([_vec(ch["section_title"] + "\n" + ch["text"]) for ch in chunks])
+    searcher = ShardedSearcher(shards, timeout_ms=2000)
+    q = emb[[7, 22]]
+    hits, report = searcher.search(q, top_k=3)
+    assert report["answered"] == len(shards) and not report["partial"]
+    expected = np.argsort(-(emb @ q.T), axis=0)[:3].T
+    assert [[h[1]["chunk_id"] for h in row] for row in hits] == [[chunks[i]["chunk_id"] for i in row]
+                                                                 for row in expected]
+
+    # A slow shard is left out and reported rather than failing the query.
+    searcher = ShardedSearcher(shards + [LocalShard(shards[0].pipe, name="slow", delay=1.0)], timeout_ms=100)
+    hits, report = searcher.search(q, top_k=3)
+    assert report["partial"] and report["failed"] == [{"shard": "slow", "error": "timeout"}]
+    assert len(hits[0]) == 3
+    searcher.close()
+
+def test_single_source_falls_back_to_chunk_id(tmp_path, monkeypatch, dummy_model):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    write_sop_pdf(pdf_dir / "only.pdf", num_pages=6)
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    cfg = AppConfig(index_dir=str(tmp_path / "index"), embedding_cache_size=0, sentence_index=False, pdf_workers=1)
+    counts = QAPipeline(cfg).build_shards(str(pdf_dir), num_shards=3)
+    assert sum(counts) == 12 and all(counts)
+    assert load_shard_manifest(str(tmp_path / "index"))["by"] == "chunk_id"
+
+def test_process_shard_answers_concurrent_requests(tmp_path, monkeypatch, dummy_model):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    write_sop_pdf(pdf_dir / "only.pdf", num_pages=4)
+    monkeypatch.setattr("app.pipeline.get_model", lambda name, **kw: dummy_model)
+    monkeypatch.setattr("app.pipeline.embed_texts",
+                        lambda texts, model, batch_size=32: np.stack([_vec(t) for t in texts]))
+    cfg = AppConfig(index_dir=str(tmp_path / "index"), embedding_cache_size=0, pdf_workers=1, inference_workers=4)
+    QAPipeline(cfg).build_shards(str(pdf_dir), num_shards=1)
+    local = QAPipeline(AppConfig(index_dir=str(shard_dir(cfg.index_dir, 0)), embedding_cache_size=0))
+    local.load()
+    queries = [_vec(f"q{i}")[None] for i in range(16)]
+    expected = [[h[1]["chunk_id"] for h in local.search_embedded(q, top_k=3)[0]] for q in queries]
+
+    shard = ProcessShard(str(shard_dir(cfg.index_dir, 0)), cfg)
+    try:
+        # Replies may come back out of order; each must reach the request that sent it.
+        with ThreadPoolExecutor(8) as pool:
+            got = list(pool.map(lambda q: shard.search(q, None, 3, 10, timeout=30), queries))
+        assert [[h[1]["chunk_id"] for h in hits[0]] for hits in got] == expected
+    finally:
+        shard.close()
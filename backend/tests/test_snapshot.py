@@ -0,0 +1,29 @@
+from app.chunk_store import ChunkStore
+from app.snapshot import IndexSnapshot, SnapshotManager
+
+def _snap(n: int, index="idx") -> IndexSnapshot:
+    chunks = [{"chunk_id": f"c{i}", "section_title": "T", "text": f"t{i}", "page_start": 1, "page_end": 1}
+              for i in range(n)]
+    return IndexSnapshot(index=index, chunks=ChunkStore.from_dicts(chunks), keyword_to_chunks={"t": ["c0"]})
+
+def test_swap_keeps_pinned_snapshot_until_reader_finishes():
+    mgr = SnapshotManager(_snap(2))
+    with mgr.acquire() as pinned:
+        mgr.swap(_snap(3))
+        # The reader still sees its own consistent snapshot after the swap.
+        assert pinned.index == "idx" and len(pinned.chunks) == 2
+        assert len(mgr.current.chunks) == 3
+    assert pinned.index is None and len(pinned.chunks) == 0
+
+def test_swap_releases_idle_snapshot_immediately():
+    old = _snap(1)
+    mgr = SnapshotManager(old)
+    mgr.swap(_snap(2))
+    assert old.index is None
+
+def test_replace_rederives_postings_for_new_rows():
+    snap = _snap(2)
+    assert snap.postings.candidates(["t"]).tolist() == [0]
+    moved = snap.replace(chunks=[snap.chunks[1], snap.chunks[0]])
+    assert moved.postings.candidates(["t"]).tolist() == [1]
+    assert moved.generation is None
@@ -6,9 +6,19 @@ const API_BASE = (import.meta.env.VITE_API_BASE ?? '/api').replace(/\/$/, '')
 type HealthResponse = {
   status: string
   ready: boolean
+  model_loaded?: boolean
+  index_loaded?: boolean
   index_dir: string
 }
 
+type BuildJob = {
+  job_id: string
+  kind: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  result?: { chunks: number; index_dir: string } | null
+  error?: string | null
+}
+
 type SearchHit = {
   score: number
   chunk_id: string
@@ -18,6 +28,8 @@ type SearchHit = {
   keywords?: string[]
 }
 
+type SearchMode = 'vector' | 'hybrid' | 'bm25'
+
 type QAContext = {
   score: number
   chunk_id: string
@@ -25,6 +37,7 @@ type QAContext = {
   page_start: number
   page_end: number
   excerpt: string
+  sentences?: { text: string; start: number; end: number; score: number }[]
 }
 
 type QAResponse = {
@@ -45,8 +58,8 @@ type Chunk = {
 
 async function apiRequest<T>(path: string, init?: RequestInit): Promise<T> {
   const res = await fetch(`${API_BASE}${path}`, {
-    headers: { 'Content-Type': 'application/json', ...(init?.headers ?? {}) },
     ...init,
+    headers: { 'Content-Type': 'application/json', ...(init?.headers ?? {}) },
   })
 
   if (!res.ok) {
@@ -70,6 +83,48 @@ async function apiRequest<T>(path: string, init?: RequestInit): Promise<T> {
   return (await res.text()) as unknown as T
 }
 
+type StreamRecord<T> = (T & { type: string }) | { type: 'summary'; count: number; elapsed_ms: number }
+
+// Reads an NDJSON response line by line, handing each record over as soon as it arrives.
+async function streamRequest<T>(path: string, init: RequestInit, onRecord: (record: StreamRecord<T>) => void) {
+  const res = await fetch(`${API_BASE}${path}`, {
+    ...init,
+    headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson', ...(init.headers ?? {}) },
+  })
+  if (!res.ok || !res.body) {
+    throw new Error((await res.text()) || `Request failed (${res.status})`)
+  }
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    buffer += decoder.decode(value, { stream: !done })
+    const lines = buffer.split('\n')
+    buffer = lines.pop() ?? ''
+    for (const line of lines) {
+      if (line.trim()) {
+        onRecord(JSON.parse(line))
+      }
+    }
+    if (done) {
+      return
+    }
+  }
+}
+
+const JOB_POLL_MS = 1000
+
+async function waitForJob(jobId: string): Promise<BuildJob> {
+  for (;;) {
+    const job = await apiRequest<BuildJob>(`/jobs/${jobId}`)
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return job
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS))
+  }
+}
+
 function App() {
   const [health, setHealth] = useState<HealthResponse | null>(null)
   const [healthLoading, setHealthLoading] = useState(false)
@@ -85,6 +140,7 @@ function App() {
   const [searchKeywords, setSearchKeywords] = useState('')
   const [searchTopK, setSearchTopK] = useState(5)
   const [searchPoolK, setSearchPoolK] = useState(25)
+  const [searchMode, setSearchMode] = useState<SearchMode>('vector')
   const [searchLoading, setSearchLoading] = useState(false)
   const [searchResults, setSearchResults] = useState<SearchHit[]>([])
 
@@ -127,11 +183,15 @@ function App() {
     setBuildLoading(true)
     setSelectedChunk(null)
     try {
-      const result = await apiRequest<{ status: string; chunks: number; index_dir: string }>('/build', {
+      const queued = await apiRequest<BuildJob>('/build', {
         method: 'POST',
         body: JSON.stringify({ pdf_path: pdfPath, persist }),
       })
-      setMessage(`Index ${result.status}. Chunks: ${result.chunks}`)
+      const job = await waitForJob(queued.job_id)
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Build failed.')
+      }
+      setMessage(`Index built. Chunks: ${job.result?.chunks ?? 0}`)
       await refreshHealth()
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Build failed.')
@@ -175,6 +235,7 @@ function App() {
           keywords: keywordsList.length ? keywordsList : null,
           top_k: searchTopK,
           pool_k: searchPoolK,
+          mode: searchMode,
         }),
       })
       setSearchResults(result)
@@ -194,12 +255,18 @@ function App() {
     setMessage(null)
     setQaLoading(true)
     setSelectedChunk(null)
+    setQaResult({ question, contexts: [] })
     try {
-      const result = await apiRequest<QAResponse>('/qa', {
-        method: 'POST',
-        body: JSON.stringify({ question, top_k: qaTopK }),
-      })
-      setQaResult(result)
+      await streamRequest<QAContext>(
+        '/qa',
+        { method: 'POST', body: JSON.stringify({ question, top_k: qaTopK, stream: true }) },
+        (record) => {
+          if (record.type === 'context') {
+            const context = record as QAContext
+            setQaResult((prev) => ({ question, contexts: [...(prev?.contexts ?? []), context] }))
+          }
+        },
+      )
     } catch (err) {
       setError(err instanceof Error ? err.message : 'QA failed.')
     } finally {
@@ -238,6 +305,10 @@ function App() {
               {healthLoading ? 'Checking…' : health?.ready ? 'Ready' : 'Not Ready'}
             </span>
           </div>
+          <div className="status-row">
+            <span className="status-label">Model</span>
+            <span className="status-value">{health ? (health.model_loaded ? 'Loaded' : 'Loading…') : '—'}</span>
+          </div>
           <div className="status-row">
             <span className="status-label">Index Dir</span>
             <span className="status-value">{health?.index_dir ?? '—'}</span>
@@ -311,6 +382,14 @@ function App() {
                 onChange={(event) => setSearchPoolK(Number(event.target.value))}
               />
             </label>
+            <label className="field small">
+              Mode
+              <select value={searchMode} onChange={(event) => setSearchMode(event.target.value as SearchMode)}>
+                <option value="vector">Vector</option>
+                <option value="hybrid">Hybrid</option>
+                <option value="bm25">BM25</option>
+              </select>
+            </label>
           </div>
           <div className="button-row">
             <button onClick={handleSearch} disabled={searchLoading}>
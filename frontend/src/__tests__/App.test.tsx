@@ -9,6 +9,7 @@ type MockResponse = {
   headers: { get: (key: string) => string | null }
   json: () => Promise<unknown>
   text: () => Promise<string>
+  body?: { getReader: () => { read: () => Promise<{ done: boolean; value?: Uint8Array }> } }
 }
 
 const jsonResponse = (data: unknown, status = 200): MockResponse => ({
@@ -19,12 +20,37 @@ const jsonResponse = (data: unknown, status = 200): MockResponse => ({
   text: async () => JSON.stringify(data),
 })
 
+// Streams NDJSON in the given pieces, which need not end on line boundaries.
+const ndjsonResponse = (pieces: string[]): MockResponse => {
+  const encoder = new TextEncoder()
+  const queue = [...pieces]
+  return {
+    ok: true,
+    status: 200,
+    headers: { get: () => 'application/x-ndjson' },
+    json: async () => null,
+    text: async () => pieces.join(''),
+    body: {
+      getReader: () => ({
+        read: async () => {
+          const piece = queue.shift()
+          return piece === undefined ? { done: true } : { done: false, value: encoder.encode(piece) }
+        },
+      }),
+    },
+  }
+}
+
+type Route = (init?: RequestInit) => MockResponse
+
+// A route is either JSON data or a function returning the whole response.
 const createFetchMock = (routes: Record<string, unknown>) =>
-  vi.fn(async (input: RequestInfo) => {
+  vi.fn(async (input: RequestInfo, init?: RequestInit) => {
     const url = typeof input === 'string' ? input : input.url
     const path = url.replace(/^https?:\/\/[^/]+/, '')
     if (path in routes) {
-      return jsonResponse(routes[path])
+      const route = routes[path]
+      return typeof route === 'function' ? (route as Route)(init) : jsonResponse(route)
     }
     return jsonResponse({ detail: `No mock for ${path}` }, 404)
   })
@@ -84,4 +110,63 @@ describe('App', () => {
     await userEvent.click(screen.getByRole('button', { name: 'View Chunk' }))
     expect(await screen.findByText(/Step 1: Gather requirements\./)).toBeInTheDocument()
   })
+
+  it('polls a build job until it finishes', async () => {
+    let polls = 0
+    const fetchMock = createFetchMock({
+      '/api/health': { status: 'ok', ready: true, index_dir: 'data/index' },
+      '/api/build': { job_id: 'job-1', kind: 'build', status: 'queued' },
+      '/api/jobs/job-1': () => {
+        polls += 1
+        return polls < 2
+          ? jsonResponse({ job_id: 'job-1', kind: 'build', status: 'running' })
+          : jsonResponse({
+              job_id: 'job-1',
+              kind: 'build',
+              status: 'succeeded',
+              result: { chunks: 12, index_dir: 'data/index' },
+            })
+      },
+    })
+    vi.stubGlobal('fetch', fetchMock)
+
+    render(<App />)
+
+    await userEvent.click(await screen.findByRole('button', { name: 'Build Index' }))
+
+    expect(await screen.findByText('Index built. Chunks: 12', {}, { timeout: 3000 })).toBeInTheDocument()
+    expect(polls).toBe(2)
+  })
+
+  it('shows streamed QA contexts as they arrive', async () => {
+    let qaInit: RequestInit | undefined
+    const context = {
+      type: 'context',
+      score: 0.8,
+      chunk_id: 'chunk-7',
+      section_title: 'Escalation',
+      page_start: 4,
+      page_end: 4,
+      excerpt: 'Escalate priority incidents within one hour.',
+    }
+    const line = JSON.stringify(context)
+    const fetchMock = createFetchMock({
+      '/api/health': { status: 'ok', ready: true, index_dir: 'data/index' },
+      '/api/qa': (init?: RequestInit) => {
+        qaInit = init
+        return ndjsonResponse([line.slice(0, 20), `${line.slice(20)}\n{"type":"sum`, 'mary","count":1,"elapsed_ms":3}\n'])
+      },
+    })
+    vi.stubGlobal('fetch', fetchMock)
+
+    render(<App />)
+
+    await userEvent.type(await screen.findByLabelText('Question'), 'What is the SLA?')
+    await userEvent.click(screen.getByRole('button', { name: 'Get Answer Context' }))
+
+    expect(await screen.findByText('Escalate priority incidents within one hour.')).toBeInTheDocument()
+    expect(screen.getByText('Escalation')).toBeInTheDocument()
+    expect(qaInit?.headers).toMatchObject({ 'Content-Type': 'application/json', Accept: 'application/x-ndjson' })
+    expect(JSON.parse(String(qaInit?.body))).toMatchObject({ question: 'What is the SLA?', stream: true })
+  })
 })